@@ -0,0 +1,98 @@
+"""
+Benchmark of sending per-start-url crawl specifications to the stand-in remote queue (modules/crawler/queueserver.py),
+once one request per specification on a new connection each (urllib) and once batched and gzip compressed over the
+pooled keep-alive connections of RemoteQueueClient with the configured settings.
+Run from the src directory:
+
+    python benchmarks/bench_remote_submit.py [urls] [error rate]
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(SRC_DIR)  # settings.toml files are resolved relative to src
+sys.path.insert(0, SRC_DIR)
+
+from modules.crawler import SETTINGS, remote
+from modules.crawler.model import CrawlSpecification
+from modules.crawler.queueserver import QueueServer
+
+
+def synthetic_specs(n):
+    spec = CrawlSpecification(name="bench", output="data", logs="logs",
+                              urls=["https://host{0}.example.com/start/{1}".format(i % 500, i) for i in range(n)],
+                              blacklist=["https?://[^/]*facebook\\.com", "https?://[^/]*twitter\\.com"],
+                              parser="modules.crawler.parsers.paragraph.ParagraphParser",
+                              parser_data={"allowed_languages": ["de", "en"], "xpaths": ["//p", "//td"]},
+                              pipelines={"pipelines.Paragraph2CsvPipeline": 300})
+    return remote.split_specification(spec)
+
+
+def run_unpooled(url, specs):
+    start = time.perf_counter()
+    for spec in specs:
+        body = "{\"specifications\":[" + spec.serialize(pretty=False) + "]}"
+        request = urllib.request.Request(url, data=body.encode("utf-8"), method="POST",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+    return len(specs) / (time.perf_counter() - start)
+
+
+def run_pooled(url, specs):
+    client = remote.RemoteQueueClient(url)
+    start = time.perf_counter()
+    ids = client.submit(specs)
+    elapsed = time.perf_counter() - start
+    client.close()
+    assert len(ids) == len(specs)
+    return len(specs) / elapsed
+
+
+def main():
+    urls = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    error_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    specs = synthetic_specs(urls)
+
+    server = QueueServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        unpooled = run_unpooled(server.get_url(), specs)
+        server.error_rate = error_rate
+        pooled = run_pooled(server.get_url(), specs)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print("{0} specifications, batch size {1}, {2} connections, error rate {3}"
+          .format(urls, SETTINGS["remote"]["batch_size"], SETTINGS["remote"]["connections"], error_rate))
+    print("one request per specification: {0:10.0f} specs/s".format(unpooled))
+    print("batched, pooled, gzip:          {0:10.0f} specs/s  ({1:.1f}x)".format(pooled, pooled / unpooled))
+
+
+if __name__ == "__main__":
+    main()
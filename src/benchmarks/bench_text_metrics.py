@@ -0,0 +1,93 @@
+"""
+Microbenchmark of the word metrics of the analyzer on mixed-language paragraphs. Compares the word counts of the
+original analysis, data["content"].apply(lambda par: len(str(par).split())) summed with the builtin sum, with
+modules.analyzer.textmetrics.text_metrics (word and character counts) and the pandas string accessors, and reports
+the cost of the optional vocabulary (unique_words setting). Run from the src directory:
+
+    python benchmarks/bench_text_metrics.py [paragraphs]
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import random
+import sys
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(SRC_DIR)  # settings.toml files are resolved relative to src
+sys.path.insert(0, SRC_DIR)
+
+import pandas as pd
+
+from modules.analyzer.textmetrics import text_metrics, add_vocabulary
+
+
+def synthetic_paragraphs(n, seed=0):
+    rnd = random.Random(seed)
+    words = ["Lorem", "ipsum", "dolor", "sit", "amet,", "consectetur", "adipiscing", "elit.", "Über", "Straße",
+             " ", "-", "2019", "Größe", "café", "naïve", "Zürich", "über alles"]
+    # a vocabulary of some ten thousand distinct words, as in real crawl data
+    words += ["{0}{1}".format(rnd.choice(words), i) for i in range(10000)]
+    return pd.Series([" ".join(rnd.choice(words) for _ in range(rnd.randint(3, 60))) for _ in range(n)])
+
+
+def best_of(func, repeat=3):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def original(content):
+    words = content.apply(lambda par: len(str(par).split()))
+    return words, sum(words)
+
+
+def str_accessors(content):
+    words = content.astype(str).str.split().str.len()
+    return words, int(words.sum())
+
+
+def metrics(content):
+    result = text_metrics(content)
+    return result["words"], int(result["words"].sum())
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    content = synthetic_paragraphs(n)
+
+    t_original, (words, total) = best_of(lambda: original(content))
+    print("{0} paragraphs, {1} words".format(n, total))
+    print("apply(str.split) + sum (original): {0:8.3f} s".format(t_original))
+    for label, func in [("str.split().str.len()", str_accessors), ("text_metrics (words and chars)", metrics)]:
+        t, (other_words, other_total) = best_of(lambda: func(content))
+        assert (other_words.values == words.values).all() and other_total == total, label + ": word counts differ"
+        print("{0:<34} {1:8.3f} s  ({2:.2f}x)".format(label + ":", t, t_original / t))
+
+    t_vocabulary, vocabulary = best_of(lambda: add_vocabulary(content, set()))
+    print("{0:<34} {1:8.3f} s  ({2} distinct words)".format("add_vocabulary:", t_vocabulary, len(vocabulary)))
+
+
+if __name__ == "__main__":
+    main()
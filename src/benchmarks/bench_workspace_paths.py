@@ -0,0 +1,85 @@
+"""
+Syscall-count benchmark of workspace path resolution. Counts the mkdir and stat calls (through os.mkdir and os.stat)
+issued by typical filemanager path lookups, once with the directories re-checked on every lookup (as before
+WorkspaceManager remembered created directories) and once with the memoized path resolution. Run from the src
+directory:
+
+    python benchmarks/bench_workspace_paths.py [lookups]
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(SRC_DIR)  # settings.toml files are resolved relative to src
+sys.path.insert(0, SRC_DIR)
+
+from core.Workspace import WorkspaceManager
+from modules.crawler import filemanager
+
+CALLS = Counter()
+
+
+def counting(name, func):
+    def wrapper(*args, **kwargs):
+        CALLS[name] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def lookups(n, crawl, memoized):
+    wsm = WorkspaceManager()
+    for i in range(n):
+        if not memoized:
+            wsm.invalidate_paths()
+        filemanager.get_logfile_path(crawl, "example.com_page_{0}".format(i))
+        filemanager.get_crawl_path(crawl)
+        wsm.get_log_path()
+
+
+def run(n, crawl, memoized):
+    CALLS.clear()
+    start = time.perf_counter()
+    lookups(n, crawl, memoized)
+    return time.perf_counter() - start, dict(CALLS)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as workspace:
+        WorkspaceManager().set_workspace(workspace)
+        os.mkdir = counting("mkdir", os.mkdir)
+        os.stat = counting("stat", os.stat)
+
+        for label, memoized in (("re-checked", False), ("memoized", True)):
+            elapsed, calls = run(n, "bench", memoized)
+            print("{0:>10}: {1:8d} mkdir, {2:8d} stat, {3:.3f} s for {4} lookups".format(
+                label, calls.get("mkdir", 0), calls.get("stat", 0), elapsed, n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of appending paragraph rows to crawl data files, once unbuffered (one storage append per row, as
+add_to_csv did before write-behind buffering) and once through a BufferedDataWriter with the configured limits.
+Run from the src directory:
+
+    python benchmarks/bench_write_buffer.py [rows] [storage]
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(SRC_DIR)  # settings.toml files are resolved relative to src
+sys.path.insert(0, SRC_DIR)
+
+from modules.crawler import SETTINGS, storage
+
+
+def synthetic_rows(n, seed=0):
+    rnd = random.Random(seed)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do"]
+    for i in range(n):
+        yield {"url": ["https://example.com/page/{0}".format(i // 20)],
+               "content": [" ".join(rnd.choice(words) for _ in range(rnd.randint(5, 80)))],
+               "depth": [rnd.randint(0, 3)]}
+
+
+def run(backend, rows, writer_args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench" + backend.extension)
+        backend.create(path)
+        writer = storage.BufferedDataWriter(backend, path, **writer_args)
+        data = list(synthetic_rows(rows))
+
+        start = time.perf_counter()
+        for row in data:
+            writer.write(row)
+        writer.flush()
+        elapsed = time.perf_counter() - start
+
+        assert len(backend.load(path)) == rows
+    return rows / elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    backend = storage.get_storage(sys.argv[2] if len(sys.argv) > 2 else None)
+
+    unbuffered = run(backend, rows, dict(max_rows=1, max_bytes=0, max_interval=0))
+    buffered = run(backend, rows, dict(max_rows=SETTINGS["filemanager"]["write_buffer_rows"],
+                                       max_bytes=SETTINGS["filemanager"]["write_buffer_bytes"],
+                                       max_interval=SETTINGS["filemanager"]["write_buffer_interval"]))
+
+    print("{0} rows, {1} backend".format(rows, type(backend).__name__))
+    print("unbuffered: {0:12.0f} rows/s".format(unbuffered))
+    print("buffered:   {0:12.0f} rows/s  ({1:.1f}x)".format(buffered, buffered / unbuffered))
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,8 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
+from collections import OrderedDict
+
 import toml
 from PyQt5 import QtCore
 from PyQt5.Qt import Qt
@@ -128,20 +130,180 @@ class SimpleErrorInfo(SimpleMessageBox):
 
 
 class LineHighlighter(QSyntaxHighlighter):
+    """
+    Formats each line of a document by the first of its rules (checker, line_format, format_else) whose checker
+    accepts the line, or whose format_else is given. Checkers must only depend on the line text, the resulting formats
+    are kept in a bounded LRU cache. If the editor showing the document is given, lines that have not been highlighted
+    before are only highlighted right away around the visible area of the editor, the remaining lines are highlighted
+    in batches while the event loop is idle.
+    """
+
+    # number of line texts whose format is cached
+    CACHE_SIZE = 100000
+    # number of deferred blocks highlighted per timer event
+    DEFER_BATCH = 500
+
+    # block states, blocks that have not been highlighted yet have the state -1
+    HIGHLIGHTED = 0
+    DEFERRED = 1
+
+    def __init__(self, document, editor: QPlainTextEdit = None):
+        super().__init__(document)
+        self.color_conditions = list()
+        self._format_cache = OrderedDict()
+        self._editor = editor
+        self._visible = None
+        self._batch_end = -1
+        self._scan_block = None
+        self._scan_from_start = True
+
+        self._defer_timer = QtCore.QTimer(self)
+        self._defer_timer.setInterval(0)
+        self._defer_timer.timeout.connect(self._highlight_deferred)
+        if editor is not None:
+            editor.verticalScrollBar().valueChanged.connect(self._scrolled)
 
     def highlightBlock(self, text: str) -> None:
-        for checker, line_format, format_else in self.color_conditions:
+        block = self.currentBlock()
+        if self.currentBlockState() != self.HIGHLIGHTED and block.position() >= self._batch_end \
+                and not self._is_visible(block):
+            self.setCurrentBlockState(self.DEFERRED)
+            self._defer(block)
+            return
+
+        self.setCurrentBlockState(self.HIGHLIGHTED)
+        line_format = self._line_format(text)
+        if line_format is not None:
+            self.setFormat(0, len(text), line_format)
+
+    def append_rule(self, rule):
+        self.color_conditions.append(rule)
+        self._format_cache.clear()
+
+    def _line_format(self, text: str):
+        """ Returns the format of the line text, None if no rule formats it. """
+        try:
+            self._format_cache.move_to_end(text)
+            return self._format_cache[text]
+        except KeyError:
+            pass
+
+        line_format = None
+        for checker, format_if, format_else in self.color_conditions:
             if checker(text):
-                self.setFormat(0, len(text), line_format)
+                line_format = format_if
                 break
             elif format_else:
-                self.setFormat(0, len(text), format_else)
+                line_format = format_else
                 break
 
-    def append_rule(self, rule):
-        if not hasattr(self, "color_conditions"):
-            self.color_conditions = list()
-        self.color_conditions.append(rule)
+        self._format_cache[text] = line_format
+        if len(self._format_cache) > self.CACHE_SIZE:
+            self._format_cache.popitem(last=False)
+        return line_format
+
+    def _is_visible(self, block) -> bool:
+        """ Tells whether block is within, or a screen height around, the visible area of the editor. """
+        if self._editor is None:
+            return True
+        if self._visible is None:
+            first = self._first_visible_block().blockNumber()
+            # an upper bound of the number of visible blocks, a wrapped block spans several lines
+            lines = self._editor.viewport().height() // max(self._editor.fontMetrics().lineSpacing(), 1) + 1
+            self._visible = (first - lines, first + 2 * lines)
+            # the visible area has to be determined again in the next event loop iteration
+            QtCore.QTimer.singleShot(0, self._reset_visible)
+        return self._visible[0] <= block.blockNumber() <= self._visible[1]
+
+    def _reset_visible(self):
+        self._visible = None
+
+    def _scrolled(self):
+        self._visible = None
+        if self._defer_timer.isActive():
+            # continue with the blocks that have been scrolled into view
+            self._scan_block = self._first_visible_block()
+            self._scan_from_start = False
+
+    def _first_visible_block(self):
+        if self._editor.verticalScrollBar().value() == 0:
+            # avoids laying out the document, e.g. right after its text has been replaced
+            return self.document().firstBlock()
+        return self._editor.cursorForPosition(QtCore.QPoint(0, 0)).block()
+
+    def _defer(self, block):
+        if self._scan_block is None or not self._scan_block.isValid() \
+                or block.position() < self._scan_block.position():
+            # all blocks before the scan position have been highlighted, unless the scan did not start at the top
+            self._scan_block = block
+        self._defer_timer.start()
+
+    def _highlight_deferred(self):
+        """ Highlights the blocks up to the next DEFER_BATCH deferred blocks. """
+        if self._scan_block is None or not self._scan_block.isValid():
+            self._scan_block = self.document().firstBlock()
+            self._scan_from_start = True
+
+        block = self._scan_block
+        while block.isValid() and block.userState() != self.DEFERRED:
+            block = block.next()
+        if not block.isValid():
+            if self._scan_from_start:
+                self._scan_block = None
+                self._defer_timer.stop()
+            else:
+                self._scan_block = self.document().firstBlock()
+                self._scan_from_start = True
+            return
+
+        first, deferred = block, 0
+        while block.isValid() and deferred < self.DEFER_BATCH:
+            deferred += block.userState() == self.DEFERRED
+            block = block.next()
+        # highlights the range at once, as long as blocks change their state the next block is highlighted too
+        self._batch_end = block.position() if block.isValid() else self.document().characterCount()
+        self.rehighlightBlock(first)
+        self._batch_end = -1
+        # the range is scanned again, a block that had been highlighted before stops highlighting the range
+        self._scan_block = first
+
+
+class DocumentLines:
+    """
+    The lines of a QTextDocument, updated from its contentsChange signal by splitting only the changed blocks again.
+    version is incremented with every change.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.version = 0
+        self._blocks = [""]
+        self._update(0, 0, 0)
+        document.contentsChange.connect(self._update)
+
+    def lines(self) -> [str]:
+        """ Returns a copy of the lines, like document.toPlainText().splitlines(). """
+        return self._blocks[:-1] if self._blocks[-1] == "" else self._blocks[:]
+
+    def _update(self, position: int, removed: int, added: int):
+        first = self.document.findBlock(position)
+        if not first.isValid():
+            first = self.document.lastBlock()
+        last = self.document.findBlock(position + added)
+        if not last.isValid():
+            # the reported change may include the final paragraph separator
+            last = self.document.lastBlock()
+
+        new_blocks = list()
+        block = first
+        while block.isValid() and block.blockNumber() <= last.blockNumber():
+            new_blocks.append(block.text())
+            block = block.next()
+
+        start = first.blockNumber()
+        replaced = len(new_blocks) - (self.document.blockCount() - len(self._blocks))
+        self._blocks[start:start + replaced] = new_blocks
+        self.version += 1
 
 ###
 # Several reoccurring routines to handle Qt Elements
@@ -21,6 +21,8 @@ You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
 import os
+import threading
+
 import core
 from crawlUI import APP_SETTINGS
 
@@ -31,6 +33,9 @@ class WorkspaceManager:
         def __init__(self, path=""):
             self._default_workspace = os.path.join(os.getcwd(), APP_SETTINGS["workspace"]["default"])
             self._workspace_path = path
+            # directories that have been created (or found to exist) since the last workspace switch
+            self._existing_paths = set()
+            self._paths_lock = threading.Lock()
 
             self.get_workspace()  # calling this on init ensures that the workspace always exists
 
@@ -45,21 +50,36 @@ class WorkspaceManager:
             else:
                 ws_path = self._workspace_path
 
-            WorkspaceManager._create_workspace_path(ws_path)  # in any case, make sure the path exists upon fetching it
+            self.ensure_path(ws_path)  # in any case, make sure the path exists upon fetching it
             return ws_path
 
         def set_workspace(self, path):
             """ Set the current workspace to path, creating it if necessary in the process. """
-            WorkspaceManager._create_workspace_path(path)
+            self.invalidate_paths()
+            self.ensure_path(path)
             self._workspace_path = path
             core.MASTER_LOGGER.info("Switched workspace to {0}.".format(self._workspace_path))
 
         def get_log_path(self):
-            self._create_log_path()
-            return os.path.join(self.get_workspace(), APP_SETTINGS["workspace"]["log_path"])
-
-        def _create_log_path(self):
-            os.makedirs(os.path.join(self.get_workspace(), APP_SETTINGS["workspace"]["log_path"]), exist_ok=True)
+            return self.ensure_path(os.path.join(self.get_workspace(), APP_SETTINGS["workspace"]["log_path"]))
+
+        def ensure_path(self, path):
+            """
+            Creates the directory path if necessary and returns it. Each path is only created (or checked) once until
+            the workspace is switched or invalidate_paths is called, safe to be called from multiple threads.
+            """
+            if path in self._existing_paths:
+                return path
+            with self._paths_lock:
+                if path not in self._existing_paths:
+                    WorkspaceManager._create_workspace_path(path)
+                    self._existing_paths.add(path)
+            return path
+
+        def invalidate_paths(self):
+            """ Forgets which directories exist, call this after deleting directories within the workspace. """
+            with self._paths_lock:
+                self._existing_paths = set()
 
     # End of inner __WorkspaceManager
 
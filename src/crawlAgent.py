@@ -0,0 +1,282 @@
+"""
+Headless crawl agent, the counterpart of the remote http initializer. The agent leases crawl specifications from a
+remote crawl queue (long polling for new ones), and runs each in an OWS-scrapy-wrapper process of its own workspace
+(scrapy_wrapper_exec of the crawler settings), at most slots at the same time. The wrapper processes are launched and
+restarted by the crawl supervisor (see modules.crawler.supervisor). While a process runs, the agent renews its lease
+by heartbeats carrying the progress of the crawl, and reports it as finished or failed once it has exited. If a lease
+is lost, because the queue has given it to another agent after it expired, the process is stopped. Specifications with
+the result finalizer (see modules.crawler.results) have their complete data files uploaded to the result store of the
+queue while they run, and are reported once all data files of their crawl are uploaded after the process has exited.
+On shutdown (SIGINT or SIGTERM) the running processes are stopped and their leases released, so that the queue hands
+their specifications out again. Several agents, also on the same machine, can consume the same queue, each should use
+its own workspace. Run from the src directory:
+
+    python crawlAgent.py [QUEUE_URL] [--workspace PATH] [--name NAME] [--slots N] [--exit-when-idle]
+
+modules/crawler/queueserver.py provides a local queue to test agents with.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+import time
+
+import core
+from core.Workspace import WorkspaceManager
+from crawlUI import APP_SETTINGS
+from modules.crawler import filemanager, results, supervisor, SETTINGS
+from modules.crawler.model import CrawlSpecification
+from modules.crawler.remote import RemoteQueueClient, RemoteQueueError
+
+LOG = core.simple_logger(modname="agent", file_path=APP_SETTINGS["general"]["master_log"])
+
+# responses to heartbeats telling that the lease of a specification is not held anymore
+LEASE_LOST_STATUS = [404, 409]
+
+
+class CrawlAgent:
+
+    def __init__(self, queue_url: str, name: str = None, slots: int = None):
+        self.client = RemoteQueueClient(queue_url, connections=1)
+        self.name = name or "{0}-{1}".format(socket.gethostname(), os.getpid())
+        self.slots = slots or SETTINGS["agent"]["slots"] or os.cpu_count() or 1
+        # id of the leased specification -> dict with lease, crawl, urls, process, heartbeat, the queue url to upload
+        # results to (None if they are not uploaded), and once the process has exited, its state, returncode and time
+        self.jobs = dict()
+        self._jobs_lock = threading.Lock()
+        self._uploaders = dict()  # queue url -> ResultUploader, used by the upload thread only
+        self._upload_thread = threading.Thread(target=self._upload_results, name="result-upload", daemon=True)
+        self._stopping = threading.Event()
+
+    def run(self, exit_when_idle=False):
+        """ Leases and runs specifications until stop is called, or until the queue is empty if exit_when_idle. """
+        LOG.info("Agent {0} consuming {1} with {2} slots".format(self.name, self.client.queue_url, self.slots))
+        self._upload_thread.start()
+        try:
+            while not self._stopping.is_set():
+                self.check_jobs()
+                exited = self._get_exited()
+                free = self.slots - exited.count(None)
+                if free <= 0:
+                    self._stopping.wait(SETTINGS["agent"]["poll_interval"])
+                    continue
+
+                wait = SETTINGS["agent"]["long_poll"]
+                if exited:  # return in time for the next heartbeats
+                    wait = min(wait, SETTINGS["agent"]["heartbeat_interval"])
+                if any(job_exited is not None for job_exited in exited):  # and to report uploaded results
+                    wait = min(wait, SETTINGS["agent"]["poll_interval"])
+                try:
+                    leases = self.client.lease(self.name, free, wait)
+                except RemoteQueueError as exc:
+                    LOG.error("Could not lease specifications: {0}".format(exc))
+                    self._stopping.wait(SETTINGS["agent"]["poll_interval"])
+                    continue
+
+                for lease in leases:
+                    self.start_job(lease)
+                if exit_when_idle and not leases and not self._get_exited():
+                    LOG.info("Queue is empty, agent {0} exits".format(self.name))
+                    break
+        finally:
+            self.shutdown()
+
+    def stop(self, *args):
+        self._stopping.set()
+
+    def start_job(self, lease: dict):
+        """ Saves the leased specification to the workspace of the agent and starts a wrapper process for it. """
+        try:
+            spec = CrawlSpecification()
+            spec.deserialize(json.dumps(lease["spec"]))
+            crawl = spec.name
+            # the agent is the finalizer of the results, the wrapper is not
+            upload = spec.finalizers.pop(results.FINALIZER, None)
+            results_url = upload["url"] if upload else None
+            # the output and log directories of the sender do not exist on this machine
+            spec.update(output=filemanager._get_crawl_raw_path(crawl), logs=filemanager.get_crawl_log_path(crawl))
+            spec_path = filemanager.save_settings_file(
+                os.path.join(filemanager.get_crawl_path(crawl), "{0}.{1}.json".format(crawl, lease["id"])), spec)
+            filemanager.register_urls(crawl, spec.urls)
+            process = supervisor.get_supervisor().launch(crawl, spec_path)
+        except Exception as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            self._complete(lease["id"], lease["lease"], remote_state="failed")
+            return
+        LOG.info("Started {0} urls of crawl {1} (specification {2})".format(len(spec.urls), crawl, lease["id"]))
+        with self._jobs_lock:
+            self.jobs[lease["id"]] = dict(lease=lease["lease"], crawl=crawl, urls=spec.urls, process=process,
+                                          heartbeat=time.time(), results=results_url, exited=None, uploaded=None)
+
+    def check_jobs(self):
+        """
+        Reports the jobs whose process has exited, once their results are uploaded, and sends the heartbeats that are
+        due.
+        """
+        with self._jobs_lock:
+            jobs = list(self.jobs.items())
+        if not jobs:
+            return
+        crawl_supervisor = supervisor.get_supervisor()
+        entries = {entry["id"]: entry for entry in crawl_supervisor.poll()}
+        for message_id, job in jobs:
+            entry = entries.get(job["process"])
+            state = entry["state"] if entry is not None else supervisor.FAILED
+            with self._jobs_lock:
+                if job["exited"] is None and state in (supervisor.FINISHED, supervisor.FAILED):
+                    LOG.info("Crawl {0} (specification {1}) {2}".format(job["crawl"], message_id, state))
+                    job["exited"] = dict(state="finished" if state == supervisor.FINISHED else "failed",
+                                         returncode=entry.get("returncode") if entry is not None else None,
+                                         time=time.time())
+                stopped = job["exited"] is None and state == supervisor.STOPPED
+                # results are complete once a scan started after the process has exited has uploaded all data files
+                done = job["exited"] is not None and (job["results"] is None or
+                                                      (job["uploaded"] or 0) >= job["exited"]["time"])
+                exited = job["exited"]
+                heartbeat_due = time.time() - job["heartbeat"] >= SETTINGS["agent"]["heartbeat_interval"]
+
+            if stopped:
+                LOG.info("Crawl {0} (specification {1}) was stopped".format(job["crawl"], message_id))
+                self._release(message_id, job)
+            elif done:
+                self._complete(message_id, job["lease"], remote_state=exited["state"],
+                               returncode=exited["returncode"])
+                self._remove_job(message_id)
+            elif heartbeat_due:
+                self._heartbeat(message_id, job, entry)
+
+    def upload_results(self):
+        """ Uploads the complete data files of the crawls of the jobs with the result finalizer. """
+        started = time.time()
+        crawls = dict()  # (queue url, crawl) -> start urls of its jobs
+        with self._jobs_lock:
+            for job in self.jobs.values():
+                if job["results"] is not None:
+                    crawls.setdefault((job["results"], job["crawl"]), list()).extend(job["urls"])
+        for (queue_url, crawl), urls in crawls.items():
+            if queue_url not in self._uploaders:
+                self._uploaders[queue_url] = results.ResultUploader(queue_url)
+            if not self._uploaders[queue_url].upload_completed(crawl, urls=urls, stopping=self._stopping):
+                continue
+            with self._jobs_lock:
+                for job in self.jobs.values():
+                    if (job["results"], job["crawl"]) == (queue_url, crawl):
+                        job["uploaded"] = started
+
+    def shutdown(self):
+        """ Stops the running processes and releases their leases, also of the jobs whose results are not uploaded. """
+        self._stopping.set()
+        if self._upload_thread.is_alive():
+            self._upload_thread.join()
+        crawl_supervisor = supervisor.get_supervisor()
+        with self._jobs_lock:
+            jobs = list(self.jobs.items())
+        for message_id, job in jobs:
+            if job["exited"] is None:
+                crawl_supervisor.stop(job["process"])
+            self._release(message_id, job)
+        for uploader in self._uploaders.values():
+            uploader.close()
+        self.client.close()
+
+    def _upload_results(self):
+        while not self._stopping.wait(SETTINGS["results"]["upload_interval"]):
+            try:
+                self.upload_results()
+            except Exception as exc:
+                LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+
+    def _get_exited(self) -> list:
+        """ Returns the exited entry (None while running) of every job. """
+        with self._jobs_lock:
+            return [job["exited"] for job in self.jobs.values()]
+
+    def _remove_job(self, message_id: str):
+        with self._jobs_lock:
+            del self.jobs[message_id]
+
+    def _release(self, message_id: str, job: dict):
+        """ Returns the specification of job to the queue, so that it is leased again, and forgets the job. """
+        LOG.info("Releasing crawl {0} (specification {1})".format(job["crawl"], message_id))
+        try:
+            self.client.release(message_id, job["lease"])
+        except RemoteQueueError as exc:
+            LOG.warning("Could not release specification {0}: {1}".format(message_id, exc))
+        self._remove_job(message_id)
+
+    def _heartbeat(self, message_id: str, job: dict, entry: dict):
+        with self._jobs_lock:
+            exited = job["exited"]
+        progress = dict(urls=len(job["urls"]),
+                        incomplete=len(filemanager.get_incomplete_urls(job["crawl"], job["urls"])),
+                        uploading=exited is not None)
+        if entry is not None:
+            progress.update(restarts=entry["restarts"], cpu_percent=entry.get("cpu_percent"), rss=entry.get("rss"))
+        try:
+            self.client.heartbeat(message_id, job["lease"], progress=progress)
+            with self._jobs_lock:
+                job["heartbeat"] = time.time()
+        except RemoteQueueError as exc:
+            if exc.status not in LEASE_LOST_STATUS:
+                LOG.warning("Heartbeat of specification {0} failed: {1}".format(message_id, exc))
+                return
+            LOG.warning("Lost the lease of specification {0}, stopping crawl {1}".format(message_id, job["crawl"]))
+            if exited is None:
+                supervisor.get_supervisor().stop(job["process"])
+            self._remove_job(message_id)
+
+    def _complete(self, message_id: str, lease: str, remote_state: str, returncode: int = None):
+        try:
+            self.client.complete(message_id, lease, remote_state, returncode=returncode)
+        except RemoteQueueError as exc:
+            # the queue hands the specification out again once the lease has expired
+            LOG.error("Could not report specification {0} as {1}: {2}".format(message_id, remote_state, exc))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs crawl specifications leased from a remote crawl queue.")
+    parser.add_argument("queue_url", nargs="?", default=SETTINGS["remote"]["queue_url"],
+                        help="url of the crawl queue, the queue_url of the remote crawler settings by default")
+    parser.add_argument("--workspace", help="workspace directory, the default workspace by default")
+    parser.add_argument("--name", help="name of the agent, hostname and process id by default")
+    parser.add_argument("--slots", type=int, help="maximal number of wrapper processes running at the same time")
+    parser.add_argument("--exit-when-idle", action="store_true",
+                        help="exit once the queue is empty and all leased specifications are done")
+    args = parser.parse_args()
+    if not args.queue_url:
+        parser.error("No queue url given.")
+
+    if args.workspace:
+        WorkspaceManager().set_workspace(os.path.abspath(args.workspace))
+
+    agent = CrawlAgent(args.queue_url, name=args.name, slots=args.slots)
+    signal.signal(signal.SIGINT, agent.stop)
+    signal.signal(signal.SIGTERM, agent.stop)
+    agent.run(exit_when_idle=args.exit_when_idle)
+
+
+if __name__ == "__main__":
+    main()
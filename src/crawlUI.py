@@ -25,6 +25,7 @@ import toml
 APP_SETTINGS = toml.load("settings.toml")
 
 import importlib
+import multiprocessing
 import sys
 import os
 
@@ -296,6 +297,8 @@ class ModLoader:
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # the analyzer spawns worker processes, also from frozen binaries
+
     app = QApplication(sys.argv)
 
     MAIN_WINDOW = UIWindow()
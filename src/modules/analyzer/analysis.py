@@ -0,0 +1,306 @@
+"""
+Statistics of single crawl data files and log files, independent of the Qt based user interface.
+The functions in here take absolute file paths and return plain dicts, so they can be run in worker processes.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from modules.crawler import storage
+from modules.analyzer import SETTINGS, LOG, logparser
+from modules.analyzer.textmetrics import text_metrics, add_vocabulary
+
+MODE_STREAMING = "streaming"
+MODE_FULL = "full"
+
+# columns of the statistics computed per data file, in the order they appear in the stats table
+DATAFILE_STATS = ["Paragraphs", "Unique Paragraphs", "Words", "Words in Unique Paragraphs", "Characters"]
+# additional column if the unique_words setting is enabled
+UNIQUE_WORDS = "Unique Words"
+# increase whenever the results of datafile_stats change, invalidates cached results
+STATS_VERSION = 5
+
+# number of bytes from the head and the tail of a file that go into its content hash
+HASH_SAMPLE_SIZE = 1048576
+
+
+class DigestSet:
+    """
+    Collects 64 bit digests chunk by chunk, each with a value, and deduplicates them once all are added. Digests are
+    deduplicated within their chunk when added, so memory is 16 bytes per digest that is distinct within its chunk.
+    """
+
+    def __init__(self):
+        self._digests = list()
+        self._values = list()
+
+    def add(self, digests: np.ndarray, values: np.ndarray = None):
+        _, first = np.unique(digests, return_index=True)
+        self._digests.append(digests[first])
+        self._values.append(values[first] if values is not None else np.zeros(len(first), dtype=np.int64))
+
+    def unique(self) -> (int, int):
+        """ Returns the number of distinct digests and the sum of the values of their first occurrences. """
+        if not self._digests:
+            return 0, 0
+        digests = np.concatenate(self._digests)
+        self._digests = [digests]
+        _, first = np.unique(digests, return_index=True)
+        return len(first), int(np.concatenate(self._values)[first].sum())
+
+
+def get_datafile_stats() -> [str]:
+    """ Columns of the statistics computed per data file with the current settings. """
+    return DATAFILE_STATS + [UNIQUE_WORDS] if SETTINGS["analysis"]["unique_words"] else DATAFILE_STATS
+
+
+def datafile_stats(path: str, mode: str = None, chunksize: int = None):
+    """
+    Computes the paragraph statistics of the data file at path.
+    :param mode: MODE_STREAMING or MODE_FULL, defaults to the analysis mode setting.
+    :param chunksize: Rows per chunk in streaming mode, defaults to the crawler read_chunksize setting.
+    :return: dict of statistics, None if the data file is not in the expected format.
+    """
+    if mode is None:
+        mode = SETTINGS["analysis"]["mode"]
+
+    if mode == MODE_FULL:
+        return _datafile_stats_full(path)
+    return _datafile_stats_streaming(path, chunksize)
+
+
+def _datafile_stats_full(path):
+    data = storage.get_storage_of(path).load(path)
+    if "content" not in data.columns:
+        return None
+
+    metrics = text_metrics(data["content"])
+    data["words"] = metrics["words"]
+    data_unique = data.drop_duplicates()
+    stats = {"Paragraphs": len(data),
+             "Unique Paragraphs": data["content"].nunique(),
+             "Words": int(data["words"].sum()),
+             "Words in Unique Paragraphs": int(data_unique["words"].sum()),
+             "Characters": int(metrics["chars"].sum())}
+    if SETTINGS["analysis"]["unique_words"]:
+        stats[UNIQUE_WORDS] = len(add_vocabulary(data["content"], set()))
+    return stats
+
+
+def _datafile_stats_streaming(path, chunksize=None):
+    """
+    Computes the statistics chunk by chunk. Uniqueness is tracked by 64 bit digests, of the paragraph content for
+    unique paragraphs and of the whole row for the words in unique paragraphs (as in full mode), so memory depends
+    on the number of distinct rows and not on the size of their content.
+    """
+    paragraphs = DigestSet()
+    rows = DigestSet()
+    words_seen = set() if SETTINGS["analysis"]["unique_words"] else None
+    stats = dict.fromkeys(DATAFILE_STATS, 0)
+    for chunk in storage.iter_file(path, chunksize=chunksize):
+        if "content" not in chunk.columns:
+            return None
+        content = chunk["content"].astype(object)
+        metrics = text_metrics(content)
+        if words_seen is not None:
+            add_vocabulary(content, words_seen)
+        words = metrics["words"].values
+
+        stats["Paragraphs"] += len(content)
+        stats["Words"] += int(words.sum())
+        stats["Characters"] += int(metrics["chars"].sum())
+
+        present = content.notna().values
+        paragraphs.add(pd.util.hash_pandas_object(content[present], index=False).values)
+        # strings, so that values read with different dtypes in different chunks get the same digest
+        rows.add(pd.util.hash_pandas_object(chunk.astype(str), index=False).values, words)
+
+    stats["Unique Paragraphs"] = paragraphs.unique()[0]
+    stats["Words in Unique Paragraphs"] = rows.unique()[1]
+    if words_seen is not None:
+        stats[UNIQUE_WORDS] = len(words_seen)
+    return stats
+
+
+def logfile_counts(path: str, cursor: dict = None) -> (dict, dict):
+    """
+    Counts warnings, errors and their causes in the log file at path, see modules.analyzer.logparser.
+    Only the part of the log after cursor (a cursor returned by a previous call) is parsed.
+    :return: Tuple of the new cursor and the counts.
+    """
+    return logparser.parse_logfile_incremental(path, cursor)
+
+
+def get_worker_count() -> int:
+    """ Number of analysis worker processes, the workers setting or the number of cpus if it is 0. """
+    return SETTINGS["analysis"]["workers"] or os.cpu_count() or 1
+
+
+def run_parallel(tasks: dict, workers: int = None, callback=None) -> dict:
+    """
+    Runs the given tasks in a pool of worker processes.
+    :param tasks: dict mapping a key to a tuple of a function (defined at module level, importable by the spawned
+                  worker processes) and its (picklable) arguments
+    :param workers: Number of worker processes, defaults to get_worker_count(). With 1 worker, the tasks are run in
+                    the calling thread.
+    :param callback: Called with key and result after every finished task.
+    :return: dict mapping each key to the result of its task, None for tasks that raised an exception
+    """
+    if workers is None:
+        workers = get_worker_count()
+
+    results = dict()
+
+    def finish(key, result):
+        results[key] = result
+        if callback:
+            callback(key, result)
+
+    if workers <= 1:
+        for key, (func, *args) in tasks.items():
+            try:
+                result = func(*args)
+            except Exception as exc:
+                LOG.exception(f"{type(exc).__name__}: {exc}")
+                result = None
+            finish(key, result)
+        return results
+
+    # spawned rather than forked, forking the threads of the running GUI can deadlock the worker processes
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(tasks), 1)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(func, *args): key for key, (func, *args) in tasks.items()}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                LOG.exception(f"{type(exc).__name__}: {exc}")
+                result = None
+            finish(futures[future], result)
+
+    return results
+
+
+def fingerprint(path: str, with_hash=True) -> dict:
+    """
+    Fingerprint of the file at path, consisting of its size, modification time and (if with_hash) a content hash.
+    The content hash covers the first and last HASH_SAMPLE_SIZE bytes of the file, which suffices to recognize
+    append-only crawl output while keeping fingerprinting of large files cheap.
+    Directories (e.g. incomplete parquet data files) are fingerprinted by their part files, their content hash covers
+    the names, sizes and modification times of the parts.
+    """
+    if os.path.isdir(path):
+        return _fingerprint_dir(path, with_hash)
+    stat = os.stat(path)
+    fprint = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.blake2b(str(stat.st_size).encode("ascii"), digest_size=16)
+        with open(path, "rb") as in_file:
+            digest.update(in_file.read(HASH_SAMPLE_SIZE))
+            if stat.st_size > HASH_SAMPLE_SIZE:
+                in_file.seek(max(HASH_SAMPLE_SIZE, stat.st_size - HASH_SAMPLE_SIZE))
+                digest.update(in_file.read(HASH_SAMPLE_SIZE))
+        fprint["hash"] = digest.hexdigest()
+    return fprint
+
+
+def _fingerprint_dir(path: str, with_hash=True) -> dict:
+    parts = list()
+    for root, _, files in os.walk(path):
+        for fname in files:
+            stat = os.stat(os.path.join(root, fname))
+            parts.append((os.path.relpath(os.path.join(root, fname), path), stat.st_size, stat.st_mtime_ns))
+    parts.sort()
+    fprint = {"size": sum(part[1] for part in parts),
+              "mtime": max([part[2] for part in parts] + [os.stat(path).st_mtime_ns])}
+    if with_hash:
+        fprint["hash"] = hashlib.blake2b(json.dumps(parts).encode("utf-8"), digest_size=16).hexdigest()
+    return fprint
+
+
+class ResultCache:
+    """
+    Per-file analysis results of a crawl, persisted as json and keyed by the absolute file path.
+    A cached result is valid as long as the fingerprint of its file is unchanged. Files that only changed their
+    modification time or their path (e.g. when a data file is completed) are recognized by size and content hash.
+    """
+
+    def __init__(self, path: str, variant: str = ""):
+        """
+        :param path: Location of the cache file.
+        :param variant: Identifies the kind of analysis, results of a different variant are never reused.
+        """
+        self.path = path
+        self.variant = variant
+        self._entries = dict()
+        self._used = dict()
+        self._missed = dict()
+
+        try:
+            with open(path, "r") as cache_file:
+                cache = json.load(cache_file)
+            if cache.get("variant") == variant:
+                self._entries = cache["entries"]
+        except (IOError, ValueError, KeyError):
+            pass
+
+        self._by_content = {(entry["size"], entry["hash"]): entry for entry in self._entries.values()}
+
+    def get(self, path: str):
+        """ Returns the cached result for the file at path, None if there is no valid one. """
+        fprint = fingerprint(path, with_hash=False)
+        entry = self._entries.get(path)
+        if entry is not None and entry["size"] == fprint["size"] and entry["mtime"] == fprint["mtime"]:
+            self._used[path] = entry
+            return entry["result"]
+
+        fprint = fingerprint(path)
+        entry = self._by_content.get((fprint["size"], fprint["hash"]))
+        if entry is not None:
+            self._used[path] = dict(fprint, result=entry["result"])
+            return entry["result"]
+
+        self._missed[path] = fprint
+        return None
+
+    def put(self, path: str, result):
+        """ Caches result for the file at path, under the fingerprint it had when get missed (if it was called). """
+        try:
+            fprint = self._missed.pop(path, None) or fingerprint(path)
+        except OSError as err:
+            LOG.warning(f"Not caching the result of {path}: {err}")
+            return
+        self._used[path] = dict(fprint, result=result)
+
+    def save(self):
+        """ Persists the entries that have been used or put since loading, entries of vanished files are dropped. """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump({"variant": self.variant, "entries": self._used}, cache_file)
+        os.replace(tmp_path, self.path)
@@ -20,6 +20,7 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
+import os
 import threading
 
 import pandas as pd
@@ -33,6 +34,9 @@ from modules.analyzer.model import PandasModel
 from modules.crawler import SETTINGS as CRAWLER_SETTINGS
 from modules.crawler import filemanager as crawler_files
 from modules.analyzer import filemanager as analyzer_files, LOG
+from modules.analyzer import SETTINGS
+from modules.analyzer.analysis import datafile_stats, logfile_counts, run_parallel, get_worker_count, ResultCache, \
+    get_datafile_stats, STATS_VERSION
 
 
 def get_paragraph_crawls():
@@ -79,8 +83,9 @@ class AnalyzerController(ViewController, QObject):
         self.analysisStopped.connect(self.stop_analysis_mode)
 
     def update_view(self):
-        if get_paragraph_crawls() != self.crawls:
-            self.crawls = get_paragraph_crawls()
+        crawls = get_paragraph_crawls()
+        if crawls != self.crawls:
+            self.crawls = crawls
             cur_selec = self._view.crawl_selector.currentText()
             saturate_combobox(self._view.crawl_selector, self.crawls, True)
             self._view.crawl_selector.setCurrentIndex(self._view.crawl_selector.findText(cur_selec, QtCore.Qt.MatchFixedString))
@@ -103,7 +108,10 @@ class AnalyzerController(ViewController, QObject):
 
     def show_data(self, df):
         try:
-            self._view.stats_view.setModel(PandasModel(df))
+            model = PandasModel(df)
+            header = self._view.stats_view.horizontalHeader()
+            model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+            self._view.stats_view.setModel(model)
             self._view.stats_view.resizeColumnsToContents()
         except Exception as err:
             LOG.exception(err)
@@ -128,8 +136,9 @@ class AnalyzerController(ViewController, QObject):
         crawlname = self._view.crawl_selector.currentText()
         df_stats = analyzer_files.get_stats(crawlname)
         if df_stats is not None:
-            msg = SimpleYesNoMessage("Recreate Analysis?", f"The crawl '{crawlname}' was already analyzed. "
-                                                           "Do you wish to recreate the analysis?")
+            msg = SimpleYesNoMessage("Update Analysis?", f"The crawl '{crawlname}' was already analyzed. "
+                                                         "Do you wish to update the analysis? Only new or modified "
+                                                         "files are analyzed again.")
             if not msg.is_confirmed():
                 return
 
@@ -148,73 +157,87 @@ class AnalysisWorker(QRunnable):
 
     @pyqtSlot()
     def run(self):
-        data_files = crawler_files.get_datafiles(self.crawlname)
-        LOG.info(f"Analyzing {len(data_files)} data-files for {self.crawlname}: {data_files}")
-        stats = pd.DataFrame(columns=["URL", "Paragraphs", "Unique Paragraphs", "Words", "Words in Unique Paragraphs"])
-        tracker = AnalysisProgressTracker(len(data_files) * 5, lambda tr: self._controller.progressChanged.emit(tr.rate))
+        try:
+            self.analyze()
+        except Exception as err:
+            LOG.exception(err)
+        finally:
+            self._controller.analysisStopped.emit()
+
+    def analyze(self):
+        data_paths = crawler_files.get_datafiles(self.crawlname, abspath=True)
+        data_files = [os.path.splitext(os.path.basename(path))[0] for path in data_paths]
+        log_files = list(filter(lambda lf: not lf.startswith("scrapy"), crawler_files.get_logfiles(self.crawlname)))
+        log_paths = [crawler_files.get_logfile_path(self.crawlname, fname) for fname in log_files]
+
+        # reuse the results of data files that did not change since the previous analysis
+        cache = ResultCache(analyzer_files.get_stats_cache_path(self.crawlname),
+                            variant=f"{SETTINGS['analysis']['mode']}-{STATS_VERSION}"
+                                    f"{'-words' if SETTINGS['analysis']['unique_words'] else ''}")
+        results = dict()
+        tasks = dict()
+        for file, path in zip(data_files, data_paths):
+            try:
+                results[("data", file)] = cache.get(path)
+            except OSError as err:
+                # e.g. vanished in the meantime, analyzed without the cache
+                LOG.warning(f"Could not look up {path} in the analysis cache: {err}")
+                results[("data", file)] = None
+            if results[("data", file)] is None:
+                tasks[("data", file)] = (datafile_stats, path)
+        unchanged = len(results) - len(tasks)
+        # logs are only parsed from where the previous analysis stopped
+        cursors = analyzer_files.load_log_cursors(self.crawlname)
+        for fname, path in zip(log_files, log_paths):
+            tasks[("log", fname)] = (logfile_counts, path, cursors.get(fname))
+
+        tracker = AnalysisProgressTracker(max(len(tasks), 1),
+                                          lambda tr: self._controller.progressChanged.emit(tr.rate))
+
+        # fan out the statistics of all new or modified data files and log files to the worker processes
+        LOG.info(f"Analyzing {len(data_files)} data-files and {len(log_files)} log-files for {self.crawlname} "
+                 f"({unchanged} data-files unchanged) with {get_worker_count()} workers: "
+                 f"{data_files}, {log_files}")
+        paths = dict(zip((("data", file) for file in data_files), data_paths))
+
+        def finish_task(key, result):
+            if result is not None:
+                if key[0] == "log":
+                    cursors[key[1]], result = result
+                else:
+                    cache.put(paths[key], result)
+            results[key] = result
+            tracker.step()
+
+        run_parallel(tasks, callback=finish_task)
+        try:
+            cache.save()
+            analyzer_files.save_log_cursors(self.crawlname, {fname: cursors[fname] for fname in log_files
+                                                             if fname in cursors})
+        except IOError as err:
+            LOG.exception(err)
+
+        rows = list()
         for file in data_files:
-            data = crawler_files.load_crawl_data(self.crawlname, file, convert=False)
-            tracker.step()  # done loading
-            if "content" in data.columns:
-                data["words"] = data["content"].apply(lambda par: len(str(par).split()))
-                tracker.step()  # done calculating words
-                data_unique = data.drop_duplicates()
-                n_pars = len(data)
-                n_unique_pars = data["content"].nunique()
-                n_words = sum(data["words"])
-                n_words_unique = sum(data_unique["words"])
-                new_row = pd.DataFrame([{"URL": crawler_files.filename2url(file),
-                                         "Paragraphs": n_pars,
-                                         "Unique Paragraphs": n_unique_pars,
-                                         "Words": n_words,
-                                         "Words in Unique Paragraphs": n_words_unique}])
-                stats = stats.append(new_row)
+            file_stats = results[("data", file)]
+            if file_stats is not None:
+                rows.append(dict(URL=crawler_files.filename2url(file, self.crawlname), **file_stats))
             else:
-                LOG.warning(f"{file}.csv is not in the expected format ('content' column missing).")
-
-            tracker.step()  # done processing data file
+                LOG.warning(f"{file} is not in the expected format ('content' column missing).")
+        stats = pd.DataFrame(rows, columns=["URL"] + get_datafile_stats())
         stats = stats.set_index("URL")
 
-        # Analyze log files
-        log_files = list(filter(lambda lf: not lf.startswith("scrapy"), crawler_files.get_logfiles(self.crawlname)))
-        LOG.info(f"Analyzing {len(log_files)} log-files for {self.crawlname}: {log_files}")
+        # merge log file counts
         try:
-            logstats = pd.DataFrame()
-            for fname in log_files:
-                log_content = crawler_files.get_log_content(self.crawlname, fname)
-                tracker.step()  # done loading
-                counts = dict()
-                counts["URL"] = fname
-                counts["Warnings"] = 0
-                counts["Forbidden by robots.txt"] = 0
-
-                for line in log_content.splitlines():
-                    if "WARNING" in line:
-                        counts["Warnings"] += 1
-
-                        if "WARNING - Not allowed:" in line:
-                            reason = line.split(" // ")[1].strip()
-                            if reason not in counts:
-                                counts[reason] = 0
-                            counts[reason] += 1
-                        elif "Forbidden by robots.txt" in line:
-                            counts["Forbidden by robots.txt"] += 1
-                        elif "No features in text." in line:
-                            if not "Langdetect Error" in counts:
-                                counts["Langdetect Error"] = 0
-                            counts["Langdetect Error"] += 1
-
-                logstats = pd.concat([logstats, pd.DataFrame([counts])], sort=False)
-
-                tracker.step()  # done processing log file
-
+            logstats = pd.DataFrame([dict(URL=fname, **results[("log", fname)]) for fname in log_files
+                                     if results[("log", fname)] is not None])
             logstats = logstats.set_index("URL").fillna(0)
-            logstats.index = stats.index.str.replace(".log", "").str.replace("_", "/")
-            logstats.index = stats.index.map(
-                lambda idx: idx if idx in stats.index else idx + CRAWLER_SETTINGS["filemanager"]["incomplete_flag"])
-            # logstats.index = stats.index.str.replace(CRAWLER_SETTINGS["filemanager"]["incomplete_flag"], "")
-            # print(stats.info())
-            # print(logstats.info())
+            # log files are named by url2filename, whatever the layout of the data files, match them to the data rows
+            flag = CRAWLER_SETTINGS["filemanager"]["incomplete_flag"]
+            row_of_log = {crawler_files.url2filename(url[:-len(flag)] if url.endswith(flag) else url): url
+                          for url in stats.index}
+            logstats.index = logstats.index.map(
+                lambda fname: row_of_log.get(fname, crawler_files.filename2url(fname, self.crawlname) + flag))
             stats = pd.concat([stats, logstats], axis=1).fillna(0).astype(int)
         except Exception as err:
             LOG.exception(err)
@@ -222,7 +245,6 @@ class AnalysisWorker(QRunnable):
         analyzer_files.save_stats(self.crawlname, stats)
         LOG.info(f"Done analyzing {self.crawlname}, saved.")
         self._controller.show_data(stats.reset_index())
-        self._controller.analysisStopped.emit()
 
 
 class AnalysisProgressTracker:
@@ -234,8 +256,8 @@ class AnalysisProgressTracker:
 
         self.__update_rate()
 
-    def step(self):
-        self.done += 1
+    def step(self, n=1):
+        self.done += n
         self.__update_rate()
         if self.callback:
             self.callback(self)
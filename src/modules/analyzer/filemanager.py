@@ -20,6 +20,7 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
+import json
 import os
 from modules.crawler import filemanager as crawler_files
 from modules.analyzer import SETTINGS
@@ -43,6 +44,34 @@ def _get_stats_path(crawlname):
     return os.path.join(crawl_path, SETTINGS["files"]["stats_filename"])
 
 
+def get_stats_cache_path(crawlname):
+    """ Returns the path of the per-file result cache that is stored next to the stats of crawlname. """
+    crawl_path = crawler_files.get_crawl_path(crawlname)
+    return os.path.join(crawl_path, SETTINGS["files"]["cache_filename"])
+
+
+def get_log_cursors_path(crawlname):
+    """ Returns the path of the log cursors (see modules.analyzer.logparser) that are stored next to the stats. """
+    crawl_path = crawler_files.get_crawl_path(crawlname)
+    return os.path.join(crawl_path, SETTINGS["files"]["cursors_filename"])
+
+
+def load_log_cursors(crawlname) -> dict:
+    """ Returns the persisted log cursors of crawlname by log file name, an empty dict if there are none. """
+    try:
+        with open(get_log_cursors_path(crawlname), "r") as cursor_file:
+            return json.load(cursor_file)
+    except (IOError, ValueError):
+        return dict()
+
+
+def save_log_cursors(crawlname, cursors: dict):
+    cursors_path = get_log_cursors_path(crawlname)
+    with open(cursors_path + ".tmp", "w") as cursor_file:
+        json.dump(cursors, cursor_file)
+    os.replace(cursors_path + ".tmp", cursors_path)
+
+
 def get_stats(crawlname):
     """ Return pandas.DataFrame if analysis exists, None otherwise. """
     stats_path = _get_stats_path(crawlname)
@@ -0,0 +1,206 @@
+"""
+Single pass analysis of crawl log files.
+Log files are streamed in blocks of complete lines in binary mode, so even multi-GB scrapy logs are analyzed in
+constant memory. Every line is classified by one precompiled regular expression (applied to a whole block at once, which
+keeps the per-line overhead in the regex engine), that recognizes the log level and the messages of
+interest: filter decisions of the crawler ('Not allowed: ... // reason'), robots.txt denials, http status codes of
+crawled and ignored responses, retries, dns errors and timeouts. Lines without a log level, e.g. continuation lines
+of multi-line messages, are skipped.
+Growing logs of running crawls can be analyzed incrementally: a cursor remembers how far a log has been parsed along
+with the counters up to there, so only newly appended bytes are parsed the next time. A cursor is discarded, and the
+log re-scanned, if the file has been replaced (different inode), truncated (smaller than the cursor offset) or
+rewritten (different checksum of its first bytes).
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import re
+import zlib
+from collections import Counter
+
+# increase whenever the counters produced for the same log change, invalidates persisted cursors
+PARSER_VERSION = 1
+
+# names of the counters, they become the columns of the log statistics
+WARNINGS = "Warnings"
+ERRORS = "Errors"
+ROBOTS = "Forbidden by robots.txt"
+LANGDETECT = "Langdetect Error"
+RETRIES = "Retries"
+GAVE_UP = "Gave up retrying"
+DOWNLOAD_ERRORS = "Download errors"
+DNS_ERRORS = "DNS errors"
+TIMEOUTS = "Timeouts"
+HTTP_STATUS = "HTTP {0}"
+
+# Matches the level of both the crawler log format ('... - WARNING - message') and the scrapy log format
+# ('... [scrapy.core.engine] WARNING: message'), followed by at most one of the recognized messages. No part of the
+# pattern matches across line breaks.
+LINE_PATTERN = re.compile(
+    rb"(?:- |\] )(?P<level>DEBUG|INFO|WARNING|ERROR|CRITICAL)(?: -|:) "
+    rb"(?:"
+    rb"Not allowed:.* // *(?P<reason>.*?)[ \t\r]*$"
+    rb"|(?P<robots>Forbidden by robots\.txt)"
+    rb"|Crawled \((?P<crawled>\d{3})\)"
+    rb"|Ignoring response <(?P<ignored>\d{3})"
+    rb"|(?:(?P<retry>Retrying)|(?P<gave_up>Gave up retrying)|(?P<download>Error downloading)) <[^>\n]*>[^:\n]*: *"
+    rb"(?:(?P<dns>DNS lookup failed)|(?P<timeout>.*?(?:[Tt]imeout|timed out)))?"
+    rb"|.*(?P<langdetect>No features in text\.)"
+    rb")?",
+    re.MULTILINE
+)
+
+# number of bytes read at once
+BLOCK_SIZE = 1048576
+# number of bytes at the start of a log that are checksummed to recognize rewritten logs
+HEAD_SIZE = 4096
+
+
+class LogParser:
+    """
+    Accumulates the counters of one or several log files (or parts of them).
+    """
+
+    def __init__(self, counts: dict = None):
+        """ :param counts: Counters to continue from, e.g. those of a previously parsed part of the log. """
+        self.counts = Counter(counts or {})
+        # always report the basic counters, even if they are 0
+        self.counts.update(dict.fromkeys([WARNINGS, ROBOTS], 0))
+
+    def feed(self, data: bytes, endpos: int = None):
+        """ Classifies all lines in data (up to endpos). """
+        counts = self.counts
+        for match in LINE_PATTERN.finditer(data, 0, len(data) if endpos is None else endpos):
+            kind = match.lastgroup
+            level = match.group("level")
+            if level == b"WARNING":
+                counts[WARNINGS] += 1
+            elif level == b"ERROR" or level == b"CRITICAL":
+                counts[ERRORS] += 1
+
+            if kind == "level":
+                continue
+            elif kind == "reason":
+                counts[match.group("reason").decode("utf-8", "replace")] += 1
+            elif kind == "robots":
+                counts[ROBOTS] += 1
+            elif kind == "crawled":
+                counts[HTTP_STATUS.format(match.group("crawled").decode("ascii"))] += 1
+            elif kind == "ignored":
+                # ignored responses have been logged as crawled before, count them only once
+                continue
+            elif kind == "langdetect":
+                counts[LANGDETECT] += 1
+            else:
+                # retry, gave up or download error, possibly with the cause as the last group
+                if match.group("retry"):
+                    counts[RETRIES] += 1
+                elif match.group("gave_up"):
+                    counts[GAVE_UP] += 1
+                else:
+                    counts[DOWNLOAD_ERRORS] += 1
+
+                if kind == "dns":
+                    counts[DNS_ERRORS] += 1
+                elif kind == "timeout":
+                    counts[TIMEOUTS] += 1
+
+    def parse(self, log_file, offset: int = 0, end: int = None) -> int:
+        """
+        Feeds the lines of the binary file object log_file, starting at byte offset.
+        :param end: Byte offset at which to stop, only complete lines (ending with a line break) before end are fed.
+                    Defaults to the end of the file, in which case a trailing partial line is fed too.
+        :return: Byte offset after the last line that has been fed.
+        """
+        log_file.seek(offset)
+        remaining = None if end is None else end - offset
+        rest = b""
+        while remaining is None or remaining > 0:
+            block = log_file.read(BLOCK_SIZE if remaining is None else min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            if remaining is not None:
+                remaining -= len(block)
+
+            block = rest + block
+            cut = block.rfind(b"\n") + 1
+            self.feed(block, cut)
+            offset += cut
+            rest = block[cut:]
+
+        if rest and end is None:
+            self.feed(rest)
+            offset += len(rest)
+        return offset
+
+    def result(self) -> dict:
+        return dict(self.counts)
+
+
+def parse_logfile(path: str) -> dict:
+    """ Counts the warnings, errors and recognized messages in the log file at path. """
+    parser = LogParser()
+    with open(path, "rb") as log_file:
+        parser.parse(log_file)
+    return parser.result()
+
+
+def parse_logfile_incremental(path: str, cursor: dict = None) -> (dict, dict):
+    """
+    Continues parsing the log file at path where cursor left off, or from the start if there is no cursor or it does
+    not match the file anymore.
+    :return: Tuple of the new cursor (json serializable) and the counters of the whole log. A trailing line that is
+             still being written is included in the counters, but will be parsed again next time.
+    """
+    stat = os.stat(path)
+    with open(path, "rb") as log_file:
+        if not _cursor_matches(cursor, stat, log_file):
+            cursor = None
+
+        parser = LogParser(cursor["counts"] if cursor else None)
+        offset = parser.parse(log_file, cursor["offset"] if cursor else 0, stat.st_size)
+        counts = parser.result()
+
+        head_size = min(offset, HEAD_SIZE)
+        log_file.seek(0)
+        new_cursor = {"version": PARSER_VERSION,
+                      "inode": stat.st_ino,
+                      "offset": offset,
+                      "head_size": head_size,
+                      "head": zlib.crc32(log_file.read(head_size)),
+                      "counts": counts}
+
+        if offset < stat.st_size:
+            log_file.seek(offset)
+            parser.feed(log_file.read(stat.st_size - offset))
+
+    return new_cursor, parser.result()
+
+
+def _cursor_matches(cursor: dict, stat: os.stat_result, log_file) -> bool:
+    try:
+        if cursor["version"] != PARSER_VERSION or cursor["inode"] != stat.st_ino or cursor["offset"] > stat.st_size:
+            return False
+        log_file.seek(0)
+        return zlib.crc32(log_file.read(cursor["head_size"])) == cursor["head"]
+    except (TypeError, KeyError):
+        return False
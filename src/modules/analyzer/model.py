@@ -20,31 +20,80 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
+import numpy as np
 from PyQt5.QtCore import Qt
 from PyQt5 import QtCore
 
 
 class PandasModel(QtCore.QAbstractTableModel):
     """
-    Class to populate a table view with a pandas dataframe
+    Class to populate a table view with a pandas dataframe.
+    The columns of the dataframe are cached as numpy arrays once, cells are only formatted when they are requested by
+    the view. Rows are handed to the view in batches (see canFetchMore/fetchMore) and sorting only permutes row
+    positions, so the model stays responsive for tables with millions of rows.
     """
+
+    # number of rows that are made available to the view at once
+    FETCH_BATCH = 1000
+
     def __init__(self, data, parent=None):
         QtCore.QAbstractTableModel.__init__(self, parent)
-        self._data = data
+        self._columns = list(data.columns)
+        self._arrays = [data[col].to_numpy() for col in self._columns]
+        self._total = len(data)
+        self._loaded = min(self._total, self.FETCH_BATCH)
+        # row position in the view -> row position in the dataframe, None while unsorted
+        self._order = None
+        self._sort_cache = dict()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
 
-    def rowCount(self, parent=None):
-        return len(self._data.values)
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
 
-    def columnCount(self, parent=None):
-        return self._data.columns.size
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._loaded < self._total
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, self._total - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
 
     def data(self, index, role=QtCore.Qt.DisplayRole):
         if index.isValid():
             if role == QtCore.Qt.DisplayRole:
-                return str(self._data.values[index.row()][index.column()])
+                row = index.row() if self._order is None else self._order[index.row()]
+                return str(self._arrays[index.column()][row])
         return None
 
     def headerData(self, col, orientation, role):
         if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
-            return self._data.columns[col]
+            return str(self._columns[col])
         return None
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        """ Sorts the rows by column, a negative column restores the original order of the dataframe. """
+        self.beginResetModel()
+        if column < 0 or column >= len(self._columns):
+            self._order = None
+        else:
+            if column not in self._sort_cache:
+                self._sort_cache[column] = self._argsort(self._arrays[column])
+            self._order = self._sort_cache[column]
+            if order == QtCore.Qt.DescendingOrder:
+                self._order = self._order[::-1]
+        self.endResetModel()
+
+    @staticmethod
+    def _argsort(values: np.ndarray) -> np.ndarray:
+        """ Stable ascending order of values. Values that can not be compared with each other are compared as strings. """
+        try:
+            return np.argsort(values, kind="stable")
+        except TypeError:
+            return np.argsort(np.array(list(map(str, values))), kind="stable")
@@ -22,6 +22,7 @@ along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
 from core.QtExtensions import VerticalContainer, HorizontalContainer, FileOpenPushButton, HorizontalSeparator
 
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QLineEdit, QLabel, QPlainTextEdit, QComboBox, QSpacerItem, QSizePolicy, QFrame, QPushButton, \
     QTableView, QProgressBar
 import core
@@ -41,6 +42,9 @@ class AnalyzerView(VerticalContainer):
         self.analyzing_feedback_label = QLabel("Analysis:")
         self.analysis_progress_bar = QProgressBar()
         self.stats_view = QTableView()
+        # start unsorted, sorting by a column header is done by the model on its cached columns
+        self.stats_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.stats_view.setSortingEnabled(True)
 
         title_label = QLabel("<h1>Paragraph Crawl Analyzer</h1>"
                              "<p>Use this tab to create and view statistics of a running or finished crawl. "
@@ -21,7 +21,6 @@ You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>."""
 
 import os
-import validators
 import core
 import toml
 
@@ -45,18 +44,9 @@ def init(main_window):
 
 
 def detect_valid_urls(urls_in):
-    lines = 0
-    invalid = list()
-    urls = list()
-    for line in urls_in:
-        if line and not line.startswith("#"):  # ignore empty lines and comments
-            lines += 1
-            validator_result = validators.url(line)
-            if not validator_result:
-                invalid.append(line)
-            else:
-                urls.append(line)
-    return lines, invalid, urls
+    """ Returns the number of non-empty lines, the invalid lines and the valid urls, see modules.crawler.validation. """
+    from modules.crawler import validation  # imported lazily, validation itself imports from this package
+    return validation.detect_valid_urls(urls_in)
 
 
 def compile_invalid_html(urls):
@@ -0,0 +1,266 @@
+"""
+Catalog of the files in a workspace, kept in an SQLite database in the workspace root.
+Directory listings are answered from the catalog as long as the modification time of the directory is unchanged,
+otherwise the directory is scanned again (only files not known before are stat'ed). This keeps listing large
+workspaces cheap, especially on network mounts, while files created by other processes (e.g. the log files of a
+running crawl) are still noticed. The filemanager records its own writes, including sizes and row counts of data
+files, which a scan can not determine cheaply. Files growing do not change the modification time of their directory,
+callers re-stat the entries that may grow (see WorkspaceCatalog.entries). The catalog only caches the file system and
+can be rebuilt from it at any time.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    dir      TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    trusted  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    dir    TEXT NOT NULL,
+    name   TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size   INTEGER,
+    rows   INTEGER,
+    PRIMARY KEY (dir, name)
+) WITHOUT ROWID;
+"""
+
+# Directories modified less than this many nanoseconds before they were scanned may have been modified again within
+# the resolution of their modification time, their listing is scanned again on the next request.
+RACY_NS = 2 * 10**9
+
+# seconds to wait for a lock held by another process
+LOCK_TIMEOUT = 30.0
+
+
+class WorkspaceCatalog:
+    """
+    Catalog of the workspace at root. Paths passed to the methods are absolute (or relative to the working
+    directory), paths outside of root are not catalogued. Every thread uses its own database connection.
+    """
+
+    def __init__(self, root: str, filename: str):
+        self.root = os.path.abspath(root)
+        self.filename = filename
+        self.path = os.path.join(self.root, filename)
+        self._local = threading.local()
+
+    def listdir(self, path: str) -> [(str, bool)]:
+        """
+        Lists the directory at path like os.listdir, but with a flag telling whether each entry is a directory.
+        :raises OSError: if path is not an existing directory, like os.listdir.
+        """
+        return [(entry["name"], entry["is_dir"]) for entry in self.entries(path)]
+
+    def entries(self, path: str, restat=None) -> [dict]:
+        """
+        Returns the catalog entries (dicts with name, is_dir, size and rows) of the directory at path.
+        :param restat: Predicate on entry names, the matching files are stat'ed again and their sizes updated, e.g.
+                       files that may still be growing, which does not change the modification time of their
+                       directory. Row counts are kept, they are maintained by the writes of the filemanager.
+        """
+        rel = self._relative(path)
+        if rel is None:
+            return [dict(name=entry.name, is_dir=entry.is_dir(), size=None, rows=None) for entry in os.scandir(path)]
+
+        conn = self._connection()
+        self._refresh(conn, rel, path)
+        entries = [dict(name=name, is_dir=bool(is_dir), size=size, rows=rows) for name, is_dir, size, rows in
+                   conn.execute("SELECT name, is_dir, size, rows FROM entries WHERE dir = ?", (rel,))]
+        if restat is not None:
+            self._restat(conn, rel, path, [entry for entry in entries if not entry["is_dir"] and restat(entry["name"])])
+        return entries
+
+    def record(self, path: str, rows: int = None, add_rows: int = None):
+        """
+        Records the current state of the file or directory at path.
+        :param rows: If given, the number of data rows in the file.
+        :param add_rows: If given, the number of data rows that have been appended to the file.
+        """
+        rel = self._relative(path)
+        if rel is None or not rel:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self.remove(path)
+        parent, name = os.path.split(rel)
+        is_dir = os.path.isdir(path)
+
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO entries (dir, name, is_dir) VALUES (?, ?, ?)", (parent, name, is_dir))
+            conn.execute("UPDATE entries SET is_dir = ?, size = ? WHERE dir = ? AND name = ?",
+                         (is_dir, None if is_dir else stat.st_size, parent, name))
+            if rows is not None:
+                conn.execute("UPDATE entries SET rows = ? WHERE dir = ? AND name = ?", (rows, parent, name))
+            elif add_rows:
+                # stays unknown (NULL) if the rows of the file have not been counted before
+                conn.execute("UPDATE entries SET rows = rows + ? WHERE dir = ? AND name = ?",
+                             (add_rows, parent, name))
+
+    def move(self, src: str, dst: str):
+        """ Records that src has been moved to dst, keeping its row count. """
+        rel_src, rel_dst = self._relative(src), self._relative(dst)
+        rows = None
+        if rel_src:
+            conn = self._connection()
+            row = conn.execute("SELECT rows FROM entries WHERE dir = ? AND name = ?", os.path.split(rel_src)).fetchone()
+            rows = row[0] if row else None
+            self.remove(src)
+        if rel_dst:
+            self.record(dst, rows=rows)
+
+    def remove(self, path: str):
+        """ Removes path, and everything below it, from the catalog. """
+        rel = self._relative(path)
+        if rel is None:
+            return
+        conn = self._connection()
+        with conn:
+            if rel:
+                conn.execute("DELETE FROM entries WHERE dir = ? AND name = ?", os.path.split(rel))
+            self._remove_tree(conn, rel)
+
+    def rebuild(self):
+        """ Discards the catalog and scans the whole workspace again. """
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM directories")
+        for dirpath, dirnames, _ in os.walk(self.root):
+            self._refresh(conn, self._relative(dirpath), dirpath)
+
+    def close(self):
+        """ Closes the connection of the calling thread. """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _refresh(self, conn: sqlite3.Connection, rel: str, path: str):
+        """ Scans the directory at path again, unless its catalogued listing is still valid. """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with conn:
+                self._remove_tree(conn, rel)
+            raise
+
+        row = conn.execute("SELECT mtime_ns, trusted FROM directories WHERE dir = ?", (rel,)).fetchone()
+        if row is not None and row[1] and row[0] == stat.st_mtime_ns:
+            return
+
+        scan_start = time.time_ns()
+        known = {name for (name,) in conn.execute("SELECT name FROM entries WHERE dir = ?", (rel,))}
+        found = set()
+        new = list()
+        for entry in os.scandir(path):
+            if not rel and entry.name.startswith(self.filename):
+                continue  # the catalog database itself and its journal files
+            found.add(entry.name)
+            if entry.name not in known:
+                is_dir = entry.is_dir()
+                try:
+                    size = None if is_dir else entry.stat().st_size
+                except OSError:
+                    continue  # vanished in the meantime
+                new.append((rel, entry.name, is_dir, size))
+
+        with conn:
+            for name in known - found:
+                conn.execute("DELETE FROM entries WHERE dir = ? AND name = ?", (rel, name))
+                self._remove_tree(conn, os.path.join(rel, name))
+            conn.executemany("INSERT OR REPLACE INTO entries (dir, name, is_dir, size) VALUES (?, ?, ?, ?)", new)
+            conn.execute("INSERT OR REPLACE INTO directories (dir, mtime_ns, trusted) VALUES (?, ?, ?)",
+                         (rel, stat.st_mtime_ns, stat.st_mtime_ns < scan_start - RACY_NS))
+
+    @staticmethod
+    def _restat(conn: sqlite3.Connection, rel: str, path: str, entries: [dict]):
+        """ Updates the sizes of the given entries of directory rel, in place and in the catalog. """
+        changed = list()
+        for entry in entries:
+            try:
+                size = os.stat(os.path.join(path, entry["name"])).st_size
+            except OSError:
+                continue  # vanished in the meantime, noticed by the next scan
+            if size != entry["size"]:
+                entry["size"] = size
+                changed.append((size, rel, entry["name"]))
+        if changed:
+            with conn:
+                conn.executemany("UPDATE entries SET size = ? WHERE dir = ? AND name = ?", changed)
+
+    @staticmethod
+    def _remove_tree(conn: sqlite3.Connection, rel: str):
+        """ Removes the listings of directory rel and all directories below it. """
+        conn.execute("DELETE FROM directories WHERE dir = ?", (rel,))
+        conn.execute("DELETE FROM entries WHERE dir = ?", (rel,))
+        if rel:
+            # everything below rel, i.e. between rel + sep and rel + the character following sep
+            low, high = rel + os.sep, rel + chr(ord(os.sep) + 1)
+            conn.execute("DELETE FROM directories WHERE dir >= ? AND dir < ?", (low, high))
+            conn.execute("DELETE FROM entries WHERE dir >= ? AND dir < ?", (low, high))
+        else:
+            conn.execute("DELETE FROM directories")
+            conn.execute("DELETE FROM entries")
+
+    def _relative(self, path: str):
+        """ Path relative to the workspace root, '' for the root itself and None for paths outside of it. """
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == os.curdir:
+            return ""
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep) or os.path.isabs(rel):
+            return None
+        return rel
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT)
+            try:
+                # lets readers proceed while a crawl process writes, not available on every (network) file system
+                conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError:
+                pass
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+
+_CATALOGS = dict()
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_catalog(root: str, filename: str) -> WorkspaceCatalog:
+    """ Returns the catalog of the workspace at root, one instance per workspace. """
+    root = os.path.abspath(root)
+    with _CATALOGS_LOCK:
+        if root not in _CATALOGS:
+            _CATALOGS[root] = WorkspaceCatalog(root, filename)
+        return _CATALOGS[root]
@@ -22,11 +22,11 @@ along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
 import validators
 from PyQt5.Qt import Qt
-from PyQt5.QtCore import QStringListModel
+from PyQt5.QtCore import QStringListModel, QTimer
 from PyQt5.QtWidgets import QCompleter, QComboBox, QLineEdit, QPlainTextEdit, QLayout
 
 import core
-from core.QtExtensions import saturate_combobox, build_save_file_connector, delete_layout
+from core.QtExtensions import saturate_combobox, build_save_file_connector, delete_layout, DocumentLines
 from modules.crawler import filemanager, SETTINGS
 from modules.crawler.model import CrawlSpecification
 from crawlUI import APP_SETTINGS
@@ -49,6 +49,15 @@ class CrawlerController(core.ViewController):
         # for now, init with default pipeline
         self.crawl_specification = CrawlSpecification()
 
+        # lines of the url, blacklist and whitelist areas, written to the specification once editing pauses
+        self.area_lines = dict(urls=DocumentLines(view.crawl_specification_view.url_area.document()),
+                               blacklist=DocumentLines(view.crawl_specification_view.blacklist_area.document()),
+                               whitelist=DocumentLines(view.crawl_specification_view.whitelist_area.document()))
+        self.model_versions = dict.fromkeys(self.area_lines)
+        self.model_timer = QTimer()
+        self.model_timer.setSingleShot(True)
+        self.model_timer.setInterval(SETTINGS["ui"]["model_update_delay"])
+
         self.init_elements()
 
         self.setup_behaviour()
@@ -166,10 +175,11 @@ class CrawlerController(core.ViewController):
                                          self._view.initializer_select)
         )
 
-        # trigger model updates
-        self._view.crawl_specification_view.url_area.textChanged.connect(self.update_model)
-        self._view.crawl_specification_view.blacklist_area.textChanged.connect(self.update_model)
-        self._view.crawl_specification_view.whitelist_area.textChanged.connect(self.update_model)
+        # trigger model updates, (re)starting the timer coalesces the edits until it times out
+        self._view.crawl_specification_view.url_area.textChanged.connect(self.model_timer.start)
+        self._view.crawl_specification_view.blacklist_area.textChanged.connect(self.model_timer.start)
+        self._view.crawl_specification_view.whitelist_area.textChanged.connect(self.model_timer.start)
+        self.model_timer.timeout.connect(self.update_area_model)
 
     @DeprecationWarning
     def setup_completion(self):
@@ -234,11 +244,17 @@ class CrawlerController(core.ViewController):
             cnt.update_view()
 
     def update_model(self):
-        # eventually we could enforce urls and blacklist to be sets instead of lists here
-        self.crawl_specification\
-            .update(urls=self._view.crawl_specification_view.url_area.toPlainText().splitlines(),
-                    blacklist=self._view.crawl_specification_view.blacklist_area.toPlainText().splitlines(),
-                    whitelist=self._view.crawl_specification_view.whitelist_area.toPlainText().splitlines())
+        self.update_area_model()
         for cnt in self.sub_controllers:
             cnt.update_model()
         LOG.debug("Crawl specification model updated.")  # this message is triggered very often
+
+    def update_area_model(self):
+        """ Updates urls, blacklist and whitelist of the specification from the areas that have changed since. """
+        self.model_timer.stop()
+        # eventually we could enforce urls and blacklist to be sets instead of lists here
+        changed = {key: lines.lines() for key, lines in self.area_lines.items()
+                   if lines.version != self.model_versions[key]}
+        if changed:
+            self.crawl_specification.update(**changed)
+            self.model_versions.update((key, self.area_lines[key].version) for key in changed)
@@ -33,8 +33,12 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
+import atexit
+import functools
 import os
 import shutil
+import sqlite3
+import threading
 from urllib.parse import urlparse
 
 import pandas
@@ -42,11 +46,21 @@ import core
 
 from core.Workspace import WorkspaceManager
 from modules.crawler.model import CrawlSpecification
-from modules.crawler import SETTINGS
+from modules.crawler import SETTINGS, storage, catalog, manifest, urlmap
 from crawlUI import APP_SETTINGS
 
 LOG = core.simple_logger(modname="crawler", file_path=APP_SETTINGS["general"]["master_log"])
 
+# buffered writers of data files, keyed by (crawl, domain, incomplete)
+_WRITERS = dict()
+_WRITERS_LOCK = threading.Lock()
+
+# loaded crawl manifests and url indexes, keyed by the path of their file
+_MANIFESTS = dict()
+_MANIFESTS_LOCK = threading.Lock()
+_INDEXES = dict()
+_INDEXES_LOCK = threading.Lock()
+
 
 ###
 # retrieve content/information from workspace
@@ -67,10 +81,8 @@ def get_crawl_path(crawlname):
 
 def _get_data_path():
     """ Returns '%workspace-dir%/data/' """
-    data_path = os.path.join(WorkspaceManager().get_workspace(), SETTINGS["filemanager"]["data_dir"])
-    if not os.path.exists(data_path):
-        os.makedirs(data_path, exist_ok=True)
-    return data_path
+    wsm = WorkspaceManager()
+    return wsm.ensure_path(os.path.join(wsm.get_workspace(), SETTINGS["filemanager"]["data_dir"]))
 
 def _get_log_path(crawl_name):
     wsm = WorkspaceManager()
@@ -78,7 +90,7 @@ def _get_log_path(crawl_name):
 
 
 def get_crawl_specification(crawl_name):
-    path = os.path.join(get_crawl_path(), crawl_name + ".json")
+    path = os.path.join(get_crawl_path(crawl_name), crawl_name + ".json")
     if os.path.exists(path):
         return path
     else:
@@ -122,33 +134,188 @@ def get_logfiles(crawl_name, abspath=False):
     fname_list = __get_filenames_of_type(".log", _get_log_path(crawl_name))
     if abspath:
         # return absolute paths with file ending
-        return list(map(lambda fname: os.path.join(os.path.join(wsm.get_log_path(), crawl_name), fname + ".log"),
-                        fname_list))
+        return list(map(lambda fname: get_logfile_path(crawl_name, fname), fname_list))
     else:
         # return a nice list of only the filenames (no file endings)
         return fname_list
 
 
 def get_datafiles(crawl_name, abspath=False):
-    fname_list = __get_filenames_of_type(".csv", _get_crawl_raw_path(crawl_name))
+    # collect data files of every storage backend, the configured backend takes precedence on equal filenames
+    datafiles = dict()
+    for backend in storage.get_storages():
+        for path in _get_datafile_dirs(crawl_name):
+            for fname in __get_filenames_of_type(backend.extension, path):
+                if fname not in datafiles:
+                    datafiles[fname] = os.path.join(path, fname + backend.extension)
+
     if abspath:
         # return absolute paths with file ending
-        return list(map(lambda fname: os.path.join(_get_crawl_raw_path(crawl_name), fname + ".csv"), fname_list))
+        return list(datafiles.values())
     else:
         # return a nice list of only the filenames (no file endings)
-        return fname_list
+        return list(datafiles.keys())
+
+
+def get_datafile_infos(crawl_name) -> [dict]:
+    """
+    Returns a dict for each data file of crawl_name, with its name, absolute path, whether it is incomplete, its size
+    in bytes and its number of rows. Size and rows are None if they are unknown, i.e. the file has not been written
+    through the filemanager since the workspace catalog was built (or the catalog is disabled). Sizes of incomplete
+    data files, which may still be growing, are always current.
+    """
+    def is_incomplete(name):
+        # incomplete data files may be growing, e.g. written by a running crawl
+        return os.path.splitext(name)[0].endswith(SETTINGS["filemanager"]["incomplete_flag"])
+
+    cat = _get_catalog()
+    infos = dict()
+    for path in _get_datafile_dirs(crawl_name):
+        try:
+            if cat is not None:
+                entries = cat.entries(path, restat=is_incomplete)
+            else:
+                entries = [dict(name=entry.name, size=None, rows=None) for entry in os.scandir(path)]
+        except (OSError, sqlite3.Error) as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            continue
+
+        for backend in storage.get_storages():
+            for entry in entries:
+                fname, ext = os.path.splitext(entry["name"])
+                if ext == backend.extension and fname not in infos:
+                    infos[fname] = dict(name=fname, path=os.path.join(path, entry["name"]),
+                                        incomplete=fname.endswith(SETTINGS["filemanager"]["incomplete_flag"]),
+                                        size=entry["size"], rows=entry["rows"])
+    return list(infos.values())
+
+
+def _get_datafile_dirs(crawl_name) -> [str]:
+    """ Returns the raw data directory of crawl_name followed by its shard directories, none if it does not exist. """
+    raw_path = _get_crawl_raw_path(crawl_name)
+    if not os.path.isdir(raw_path):
+        return []
+    shard_chars = SETTINGS["filemanager"]["shard_chars"]
+    shards = [dirname for dirname in __get_filenames_of_type("", raw_path, directories=True)
+              if len(dirname) == shard_chars and urlmap.is_key(dirname.ljust(2 * urlmap.KEY_BYTES, "0"))]
+    return [raw_path] + [os.path.join(raw_path, shard) for shard in sorted(shards)]
+
+
+def get_url_index(crawl_name) -> urlmap.UrlIndex:
+    """ Returns the index of the data file keys of crawl_name. """
+    path = os.path.join(_get_crawl_raw_path(crawl_name), SETTINGS["filemanager"]["index_filename"])
+    with _INDEXES_LOCK:
+        if path not in _INDEXES:
+            _INDEXES[path] = urlmap.UrlIndex(path)
+        return _INDEXES[path]
+
+
+def _get_datafile_base(crawl: str, domain: str, create=False) -> str:
+    """
+    Returns the path of the data file of domain (usually its start url) in crawl, without state flag and extension.
+    :param create: If True and the sharded layout is configured, domain is assigned a key if it does not have one yet.
+    """
+    raw_path = _get_crawl_raw_path(crawl)
+    sharded = SETTINGS["filemanager"].get("layout", "flat") == "sharded"
+    key = get_url_index(crawl).key_for(domain, create=create and sharded)
+    if key is None:
+        return os.path.join(raw_path, domain)
+
+    shard_path = os.path.join(raw_path, urlmap.shard_of(key, SETTINGS["filemanager"]["shard_chars"]))
+    if create:
+        WorkspaceManager().ensure_path(shard_path)
+    return os.path.join(shard_path, key)
+
+
+def _get_datafile_path_of_name(crawl: str, fname: str) -> str:
+    """ Returns the path of the data file named fname (as listed by get_datafiles) in crawl, without extension. """
+    stem = _strip_incomplete_flag(fname)[0]
+    if urlmap.is_key(stem):
+        shard = urlmap.shard_of(stem, SETTINGS["filemanager"]["shard_chars"])
+        return os.path.join(_get_crawl_raw_path(crawl), shard, fname)
+    return os.path.join(_get_crawl_raw_path(crawl), fname)
+
+
+def _strip_incomplete_flag(fname: str) -> (str, str):
+    """ Splits fname into the name without the incomplete flag and the flag (empty if fname does not have it). """
+    flag = SETTINGS["filemanager"]["incomplete_flag"]
+    if fname.endswith(flag):
+        return fname[:-len(flag)], flag
+    return fname, ""
 
 
 def get_incomplete_urls(crawl_name: str, urls: [str]) -> [str]:
-    datafiles = get_datafiles(crawl_name)
-    incomplete = list()
-    for url in urls:
-        fname = url2filename(url)
-        if (fname + SETTINGS["filemanager"]["incomplete_flag"]) in datafiles:
-            incomplete.append(url)
-        elif fname not in datafiles:
-            incomplete.append(url)
-    return incomplete
+    """
+    Returns the urls that have not been crawled completely in crawl_name, i.e. that are neither complete in its
+    manifest nor have a complete data file, e.g. written by the scrapy wrapper. The data files are listed once (through
+    the workspace catalog), the manifest is not modified (see sync_manifest).
+    """
+    complete = get_manifest(crawl_name).get_urls(manifest.COMPLETE)
+    index = get_url_index(crawl_name)
+    for fname in get_datafiles(crawl_name):
+        stem, flag = _strip_incomplete_flag(fname)
+        if not flag:
+            # urls of the sharded layout, and the names of the flat layout
+            complete.add(index.url_for(stem) or stem if urlmap.is_key(stem) else stem)
+    return [url for url in urls if url not in complete and url2filename(url) not in complete]
+
+
+def get_manifest(crawl_name: str) -> manifest.CrawlManifest:
+    """ Returns the manifest of crawl_name, up to date with the events appended by other processes. """
+    crawl_path = WorkspaceManager().ensure_path(get_crawl_path(crawl_name))
+    path = os.path.join(crawl_path, SETTINGS["filemanager"]["manifest_filename"])
+    with _MANIFESTS_LOCK:
+        if path not in _MANIFESTS:
+            _MANIFESTS[path] = manifest.CrawlManifest(path)
+            return _MANIFESTS[path]
+        crawl_manifest = _MANIFESTS[path]
+    crawl_manifest.refresh()
+    return crawl_manifest
+
+
+def get_crawl_progress(crawl_name: str) -> dict:
+    """ Returns the number of start urls of crawl_name per manifest state, without looking at its data files. """
+    return dict(get_manifest(crawl_name).counts())
+
+
+def register_urls(crawl_name: str, urls: [str], running=False):
+    """
+    Adds the urls that are not part of the manifest of crawl_name yet.
+    :param running: If True then all urls are marked as running, i.e. they have been handed to a crawl process.
+    """
+    crawl_manifest = get_manifest(crawl_name)
+    crawl_manifest.add_urls(urls, map(get_datafile_id, urls))
+    if running:
+        crawl_manifest.record_many(urls, state=manifest.RUNNING)
+
+
+def sync_manifest(crawl_name: str) -> manifest.CrawlManifest:
+    """
+    Updates the states in the manifest of crawl_name from its data files, which may have been written by a crawl
+    process that does not maintain the manifest itself.
+    """
+    crawl_manifest = get_manifest(crawl_name)
+    index = get_url_index(crawl_name)
+    file_states = dict()
+    for fname in get_datafiles(crawl_name):
+        stem, flag = _strip_incomplete_flag(fname)
+        if urlmap.is_key(stem):
+            stem = index.url_for(stem) or stem
+        if flag:
+            file_states.setdefault(stem, manifest.INCOMPLETE)
+        else:
+            file_states[stem] = manifest.COMPLETE
+
+    changes = {state: list() for state in manifest.STATES}
+    for url, entry in list(crawl_manifest.entries.items()):
+        # the scrapy wrapper writes its data files in the flat layout
+        state = file_states.get(entry["file"]) or file_states.get(url2filename(url))
+        if state is not None and state != entry["state"]:
+            changes[state].append(url)
+    for state, urls in changes.items():
+        if urls:
+            crawl_manifest.record_many(urls, state=state)
+    return crawl_manifest
 
 
 # get file contents
@@ -171,20 +338,50 @@ def get_whitelist_content(filename):
     return __get_file_content(filepath)
 
 
+def get_logfile_path(crawl_name, filename):
+    """ Returns the absolute path of the log file filename (without file ending) of crawl_name. """
+    return os.path.join(_get_log_path(crawl_name), filename + ".log")
+
+
 def get_log_content(crawl_name, filename):
     if os.path.exists(filename):
         filepath = filename
     else:
-        filepath = os.path.join(_get_log_path(crawl_name), filename + ".log")
+        filepath = get_logfile_path(crawl_name, filename)
     with open(filepath, "r") as log_file:
         content = log_file.read()
     return content
 
 def load_crawl_data(crawl: str, url: str, convert: bool = True):
+    backend, fullpath = _find_datafile(crawl, url, convert)
+    return backend.load(fullpath)
+
+
+def iter_crawl_data(crawl: str, url: str, chunksize: int = None, columns: [str] = None, convert: bool = True):
+    """
+    Streaming variant of load_crawl_data, yields the data of url as dataframes of bounded size.
+    :param crawl: Name of the crawl.
+    :param url: Start url (or data filename if convert is False).
+    :param chunksize: Maximal number of rows per chunk, defaults to the read_chunksize setting.
+    :param columns: If given, only these columns are read, e.g. ["content"].
+    :param convert: If True then url is converted to its data filename first.
+    """
+    backend, fullpath = _find_datafile(crawl, url, convert)
+    return storage.iter_file(fullpath, chunksize=chunksize, columns=columns)
+
+
+def _find_datafile(crawl: str, url: str, convert: bool) -> (storage.DataStorage, str):
+    """ Returns backend and path of the data file of url (or of the data file named url if convert is False). """
     if convert:
-        url = url2filename(url)
-    fullpath = os.path.join(_get_crawl_raw_path(crawl), url + ".csv")
-    return pandas.read_csv(fullpath, sep=None, engine="python")
+        backend, fullpath = storage.find_storage(_get_datafile_base(crawl, url))
+        if backend is None:
+            # data file in the flat layout, e.g. written by the scrapy wrapper
+            backend, fullpath = storage.find_storage(os.path.join(_get_crawl_raw_path(crawl), url2filename(url)))
+    else:
+        backend, fullpath = storage.find_storage(_get_datafile_path_of_name(crawl, url))
+    if backend is None:
+        raise FileNotFoundError("No data file for {0} in crawl {1}.".format(url, crawl))
+    return backend, fullpath
 
 
 ###
@@ -224,7 +421,9 @@ def save_whitelist_content(content, filename):
 
 
 def save_dataframe(crawl: str, name: str, df: pandas.DataFrame):
-    df.to_excel(os.path.join(get_crawl_path(crawl), name + ".xls"))
+    df_file = os.path.join(get_crawl_path(crawl), name + ".xls")
+    df.to_excel(df_file)
+    _update_catalog("record", df_file)
 
 
 def extend_dataframe(crawl: str, name: str, df: pandas.DataFrame):
@@ -247,7 +446,8 @@ def save_crawl_settings(name, settings: CrawlSpecification):
     try:
         filepath = os.path.join(get_crawl_path(name), name + ".json")
 
-        __save_file_content(settings.serialize(), filepath)
+        save_settings_file(filepath, settings)
+        LOG.info("Crawl specification successfully saved to {0}".format(filepath))
     except Exception as exc:
         LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
         return False
@@ -255,31 +455,159 @@ def save_crawl_settings(name, settings: CrawlSpecification):
     return filepath
 
 
+def save_settings_file(path, settings: CrawlSpecification):
+    """ Saves settings to the specification file at path, large url lists are saved to separate line files. """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    for written in settings.write(path, external_threshold=SETTINGS["filemanager"]["spec_list_threshold"]):
+        _update_catalog("record", written)
+    return path
+
+
+def get_shard_settings_path(name, shard: int):
+    return os.path.join(get_crawl_path(name), "{0}.shard-{1}.json".format(name, shard))
+
+
+def save_shard_settings(name, shard_settings: [CrawlSpecification]) -> [str]:
+    """
+    Saves the specifications of the shards of crawl name, replacing those of a previous launch.
+    :return: List of the paths of the shard specifications.
+    """
+    crawl_path = get_crawl_path(name)
+    os.makedirs(crawl_path, exist_ok=True)
+    for fname in os.listdir(crawl_path):
+        if fname.startswith(name + ".shard-"):
+            os.remove(os.path.join(crawl_path, fname))
+            _update_catalog("remove", os.path.join(crawl_path, fname))
+
+    paths = list()
+    for shard, settings in enumerate(shard_settings):
+        paths.append(save_settings_file(get_shard_settings_path(name, shard), settings))
+    LOG.info("Saved {0} shard specifications of crawl {1}".format(len(paths), name))
+    return paths
+
+
+def load_crawl_settings(name) -> CrawlSpecification:
+    """ Loads the specification saved by save_crawl_settings, None if it can not be loaded. """
+    try:
+        spec = CrawlSpecification()
+        spec.read(os.path.join(get_crawl_path(name), name + ".json"))
+        return spec
+    except Exception as exc:
+        LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+        return None
+
+
 def create_csv(crawl: str, domain: str, overwrite=False, incomplete=True):
     """
-    Creates an empty csv only with the head of a crawl dataframe.
+    Creates an empty data file only with the head of a crawl dataframe.
+    Despite its name, the file format is determined by the storage backend configured in the [filemanager] settings.
     :param crawl: Name of the crawl, only to find correct data path
-    :param domain: Domain for which to store content.
+    :param domain: Domain for which to store content, see get_datafile_id.
     :param overwrite: If True then new head-only dataframe will overwrite any preexisting files on the same path,
                       otherwise preexisting csv dataframe may be extended.
     :param incomplete: If True then filename is extended with incomplete_flag
     :return:
     """
+    backend = storage.get_storage()
     inc = SETTINGS["filemanager"]["incomplete_flag"] if incomplete else ""
-    fullpath = os.path.join(_get_crawl_raw_path(crawl), domain + inc + ".csv")
+    fullpath = _get_datafile_base(crawl, domain, create=True) + inc + backend.extension
 
-    if overwrite or not os.path.exists(fullpath):
-        df = pandas.DataFrame(columns=["url", "content", "depth"])
-        df.to_csv(fullpath, sep=";", index=False, encoding="utf-8")
+    if overwrite:
+        # buffered rows belong to the file that is about to be replaced
+        flush_csv(crawl, domain, release=True)
+    existed = os.path.exists(fullpath)
+    backend.create(fullpath, overwrite=overwrite)
+    rows = 0 if overwrite or not existed else None
+    _update_catalog("record", fullpath, rows=rows)
+    get_manifest(crawl).record_file(domain, state=manifest.INCOMPLETE if incomplete else manifest.COMPLETE, rows=rows)
 
 
 def add_to_csv(crawl: str, domain: str, data: dict, incomplete=True):
-    inc = SETTINGS["filemanager"]["incomplete_flag"] if incomplete else ""
-    fullpath = os.path.join(_get_crawl_raw_path(crawl), domain + inc + ".csv")
+    """
+    Adds data to the data file of domain. Writes are buffered, see flush_csv and the write_buffer settings.
+    :param crawl: Name of the crawl.
+    :param domain: Name of the crawled domain/start_url, see get_datafile_id.
+    :param data: dict mapping column names to lists of values
+    :param incomplete: If True then the data is added to the file extended with incomplete_flag
+    """
+    _get_writer(crawl, domain, incomplete).write(data)
+
+
+def flush_csv(crawl: str = None, domain: str = None, release=False):
+    """
+    Writes all buffered data of add_to_csv to disk, optionally restricted to one crawl and/or domain.
+    :param release: If True then the flushed writers are discarded, only use this when no more data is added.
+    """
+    with _WRITERS_LOCK:
+        keys = [key for key in _WRITERS
+                if (crawl is None or key[0] == crawl) and (domain is None or key[1] == domain)]
+        writers = [_WRITERS.pop(key) if release else _WRITERS[key] for key in keys]
+
+    for writer in writers:
+        writer.flush()
+
+
+def _get_writer(crawl: str, domain: str, incomplete: bool) -> storage.BufferedDataWriter:
+    key = (crawl, domain, incomplete)
+    with _WRITERS_LOCK:
+        if key not in _WRITERS:
+            backend = storage.get_storage()
+            inc = SETTINGS["filemanager"]["incomplete_flag"] if incomplete else ""
+            fullpath = _get_datafile_base(crawl, domain, create=True) + inc + backend.extension
+            _WRITERS[key] = storage.BufferedDataWriter(backend, fullpath,
+                                                       max_rows=SETTINGS["filemanager"]["write_buffer_rows"],
+                                                       max_bytes=SETTINGS["filemanager"]["write_buffer_bytes"],
+                                                       max_interval=SETTINGS["filemanager"]["write_buffer_interval"],
+                                                       on_flush=functools.partial(_on_flush, crawl, domain))
+        return _WRITERS[key]
+
+
+def _on_flush(crawl: str, domain: str, path: str, rows: int):
+    _update_catalog("record", path, add_rows=rows)
+    get_manifest(crawl).record_file(domain, add_rows=rows)
+
+
+def store_datafile(crawl: str, src: str, name: str, url: str = None) -> str:
+    """
+    Moves the complete data file src, named name (a path relative to the raw directory of its origin, including the
+    file extension), into the raw directory of crawl, e.g. data files retrieved from a remote crawl.
+    If its url is known, the data file is placed according to the configured layout and its url is recorded as
+    complete in the manifest, otherwise it keeps its name.
+    :return: The path of the stored data file.
+    """
+    ext = os.path.splitext(name)[1]
+    if url is not None:
+        dst = _get_datafile_base(crawl, get_datafile_id(url), create=True) + ext
+    else:
+        dst = os.path.join(_get_crawl_raw_path(crawl), *name.split("/"))
+    WorkspaceManager().ensure_path(os.path.dirname(dst))
+    os.replace(src, dst)
+    _update_catalog("record", dst)
+    if url is not None:
+        register_urls(crawl, [url])
+        get_manifest(crawl).record(url, state=manifest.COMPLETE)
+    return dst
+
+
+def recover_csv(crawl: str):
+    """
+    Repairs the incomplete data files of crawl after an unclean shutdown, e.g. truncating torn journal records.
+    Should be called before an interrupted crawl is continued.
+    """
+    flush_csv(crawl, release=True)
+    for path in get_datafiles(crawl, abspath=True):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name.endswith(SETTINGS["filemanager"]["incomplete_flag"]):
+            storage.get_storage_of(path).recover(path)
+            _update_catalog("record", path)
+
+
+def _shutdown():
+    flush_csv(release=True)
+    storage.close_storages()
 
-    if os.path.exists(fullpath):
-        df = pandas.DataFrame.from_dict(data)
-        df.to_csv(fullpath, mode="a", sep=";", index=False, encoding="utf-8", header=False, line_terminator="")
+
+atexit.register(_shutdown)
 
 
 ###
@@ -298,6 +626,7 @@ def delete_and_clean(path, ignore_empty=False):
     if os.path.exists(path):
         if os.path.isfile(path):
             os.remove(path)
+            _update_catalog("remove", path)
             path = os.path.dirname(path)
 
         # only delete the directory if it is empty, unless otherwise specified
@@ -306,6 +635,9 @@ def delete_and_clean(path, ignore_empty=False):
             shutil.rmtree(path)
             os.makedirs(path)
             os.removedirs(path)
+            # removedirs also removes empty parent directories, e.g. the workspace data directory
+            WorkspaceManager().invalidate_paths()
+            _update_catalog("remove", path)
 
 
 def remove_crawl_content(crawl: str):
@@ -316,20 +648,58 @@ def make_raw_data_path(crawl: str):
     path = _get_crawl_raw_path(crawl)
     if not os.path.exists(path):
         os.makedirs(path)
+        _update_catalog("record", path)
 
 
 def complete_csv(crawl: str, domain: str):
     """
-    Switches a crawl data csv file from its incomplete state to the complete state, i.e. only renaming the file.
+    Switches a crawl data file from its incomplete state to the complete state, i.e. renaming the file
+    (and possibly compacting it, depending on the storage backend it was written with).
     :param crawl: Name of the crawl.
-    :param domain: Name of the crawled domain/start_url.
+    :param domain: Name of the crawled domain/start_url, see get_datafile_id.
     :return:
     """
-    crawl_path = _get_crawl_raw_path(crawl)
-    fullpath_inc = os.path.join(crawl_path, domain + SETTINGS["filemanager"]["incomplete_flag"] + ".csv")
-    fullpath_com = os.path.join(crawl_path, domain + ".csv")
+    flush_csv(crawl, domain, release=True)
+
+    base = _get_datafile_base(crawl, domain)
+    backend, fullpath_inc = storage.find_storage(base + SETTINGS["filemanager"]["incomplete_flag"])
+    if backend is None:
+        LOG.error("No incomplete data file for {0} in crawl {1}.".format(domain, crawl))
+        return
+    fullpath_com = base + backend.extension
+
+    backend.complete(fullpath_inc, fullpath_com)
+    _update_catalog("move", fullpath_inc, fullpath_com)
+    get_manifest(crawl).record_file(domain, state=manifest.COMPLETE)
+
+
+###
+# workspace catalog
+###
+
+def _get_catalog():
+    """ Returns the catalog of the current workspace, None if it is disabled by the catalog setting. """
+    if not SETTINGS["filemanager"].get("catalog", False):
+        return None
+    return catalog.get_catalog(WorkspaceManager().get_workspace(), SETTINGS["filemanager"]["catalog_filename"])
+
+
+def _update_catalog(method: str, *args, **kwargs):
+    """ Calls method of the workspace catalog to record a change made by the filemanager. """
+    cat = _get_catalog()
+    if cat is None:
+        return
+    try:
+        getattr(cat, method)(*args, **kwargs)
+    except sqlite3.Error as exc:
+        LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
 
-    shutil.move(fullpath_inc, fullpath_com)
+
+def rebuild_catalog():
+    """ Rebuilds the catalog of the current workspace from disk, e.g. after files have been changed manually. """
+    cat = _get_catalog()
+    if cat is not None:
+        cat.rebuild()
 
 
 ###
@@ -340,8 +710,8 @@ def __get_filenames_of_type(ext, path, directories=False) -> list:
     filenames = []
 
     try:
-        for filename in os.listdir(path):
-            if directories and os.path.isdir(os.path.join(path, filename)):
+        for filename, is_dir in __listdir(path):
+            if directories and is_dir:
                 filenames.append(filename)
             elif not directories and filename.endswith(ext):
                 filenames.append(os.path.splitext(filename)[0])
@@ -353,6 +723,17 @@ def __get_filenames_of_type(ext, path, directories=False) -> list:
     return filenames
 
 
+def __listdir(path) -> [(str, bool)]:
+    """ Lists the names in directory path along with whether they are directories, from the catalog if enabled. """
+    cat = _get_catalog()
+    if cat is not None:
+        try:
+            return cat.listdir(path)
+        except sqlite3.Error as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+    return [(entry.name, entry.is_dir()) for entry in os.scandir(path)]
+
+
 def __get_file_content(path):
     content = ""
     try:
@@ -371,15 +752,36 @@ def __save_file_content(content, path):
         os.makedirs(os.path.abspath(os.path.join(path, os.pardir)), exist_ok=True)
         with open(path, "w") as out_file:
             out_file.write(content)
+        _update_catalog("record", path)
         LOG.info("Content successfully saved to {0}".format(path))
     except IOError as exc:
         LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
 
 
+def get_datafile_id(url):
+    """
+    Returns the name under which the data of the start url is written, i.e. the domain argument of create_csv,
+    add_to_csv and complete_csv: the url itself in the sharded layout and url2filename(url) in the flat layout.
+    """
+    if SETTINGS["filemanager"].get("layout", "flat") == "sharded":
+        return url
+    return url2filename(url)
+
+
 def url2filename(url):
+    """ Data file name of url in the flat layout, not collision-free. """
     return (urlparse(url).netloc + urlparse(url).path).replace("/", "_")
 
 
-def filename2url(url):
-    """ Reconvert a url to a filename, careful: if url contained _ before, it will not be correctly reconverted"""
+def filename2url(url, crawl=None):
+    """
+    Reconvert a data file name (as listed by get_datafiles) to its url. Names of the sharded layout are looked up in
+    the url index of crawl, an incomplete flag is kept. Careful: names of the flat layout are not reversible, if the
+    url contained _ before, it will not be correctly reconverted.
+    """
+    stem, flag = _strip_incomplete_flag(url)
+    if crawl is not None and urlmap.is_key(stem):
+        original = get_url_index(crawl).url_for(stem)
+        if original is not None:
+            return original + flag
     return (urlparse(url).netloc + urlparse(url).path).replace("_", "/")
@@ -0,0 +1,325 @@
+"""
+Persistent queue of local crawl jobs. A job is a saved crawl specification (a whole crawl or one of its shards) that
+is waiting for, or running in, an OWS-scrapy-wrapper process. The queue is stored as json in the workspace root, so
+that queued jobs survive restarts of the application, and every change is made under a lock file, so that the
+application and a headless runner can use the queue of the same workspace at the same time.
+schedule starts queued jobs in the order they were enqueued, as long as at most max_jobs jobs are running and the
+start urls of all running jobs do not exceed max_urls (a single job with more urls is started when no other job is
+running). The processes are launched and restarted by the crawl supervisor (see modules.crawler.supervisor).
+Run from the src directory to use the queue without the GUI:
+
+    python -m modules.crawler.jobqueue [--workspace PATH] enqueue CRAWL [--shards N]
+    python -m modules.crawler.jobqueue [--workspace PATH] run [--forever]
+    python -m modules.crawler.jobqueue [--workspace PATH] list|clear
+    python -m modules.crawler.jobqueue [--workspace PATH] cancel JOB ...
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from core.Workspace import WorkspaceManager
+from modules.crawler import filelock, filemanager, supervisor, SETTINGS, LOG
+from modules.crawler.model import CrawlSpecification
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+CANCELLED = "cancelled"
+JOB_STATES = [QUEUED, RUNNING, FINISHED, FAILED, CANCELLED]
+ACTIVE_STATES = [QUEUED, RUNNING]
+
+
+def get_max_jobs() -> int:
+    """ Maximal number of running jobs, the max_jobs setting or the number of cpus if it is 0. """
+    return SETTINGS["queue"]["max_jobs"] or os.cpu_count() or 1
+
+
+class JobQueue:
+    """
+    Queue of the crawl jobs of one workspace, stored as json in the file at path. Each job is a dict with the keys id,
+    crawl, spec, weight (the number of start urls), state, enqueued, started, finished and process (the id of its
+    entry in the crawl supervisor).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enqueue(self, crawl: str, spec_path: str, weight: int = None) -> str:
+        """
+        Adds a job for the specification of crawl at spec_path, weight defaults to the number of its start urls.
+        :return: The id of the job.
+        """
+        if weight is None:
+            spec = CrawlSpecification()
+            spec.read(spec_path)
+            weight = len(spec.urls)
+        with self._transaction():
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = dict(id=job_id, crawl=crawl, spec=spec_path, weight=weight, state=QUEUED,
+                                      enqueued=time.time(), started=None, finished=None, process=None)
+        LOG.info("Queued job {0} for crawl {1} with {2} urls".format(job_id, crawl, weight))
+        return job_id
+
+    def schedule(self) -> [dict]:
+        """
+        Updates the states of the running jobs from the crawl supervisor and starts queued jobs as far as the limits
+        allow. Queued jobs are started strictly in order, a job that does not fit holds back all jobs after it.
+        :return: Copies of all jobs.
+        """
+        crawl_supervisor = supervisor.get_supervisor()
+        with self._transaction():
+            # polled under the lock, so that the processes of jobs started by other applications are known
+            crawl_supervisor.poll()
+            for job in self._jobs.values():
+                if job["state"] == RUNNING:
+                    self._update_running(job, crawl_supervisor)
+
+            running = [job for job in self._jobs.values() if job["state"] == RUNNING]
+            for job in [job for job in self._jobs.values() if job["state"] == QUEUED]:
+                if not self._fits(job, running):
+                    break
+                try:
+                    job.update(process=crawl_supervisor.launch(job["crawl"], job["spec"]), state=RUNNING,
+                               started=time.time())
+                    running.append(job)
+                except Exception as exc:
+                    LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+                    job.update(state=FAILED, finished=time.time())
+            return [dict(job) for job in self._jobs.values()]
+
+    def cancel(self, job_id: str):
+        """ Removes a queued job from the schedule, or stops the process of a running one. """
+        with self._transaction():
+            job = self._jobs[job_id]
+            if job["state"] == RUNNING:
+                supervisor.get_supervisor().stop(job["process"])
+            if job["state"] in ACTIVE_STATES:
+                LOG.info("Cancelling job {0} of crawl {1}".format(job_id, job["crawl"]))
+                job.update(state=CANCELLED, finished=time.time())
+
+    def clear(self):
+        """ Removes all jobs that are neither queued nor running. """
+        with self._transaction():
+            for job_id in [job_id for job_id, job in self._jobs.items() if job["state"] not in ACTIVE_STATES]:
+                del self._jobs[job_id]
+
+    def get_jobs(self, crawl: str = None, active=False) -> [dict]:
+        """ Returns copies of the jobs (of crawl), only those that are queued or running if active is True. """
+        with self._transaction(write=False):
+            return [dict(job) for job in self._jobs.values()
+                    if (crawl is None or job["crawl"] == crawl) and (not active or job["state"] in ACTIVE_STATES)]
+
+    def status(self, crawl: str) -> Counter:
+        """ Returns the number of jobs of crawl per state. """
+        return Counter(job["state"] for job in self.get_jobs(crawl))
+
+    @staticmethod
+    def _update_running(job: dict, crawl_supervisor: supervisor.CrawlSupervisor):
+        try:
+            state = crawl_supervisor.get_state(job["process"])
+        except KeyError:
+            LOG.warning("The process of job {0} is not in the process registry anymore".format(job["id"]))
+            state = supervisor.FAILED
+        if state == supervisor.FINISHED:
+            job.update(state=FINISHED, finished=time.time())
+        elif state == supervisor.FAILED:
+            job.update(state=FAILED, finished=time.time())
+        elif state == supervisor.STOPPED:
+            job.update(state=CANCELLED, finished=time.time())
+
+    @staticmethod
+    def _fits(job: dict, running: [dict]) -> bool:
+        if len(running) >= get_max_jobs():
+            return False
+        max_urls = SETTINGS["queue"]["max_urls"]
+        return not max_urls or not running or sum(other["weight"] for other in running) + job["weight"] <= max_urls
+
+    @contextmanager
+    def _transaction(self, write=True):
+        """ Reloads the queue while holding the lock file and writes it afterwards if write is True. """
+        with self._lock, filelock.locked(self.path):
+            self._load()
+            yield
+            if write:
+                self._save()
+
+    def _load(self):
+        self._jobs.clear()
+        try:
+            with open(self.path, encoding="utf-8") as queue_file:
+                jobs = json.load(queue_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            LOG.warning("Could not read the job queue {0}: {1}".format(self.path, exc))
+            return
+        for job in jobs:
+            self._jobs[job["id"]] = job
+
+    def _save(self):
+        done = [job_id for job_id, job in self._jobs.items() if job["state"] not in ACTIVE_STATES]
+        for job_id in done[:max(len(done) - SETTINGS["queue"]["history"], 0)]:
+            del self._jobs[job_id]
+
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as queue_file:
+                json.dump(list(self._jobs.values()), queue_file, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+
+
+_QUEUES = dict()
+_QUEUES_LOCK = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    """ Returns the job queue of the current workspace, one instance per workspace. """
+    path = os.path.join(WorkspaceManager().get_workspace(), SETTINGS["queue"]["queue_filename"])
+    with _QUEUES_LOCK:
+        if path not in _QUEUES:
+            _QUEUES[path] = JobQueue(path)
+        return _QUEUES[path]
+
+
+class ScheduleSignals(QObject):
+
+    # emits a dict with the jobs, the supervisor entries and the manifest progress (see ScheduleWorker)
+    finished = pyqtSignal(object)
+    # emits the exception that stopped the scheduling round
+    failed = pyqtSignal(object)
+
+
+class ScheduleWorker(QRunnable):
+    """
+    Runs a scheduling round of the job queue of the current workspace and collects the state shown by the GUI:
+    the jobs, the supervisor entries and the number of start urls of crawl per manifest state (None without crawl).
+    """
+
+    def __init__(self, crawl: str = None):
+        super().__init__()
+        self.crawl = crawl
+        self.signals = ScheduleSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            jobs = get_queue().schedule()
+            entries = supervisor.get_supervisor().get_entries()
+            progress = None if self.crawl is None else filemanager.sync_manifest(self.crawl).counts()
+        except Exception as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            self.signals.failed.emit(exc)
+            return
+        self.signals.finished.emit(dict(jobs=jobs, entries=entries, progress=progress))
+
+
+_THREADPOOL = None
+
+
+def schedule_in_background(crawl: str, on_finished, on_failed) -> ScheduleWorker:
+    """
+    Runs a scheduling round of the job queue in a background thread, so that polling the processes, restarting them
+    and syncing the manifest of crawl do not block the GUI. on_finished is called with the result of the ScheduleWorker,
+    on_failed with the exception if the round failed, both in the thread of the calling QObject (the GUI thread).
+    """
+    global _THREADPOOL
+    if _THREADPOOL is None:
+        _THREADPOOL = QThreadPool()
+
+    worker = ScheduleWorker(crawl)
+    worker.signals.finished.connect(on_finished)
+    worker.signals.failed.connect(on_failed)
+    _THREADPOOL.start(worker)
+    return worker
+
+
+def run(forever=False):
+    """ Schedules the jobs of the current workspace until no job is queued or running anymore (or forever). """
+    queue = get_queue()
+    while True:
+        jobs = queue.schedule()
+        if not forever and not any(job["state"] in ACTIVE_STATES for job in jobs):
+            break
+        time.sleep(SETTINGS["queue"]["poll_interval"])
+
+
+def main():
+    from modules.crawler import launcher  # imported lazily, launcher enqueues its jobs through this module
+
+    parser = argparse.ArgumentParser(description="Manages the local crawl job queue of a workspace.")
+    parser.add_argument("--workspace", help="workspace directory, the default workspace by default")
+    commands = parser.add_subparsers(dest="command")
+    enqueue = commands.add_parser("enqueue", help="queue the saved specification of a crawl")
+    enqueue.add_argument("crawl", help="name of the crawl")
+    enqueue.add_argument("--shards", type=int, default=SETTINGS["launcher"]["shards"],
+                         help="number of jobs the start urls are split into")
+    run_command = commands.add_parser("run", help="start queued jobs until all jobs have exited")
+    run_command.add_argument("--forever", action="store_true", help="keep waiting for new jobs")
+    commands.add_parser("list", help="list all jobs")
+    commands.add_parser("clear", help="remove all jobs that have exited")
+    cancel = commands.add_parser("cancel", help="cancel queued or running jobs")
+    cancel.add_argument("jobs", nargs="+", help="ids of the jobs")
+    args = parser.parse_args()
+
+    if args.workspace:
+        WorkspaceManager().set_workspace(os.path.abspath(args.workspace))
+
+    if args.command == "enqueue":
+        spec = filemanager.load_crawl_settings(args.crawl)
+        if spec is None:
+            parser.error("No saved specification of crawl {0}".format(args.crawl))
+        try:
+            launcher.launch_crawl(spec, filemanager.get_crawl_specification(args.crawl), shards=args.shards)
+        except ValueError as exc:
+            parser.error(str(exc))
+        filemanager.register_urls(args.crawl, spec.urls)
+    elif args.command == "run":
+        run(forever=args.forever)
+    elif args.command == "list":
+        for job in get_queue().get_jobs():
+            print("{0}  {1:<9}  {2:>8} urls  {3}  {4}".format(job["id"], job["state"], job["weight"], job["crawl"],
+                                                              job["spec"]))
+    elif args.command == "clear":
+        get_queue().clear()
+    elif args.command == "cancel":
+        for job_id in args.jobs:
+            get_queue().cancel(job_id)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
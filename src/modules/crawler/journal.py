@@ -0,0 +1,196 @@
+"""
+Append-only journal files for crawl output.
+A journal starts with a short file header, followed by framed records. Every record frame consists of the payload
+length and the crc32 checksum of the payload (both unsigned 32 bit little endian integers) and the payload itself.
+Records are written in batches and several batches share one fsync (group commit). After each fsync the durable
+end of the journal is noted in a small checkpoint file next to the journal, so that the recovery scan after a crash
+only has to verify the frames written after the last checkpoint and can truncate a torn tail without parsing the
+whole file.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"OWSJ\x01\x00\x00\x00"
+FRAME_HEADER = struct.Struct("<II")
+# frames claiming a larger payload are considered corrupt
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+CHECKPOINT_EXTENSION = ".ckpt"
+
+
+class JournalError(Exception):
+    pass
+
+
+class Journal:
+    """
+    Append handle of a single journal file. Appended records become durable with the next sync, which happens
+    automatically once sync_bytes bytes are pending or sync_interval seconds have passed since the last sync.
+    A closed journal is reopened by the next append, so idle journals do not need to hold a file descriptor.
+    """
+
+    def __init__(self, path: str, sync_bytes=1048576, sync_interval=1.0):
+        self.path = path
+        self.sync_bytes = sync_bytes
+        self.sync_interval = sync_interval
+
+        if not os.path.exists(path):
+            create(path)
+
+        end, records = recover(path)
+        self.records = records
+
+        self._file = open(path, "ab")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def append(self, payloads: [bytes]):
+        """ Appends one frame per payload with a single write and syncs if the group commit limits are reached. """
+        frames = bytearray()
+        for payload in payloads:
+            frames += FRAME_HEADER.pack(len(payload), zlib.crc32(payload))
+            frames += payload
+
+        with self._lock:
+            if self._file.closed:
+                # not "ab", a journal that has been moved or removed in the meantime must not be recreated
+                self._file = open(self.path, "r+b")
+                self._file.seek(0, os.SEEK_END)
+            self._file.write(frames)
+            self.records += len(payloads)
+            self._pending += len(frames)
+
+            if self._pending >= self.sync_bytes or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        """ Syncs and closes the journal file, until the next append. """
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def _sync(self):
+        if self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            write_checkpoint(self.path, self._file.tell(), self.records)
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+
+def create(path: str):
+    """ Creates an empty journal at path, replacing any existing file. """
+    with open(path, "wb") as journal_file:
+        journal_file.write(MAGIC)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+    remove_checkpoint(path)
+
+
+def recover(path: str) -> (int, int):
+    """
+    Verifies the frames of the journal at path, starting at the last checkpoint if there is a valid one, and
+    truncates the file after the last intact frame.
+    :return: Tuple of the byte offset of the end of the journal and the number of records it contains.
+    """
+    size = os.path.getsize(path)
+    offset, records = read_checkpoint(path)
+    if offset is None or offset > size:
+        offset, records = len(MAGIC), 0
+
+    with open(path, "rb") as journal_file:
+        if journal_file.read(len(MAGIC)) != MAGIC:
+            raise JournalError("{0} is not a journal file.".format(path))
+
+        journal_file.seek(offset)
+        for _ in _read_frames(journal_file):
+            records += 1
+        end = journal_file.tell()
+
+    if end < size:
+        with open(path, "r+b") as journal_file:
+            journal_file.truncate(end)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+    write_checkpoint(path, end, records)
+
+    return end, records
+
+
+def read(path: str):
+    """ Yields the payloads of all intact frames of the journal at path. """
+    with open(path, "rb") as journal_file:
+        if journal_file.read(len(MAGIC)) != MAGIC:
+            raise JournalError("{0} is not a journal file.".format(path))
+        yield from _read_frames(journal_file)
+
+
+def _read_frames(journal_file):
+    """ Yields payloads until the end of file or the first torn or corrupt frame, the file is left after the last
+    intact frame. """
+    while True:
+        start = journal_file.tell()
+        header = journal_file.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            journal_file.seek(start)
+            return
+
+        length, checksum = FRAME_HEADER.unpack(header)
+        payload = journal_file.read(length) if length <= MAX_PAYLOAD else b""
+        if len(payload) < length or length > MAX_PAYLOAD or zlib.crc32(payload) != checksum:
+            journal_file.seek(start)
+            return
+
+        yield payload
+
+
+def read_checkpoint(path: str) -> (int, int):
+    try:
+        with open(path + CHECKPOINT_EXTENSION, "r") as ckpt_file:
+            ckpt = json.load(ckpt_file)
+        return int(ckpt["offset"]), int(ckpt["records"])
+    except (IOError, ValueError, KeyError, TypeError):
+        return None, None
+
+
+def write_checkpoint(path: str, offset: int, records: int):
+    tmp_path = path + CHECKPOINT_EXTENSION + ".tmp"
+    with open(tmp_path, "w") as ckpt_file:
+        json.dump({"offset": offset, "records": records}, ckpt_file)
+    os.replace(tmp_path, path + CHECKPOINT_EXTENSION)
+
+
+def remove_checkpoint(path: str):
+    if os.path.exists(path + CHECKPOINT_EXTENSION):
+        os.remove(path + CHECKPOINT_EXTENSION)
@@ -0,0 +1,96 @@
+"""
+Launching of local crawls through the local job queue.
+A crawl can be split into shards, each a crawl specification with a part of the start urls. All start urls of a host
+are placed in the same shard, so that the politeness settings of scrapy (which apply per host) still hold for the
+whole crawl. Every shard is queued as a job of the local job queue (see modules.crawler.jobqueue), which starts its
+wrapper process as soon as the concurrency limits allow. All shards write to the same data and log directories and
+manifest.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import copy
+import heapq
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from modules.crawler import filemanager, jobqueue
+from modules.crawler.model import CrawlSpecification
+
+
+def get_host(url: str) -> str:
+    try:
+        return urlparse(url).hostname or url
+    except ValueError:
+        return url
+
+
+def split_by_host(urls: [str], shards: int) -> [[str]]:
+    """
+    Splits urls into at most shards lists of about the same length, keeping all urls of a host in the same list and
+    the urls of each list in their original order. Lists that would be empty are omitted.
+    """
+    hosts = OrderedDict()
+    for url in urls:
+        hosts.setdefault(get_host(url), list()).append(url)
+
+    # largest hosts first, each to the shard with the fewest urls so far
+    loads = [(0, shard) for shard in range(max(min(shards, len(hosts)), 1))]
+    shard_of_host = dict()
+    for host in sorted(hosts, key=lambda h: len(hosts[h]), reverse=True):
+        load, shard = heapq.heappop(loads)
+        shard_of_host[host] = shard
+        heapq.heappush(loads, (load + len(hosts[host]), shard))
+
+    result = [list() for _ in loads]
+    for url in urls:
+        result[shard_of_host[get_host(url)]].append(url)
+    return [shard_urls for shard_urls in result if shard_urls]
+
+
+def get_shard_specifications(spec: CrawlSpecification, shards: int) -> [CrawlSpecification]:
+    """ Returns one copy of spec per shard, each with its part of the start urls. """
+    shard_specs = list()
+    for shard_urls in split_by_host(spec.urls, shards):
+        shard_spec = copy.copy(spec)
+        shard_spec.update(urls=shard_urls)
+        shard_specs.append(shard_spec)
+    return shard_specs
+
+
+def launch_crawl(spec: CrawlSpecification, settings_path: str, shards: int = 1) -> [str]:
+    """
+    Queues the crawl of spec, whose (complete) specification has been saved at settings_path, as a single job or split
+    into shards, one job per shard.
+    :raises ValueError: If the crawl still has queued or running jobs.
+    :return: The ids of the queued jobs.
+    """
+    queue = jobqueue.get_queue()
+    if queue.get_jobs(spec.name, active=True):
+        raise ValueError("The crawl {0} still has queued or running jobs.".format(spec.name))
+
+    if shards <= 1 or len(spec.urls) <= 1:
+        return [queue.enqueue(spec.name, settings_path, weight=len(spec.urls))]
+
+    shard_specs = get_shard_specifications(spec, shards)
+    shard_paths = filemanager.save_shard_settings(spec.name, shard_specs)
+    return [queue.enqueue(spec.name, path, weight=len(shard_spec.urls))
+            for path, shard_spec in zip(shard_paths, shard_specs)]
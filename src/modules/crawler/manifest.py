@@ -0,0 +1,209 @@
+"""
+Per-crawl manifest of the state of every start url.
+The manifest is an append-only file of json lines, each line an event that updates the entry of one url: its state
+(pending, running, incomplete or complete), the data file it is written to and the number of rows written so far.
+Replaying the events on load yields the current entries, so resuming a crawl or showing its progress does not need
+to look at the data files. Events are appended under a lock file (see modules.crawler.filelock) and events appended
+by another process are picked up by refresh, a torn last line (e.g. after a crash) is ignored.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+from modules.crawler import filelock
+
+PENDING = "pending"
+RUNNING = "running"
+INCOMPLETE = "incomplete"
+COMPLETE = "complete"
+STATES = [PENDING, RUNNING, INCOMPLETE, COMPLETE]
+
+# the manifest is rewritten with one event per url once it holds this many times more events than urls
+COMPACT_RATIO = 4
+
+
+class CrawlManifest:
+    """
+    Entries of the start urls of one crawl, each a dict with the keys state, file and rows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = dict()
+        self._by_file = dict()
+        self._events = 0
+        self._offset = 0
+        self._header = None  # first line of the manifest file that has been read up to _offset
+        self._lock = threading.RLock()
+        self.refresh()
+
+    def refresh(self):
+        """ Replays the events that have been appended to the manifest file since it was last read. """
+        with self._lock:
+            try:
+                manifest_file = open(self.path, "rb")
+            except FileNotFoundError:
+                self._reset()
+                return
+            with manifest_file:
+                header = manifest_file.readline()
+                size = os.fstat(manifest_file.fileno()).st_size
+                if header != self._header or size < self._offset:
+                    # the manifest has been compacted (replaced, with a new header) or truncated, start over
+                    self._reset()
+                    self._header = header
+                if size == self._offset:
+                    return
+
+                manifest_file.seek(self._offset)
+                for line in manifest_file:
+                    if not line.endswith(b"\n"):
+                        break  # torn or still being written
+                    self._offset += len(line)
+                    try:
+                        self._apply(json.loads(line.decode("utf-8")))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+    def state(self, url: str) -> str:
+        """ Returns the state of url, None if it is not part of the manifest. """
+        entry = self.entries.get(url)
+        return entry["state"] if entry else None
+
+    def url_of(self, file: str):
+        """ Returns the url whose data is written to file (data file name without extension or state flag). """
+        return self._by_file.get(file)
+
+    def get_urls(self, *states) -> set:
+        """ Returns the set of urls in one of the given states. """
+        return {url for url, entry in self.entries.items() if entry["state"] in states}
+
+    def counts(self) -> Counter:
+        """ Returns the number of urls per state. """
+        return Counter(entry["state"] for entry in self.entries.values())
+
+    def add_urls(self, urls: [str], files: [str]):
+        """ Adds the urls that are not part of the manifest yet as pending, their data is written to files. """
+        with self._writing():
+            self._append([{"url": url, "state": PENDING, "file": file} for url, file in zip(urls, files)
+                          if url not in self.entries])
+
+    def record(self, url: str, state: str = None, rows: int = None, add_rows: int = None):
+        """ Updates the entry of url, fields that are None are kept. """
+        self.record_many([url], state=state, rows=rows, add_rows=add_rows)
+
+    def record_many(self, urls: [str], state: str = None, rows: int = None, add_rows: int = None):
+        """ Updates the entries of all urls with a single write, fields that are None are kept. """
+        with self._writing():
+            events = list()
+            for url in urls:
+                event = {"url": url}
+                for key, value in (("state", state), ("rows", rows), ("add_rows", add_rows)):
+                    if value is not None:
+                        event[key] = value
+                events.append(event)
+            self._append(events)
+
+    def record_file(self, file: str, state: str = None, rows: int = None, add_rows: int = None):
+        """ Updates the entry of the url whose data is written to file, if there is one. """
+        url = self.url_of(file)
+        if url is not None:
+            self.record(url, state=state, rows=rows, add_rows=add_rows)
+
+    def rename_file(self, file: str, new_file: str):
+        """ Records that the data of the url written to file is written to new_file from now on. """
+        with self._writing():
+            url = self.url_of(file)
+            if url is not None:
+                self._append([{"url": url, "file": new_file}])
+
+    def compact(self):
+        """ Rewrites the manifest with a single event per url. """
+        with self._writing():
+            self._compact()
+
+    @contextmanager
+    def _writing(self):
+        """
+        Holds the lock of the manifest file, shared with other processes, and replays their events first, so that
+        changes are based on the current entries and nothing appended by others is skipped.
+        """
+        with self._lock, filelock.locked(self.path):
+            self.refresh()
+            yield
+
+    def _compact(self):
+        # a unique first line, which tells other processes that the manifest has to be read again from the start
+        header = json.dumps({"compacted": uuid.uuid4().hex}) + "\n"
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+            manifest_file.write(header)
+            for url, entry in self.entries.items():
+                manifest_file.write(json.dumps(dict(entry, url=url)) + "\n")
+        os.replace(tmp_path, self.path)
+        self._events = len(self.entries)
+        self._offset, self._header = os.path.getsize(self.path), header.encode("utf-8")
+
+    def _reset(self):
+        self.entries, self._by_file, self._events, self._offset, self._header = dict(), dict(), 0, 0, None
+
+    def _append(self, events: [dict]):
+        """ Appends events to the manifest file, only while _writing. """
+        if not events:
+            return
+        data = "".join(json.dumps(event) + "\n" for event in events).encode("utf-8")
+        with open(self.path, "a+b") as manifest_file:
+            if manifest_file.seek(0, os.SEEK_END) > self._offset:
+                # a torn line from an interrupted write, start on a new line
+                data = b"\n" + data
+            manifest_file.write(data)
+            self._offset = manifest_file.tell()
+            if self._header is None:
+                manifest_file.seek(0)
+                self._header = manifest_file.readline()
+        for event in events:
+            self._apply(event)
+
+        if self._events > COMPACT_RATIO * max(len(self.entries), 1024):
+            self._compact()
+
+    def _apply(self, event: dict):
+        url = event["url"]
+        entry = self.entries.get(url)
+        if entry is None:
+            entry = self.entries[url] = {"state": PENDING, "file": None, "rows": 0}
+        if "state" in event:
+            entry["state"] = event["state"]
+        if "file" in event:
+            self._by_file.pop(entry["file"], None)
+            entry["file"] = event["file"]
+            self._by_file[event["file"]] = url
+        if "rows" in event:
+            entry["rows"] = event["rows"]
+        if "add_rows" in event:
+            entry["rows"] += event["add_rows"]
+        self._events += 1
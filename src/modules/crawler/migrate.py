@@ -0,0 +1,123 @@
+"""
+Migration of crawl data files from the flat layout (data files named by url2filename in the raw directory) into the
+sharded layout (data files named by the hash key of their url, see modules.crawler.urlmap). The url of a data file is
+taken from the crawl manifest or the saved crawl specification. Flat file names are not reversible, so data files of
+other urls are not migrated but reported.
+Run from the src directory:
+
+    python -m modules.crawler.migrate [--workspace PATH] [--dry-run] [crawl ...]
+
+Without crawl names, all crawls of the workspace are migrated.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import os
+
+from core.Workspace import WorkspaceManager
+from modules.crawler import filemanager, manifest, storage, urlmap, SETTINGS
+from modules.crawler.filemanager import LOG
+from modules.crawler.model import CrawlSpecification
+
+
+def migrate_crawl(crawl: str, dry_run=False) -> int:
+    """
+    Moves the flat layout data files of crawl into the sharded layout.
+    :param dry_run: If True then the moves are only logged.
+    :return: Number of data files moved (or to be moved), data files whose url is unknown are skipped.
+    """
+    filemanager.flush_csv(crawl, release=True)
+    raw_path = filemanager._get_crawl_raw_path(crawl)
+    if not os.path.isdir(raw_path):
+        return 0
+
+    crawl_manifest = filemanager.get_manifest(crawl)
+    flat_names = {filemanager.url2filename(url): url for url in _get_known_urls(crawl, crawl_manifest)}
+    index = filemanager.get_url_index(crawl)
+
+    moved = 0
+    unknown = list()
+    for backend in storage.get_storages():
+        for name in sorted(os.listdir(raw_path)):
+            fname, ext = os.path.splitext(name)
+            if ext != backend.extension:
+                continue
+            stem, flag = filemanager._strip_incomplete_flag(fname)
+            url = flat_names.get(stem) or crawl_manifest.url_of(stem)
+            if url is None:
+                unknown.append(name)
+                continue
+
+            key = index.key_for(url, create=not dry_run) or urlmap.hash_key(url)
+            shard_path = os.path.join(raw_path, urlmap.shard_of(key, SETTINGS["filemanager"]["shard_chars"]))
+            src, dst = os.path.join(raw_path, name), os.path.join(shard_path, key + flag + ext)
+            if os.path.exists(dst):
+                LOG.warning("Not migrating {0}, {1} already exists.".format(src, dst))
+                continue
+
+            LOG.info("{0}{1} ({2}) -> {3}".format("[dry run] " if dry_run else "", src, url, dst))
+            moved += 1
+            if dry_run:
+                continue
+            os.makedirs(shard_path, exist_ok=True)
+            backend.move(src, dst)
+            filemanager._update_catalog("move", src, dst)
+            if crawl_manifest.state(url) is not None:
+                crawl_manifest.rename_file(crawl_manifest.entries[url]["file"], url)
+
+    if unknown:
+        LOG.warning("Not migrating {0} data files of crawl {1}, their urls are neither in the manifest nor in the "
+                    "crawl specification: {2}".format(len(unknown), crawl, unknown))
+    return moved
+
+
+def _get_known_urls(crawl: str, crawl_manifest: manifest.CrawlManifest) -> [str]:
+    """ Returns the urls of the manifest of crawl and the start urls of its saved specification. """
+    urls = list(crawl_manifest.entries)
+    spec_path = os.path.join(filemanager.get_crawl_path(crawl), crawl + ".json")
+    if os.path.isfile(spec_path):
+        spec = CrawlSpecification()
+        try:
+            spec.read(spec_path)
+            urls.extend(spec.urls)
+        except (OSError, ValueError) as exc:
+            LOG.warning("Could not read the specification of crawl {0}: {1}".format(crawl, exc))
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrates crawl data files into the sharded layout.")
+    parser.add_argument("crawls", nargs="*", help="names of the crawls to migrate, all crawls by default")
+    parser.add_argument("--workspace", help="workspace directory, the default workspace by default")
+    parser.add_argument("--dry-run", action="store_true", help="only log what would be moved")
+    args = parser.parse_args()
+
+    if args.workspace:
+        WorkspaceManager().set_workspace(os.path.abspath(args.workspace))
+
+    for crawl in args.crawls or filemanager.get_crawlnames():
+        moved = migrate_crawl(crawl, dry_run=args.dry_run)
+        LOG.info("{0} data files of crawl {1} {2}.".format(moved, crawl, "to migrate" if args.dry_run else "migrated"))
+
+
+if __name__ == "__main__":
+    main()
@@ -20,12 +20,19 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
+import hashlib
 import json
+import os
 import core
 from crawlUI import APP_SETTINGS
 
 LOG = core.simple_logger(modname="crawler", file_path=APP_SETTINGS["general"]["master_log"])
 
+# lists of a specification that can be stored in separate line files
+LINE_LISTS = ["urls", "blacklist", "whitelist"]
+# number of lines joined into a single write when writing a line file
+WRITE_BATCH = 10000
+
 
 class CrawlSpecification:
 
@@ -109,7 +116,99 @@ class CrawlSpecification:
         else:
             return json.dumps(self.__dict__, sort_keys=True, separators=(',', ':'))
 
-    def deserialize(self, json_str):
-        data = json.loads(json_str)
+    def deserialize(self, json_str, base_path="."):
+        """
+        Sets the attributes from the json string of a specification.
+        :param base_path: Directory that the files of referenced line lists are relative to.
+        """
+        self._set_data(json.loads(json_str), base_path)
+
+    def write(self, path, pretty=False, external_threshold=0):
+        """
+        Writes the specification to the json file at path without building the json string in memory.
+        :param external_threshold: If positive, each of urls, blacklist and whitelist with more entries is written
+                                   to a line file next to path, and the specification refers to it by a dict
+                                   {"file": ..., "sha256": ..., "count": ...} instead of containing the list.
+        :return: List of the paths of all files written.
+        """
+        data = dict(self.__dict__)
+        written = list()
+        stem = os.path.splitext(path)[0]
+        for key in LINE_LISTS:
+            if 0 < external_threshold < len(data[key]):
+                list_path = "{0}.{1}.txt".format(stem, key)
+                try:
+                    data[key] = dict(write_lines(list_path, data[key]), file=os.path.basename(list_path))
+                    written.append(list_path)
+                except ValueError as exc:
+                    LOG.warning("Keeping {0} inline: {1}".format(key, exc))
+                    os.remove(list_path)
+
+        if pretty:
+            encoder = json.JSONEncoder(sort_keys=True, indent=4, separators=(',', ': '))
+        else:
+            encoder = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+        with open(path, "w", encoding="utf-8") as spec_file:
+            for chunk in encoder.iterencode(data):
+                spec_file.write(chunk)
+        written.append(path)
+        return written
+
+    def read(self, path):
+        """
+        Sets the attributes from the json file at path, referenced line lists are loaded and verified. The json file
+        itself is parsed as a whole, only referenced line files are read line by line, so keep large lists in line
+        files (see spec_list_threshold) to bound the memory spent on parsing.
+        """
+        with open(path, encoding="utf-8") as spec_file:
+            self._set_data(json.load(spec_file), os.path.dirname(os.path.abspath(path)))
+
+    def _set_data(self, data: dict, base_path):
         for key in data:
-            setattr(self, key, data[key])
+            value = data[key]
+            if key in LINE_LISTS and is_line_reference(value):
+                value = read_lines(os.path.join(base_path, value["file"]), value["sha256"], value["count"])
+            setattr(self, key, value)
+
+
+def is_line_reference(value) -> bool:
+    """ Tells whether value refers to a line file, as written by CrawlSpecification.write. """
+    return isinstance(value, dict) and {"file", "sha256", "count"} <= value.keys()
+
+
+def write_lines(path, lines: [str]) -> dict:
+    """
+    Writes lines to the file at path, utf-8 encoded and terminated by a line feed each.
+    :return: dict with the sha256 hex digest of the file content and the number of lines (count).
+    :raises ValueError: if one of the lines contains a line break.
+    """
+    digest = hashlib.sha256()
+    with open(path, "wb") as lines_file:
+        for start in range(0, len(lines), WRITE_BATCH):
+            batch = lines[start:start + WRITE_BATCH]
+            text = "\n".join(batch) + "\n"
+            if "\r" in text or text.count("\n") != len(batch):
+                raise ValueError("a line contains a line break")
+            data = text.encode("utf-8")
+            digest.update(data)
+            lines_file.write(data)
+    return dict(sha256=digest.hexdigest(), count=len(lines))
+
+
+def read_lines(path, sha256: str = None, count: int = None) -> [str]:
+    """
+    Reads the lines written by write_lines line by line.
+    :raises ValueError: if sha256 or count are given and do not match the file.
+    """
+    digest = hashlib.sha256()
+    lines = list()
+    with open(path, "rb") as lines_file:
+        for line in lines_file:
+            digest.update(line)
+            lines.append(line.decode("utf-8").rstrip("\n"))
+
+    if sha256 is not None and digest.hexdigest() != sha256:
+        raise ValueError("Content of {0} does not match its sha256 hash.".format(path))
+    if count is not None and len(lines) != count:
+        raise ValueError("{0} contains {1} instead of {2} lines.".format(path, len(lines), count))
+    return lines
@@ -0,0 +1,507 @@
+"""
+Stand-in for a remote crawl queue, to test the remote initializer, remote crawl agents (crawlAgent.py) and their
+throughput without a real queue. Keeps the received crawl specifications (messages) in memory. The protocol is the one
+used by modules.crawler.remote, all bodies are json (but for result files) and may be gzip compressed:
+
+    POST <path>                 {"specifications": [...]}, answered with {"ids": [...]}. Requests with an
+                                Idempotency-Key that has been seen before are answered with the ids assigned before,
+                                without adding the specifications again.
+    GET <path>                  answered with the number of messages per state and the number of requests received.
+    POST <path>/lease           {"agent": ..., "count": n, "wait": seconds}, leases up to count queued messages, waiting
+                                up to wait seconds for one (long polling). Answered with {"leases": [{"id", "spec",
+                                "lease", "lease_seconds"}, ...]}, possibly empty.
+    POST <path>/<id>/heartbeat  {"lease": ..., "progress": {...}}, renews the lease for another lease_seconds.
+    POST <path>/<id>/complete   {"lease": ..., "state": "finished"|"failed", "returncode": ...}, failed messages are
+                                queued again until they have been leased max_attempts times.
+    POST <path>/<id>/release    {"lease": ...}, queues the message again without counting the attempt.
+
+Heartbeats, completions and releases of a lease that is not held anymore are answered with 409. Messages whose lease
+has not been renewed within lease_seconds are queued again (or fail after max_attempts).
+The result store receives the data files of crawls from the agents and hands them to the initializer (see
+modules.crawler.results), files are named by their path relative to the raw directory of the crawl:
+
+    GET <path>/results/<crawl>          answered with {"files": [{"name", "size", "sha256", "url"}, ...]}, the
+                                        completely uploaded files of crawl.
+    GET <path>/results/<crawl>/<name>   the content of the file, a single byte range if the request has a Range
+                                        header (answered with 206), with the sha256 hash of the content in the
+                                        X-Chunk-Sha256 header. With the query ?upload, answered with {"offset",
+                                        "sha256"}: the number of bytes received of a partial upload, and the hash of
+                                        the completely uploaded file (null if there is none).
+    PUT <path>/results/<crawl>/<name>   a chunk of the file, with Content-Range (bytes start-end/size) and
+                                        X-Chunk-Sha256 headers. A chunk starting at 0 starts the upload over, other
+                                        chunks must start at the offset of the partial upload (409 otherwise),
+                                        corrupted chunks are answered with 422. Both responses carry the offset.
+    POST <path>/results/<crawl>/<name>  {"size", "sha256", "url"}, completes the upload if the partial upload has
+                                        this size and hash (422 otherwise, and the partial upload is discarded).
+
+Run from the src directory:
+
+    python -m modules.crawler.queueserver [--host HOST] [--port PORT] [--path PATH] [--lease-seconds SECONDS]
+                                          [--max-attempts N] [--results DIR] [--error-rate RATE] [--verbose]
+
+Received results are kept in the given directory, a new temporary directory by default.
+With an error rate, that fraction of the requests is answered with 503, to test the retries of clients.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from modules.crawler import LOG
+
+QUEUED = "queued"
+LEASED = "leased"
+FINISHED = "finished"
+FAILED = "failed"
+MESSAGE_STATES = [QUEUED, LEASED, FINISHED, FAILED]
+
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+)$")
+RANGE_PATTERN = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class LeaseError(Exception):
+    pass
+
+
+class MessageQueue:
+    """
+    In-memory queue of specifications, each a dict with the keys id, spec (the specification as dict), state,
+    enqueued, attempts, agent, lease, lease_expires, progress and returncode.
+    """
+
+    def __init__(self, lease_seconds=60.0, max_attempts=3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.requests = 0
+        self._messages = OrderedDict()
+        self._keys = dict()  # idempotency key -> ids
+        self._lock = threading.Lock()
+        self._queued = threading.Condition(self._lock)
+
+    def put(self, specifications: [dict], key: str = None) -> [str]:
+        with self._lock:
+            if key is not None and key in self._keys:
+                return self._keys[key]
+            ids = list()
+            for spec in specifications:
+                message_id = uuid.uuid4().hex
+                self._messages[message_id] = dict(id=message_id, spec=spec, state=QUEUED, enqueued=time.time(),
+                                                  attempts=0, agent=None, lease=None, lease_expires=None,
+                                                  progress=None, returncode=None)
+                ids.append(message_id)
+            if key is not None:
+                self._keys[key] = ids
+            self._queued.notify_all()
+            return ids
+
+    def lease(self, agent: str, count: int, wait: float) -> [dict]:
+        """ Leases up to count queued messages to agent, waiting up to wait seconds for the first one. """
+        deadline = time.time() + wait
+        with self._lock:
+            while True:
+                self._requeue_expired()
+                queued = [message for message in self._messages.values() if message["state"] == QUEUED][:count]
+                remaining = deadline - time.time()
+                if queued or remaining <= 0:
+                    break
+                # wake up regularly, expired leases do not notify
+                self._queued.wait(min(remaining, 1.0))
+
+            leases = list()
+            for message in queued:
+                message.update(state=LEASED, agent=agent, lease=uuid.uuid4().hex,
+                               lease_expires=time.time() + self.lease_seconds, attempts=message["attempts"] + 1)
+                leases.append(dict(id=message["id"], spec=message["spec"], lease=message["lease"],
+                                   lease_seconds=self.lease_seconds))
+            if leases:
+                LOG.info("Leased {0} messages to {1}".format(len(leases), agent))
+            return leases
+
+    def heartbeat(self, message_id: str, lease: str, progress: dict = None) -> float:
+        with self._lock:
+            message = self._get_leased(message_id, lease)
+            message.update(lease_expires=time.time() + self.lease_seconds, progress=progress)
+            return self.lease_seconds
+
+    def complete(self, message_id: str, lease: str, state: str, returncode=None):
+        if state not in (FINISHED, FAILED):
+            raise ValueError("Invalid state {0}".format(state))
+        with self._lock:
+            message = self._messages[message_id]
+            if message["lease"] == lease and message["state"] in (FINISHED, FAILED):
+                return  # repeated completion
+            message = self._get_leased(message_id, lease)
+            message["returncode"] = returncode
+            if state == FAILED and message["attempts"] < self.max_attempts:
+                LOG.info("Message {0} failed on {1}, queueing it again".format(message_id, message["agent"]))
+                self._requeue(message)
+            else:
+                message["state"] = state
+
+    def release(self, message_id: str, lease: str):
+        with self._lock:
+            message = self._get_leased(message_id, lease)
+            message["attempts"] -= 1
+            self._requeue(message)
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._requeue_expired()
+            return dict(states=Counter(message["state"] for message in self._messages.values()),
+                        agents=Counter(message["agent"] for message in self._messages.values()
+                                       if message["state"] == LEASED),
+                        requests=self.requests)
+
+    def _get_leased(self, message_id: str, lease: str) -> dict:
+        self._requeue_expired()
+        message = self._messages[message_id]
+        if message["state"] != LEASED or message["lease"] != lease:
+            raise LeaseError("Message {0} is not leased with lease {1}".format(message_id, lease))
+        return message
+
+    def _requeue(self, message: dict):
+        message.update(state=QUEUED, agent=None, lease_expires=None)
+        self._queued.notify_all()
+
+    def _requeue_expired(self):
+        now = time.time()
+        for message in self._messages.values():
+            if message["state"] == LEASED and message["lease_expires"] < now:
+                LOG.warning("Lease of message {0} by {1} expired".format(message["id"], message["agent"]))
+                if message["attempts"] < self.max_attempts:
+                    self._requeue(message)
+                else:
+                    message.update(state=FAILED, agent=None)
+
+
+class UploadError(Exception):
+
+    def __init__(self, message, status, offset):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ResultStore:
+    """
+    Data files received from agents, in <path>/<crawl>/files, partial uploads in <path>/<crawl>/parts and the
+    description of every completed file appended to <path>/<crawl>/results.jsonl.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._files = dict()  # crawl -> name -> description of the completely uploaded file
+        self._lock = threading.Lock()
+
+    def list(self, crawl: str) -> [dict]:
+        with self._lock:
+            return list(self._get_files(crawl).values())
+
+    def upload_state(self, crawl: str, name: str) -> dict:
+        with self._lock:
+            part = self._get_path(crawl, "parts", name)
+            complete = self._get_files(crawl).get(name)
+            return dict(offset=os.path.getsize(part) if os.path.exists(part) else 0,
+                        sha256=complete["sha256"] if complete is not None else None)
+
+    def put_chunk(self, crawl: str, name: str, start: int, chunk: bytes, sha256: str) -> int:
+        """ Appends chunk, the bytes of the file from start on, to the partial upload and returns its new size. """
+        with self._lock:
+            part = self._get_path(crawl, "parts", name)
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            if hashlib.sha256(chunk).hexdigest() != sha256:
+                raise UploadError("Checksum mismatch of the chunk at {0}".format(start), 422, offset)
+            if start != 0 and start != offset:
+                raise UploadError("Chunk starts at {0}, expected {1}".format(start, offset), 409, offset)
+            os.makedirs(os.path.dirname(part), exist_ok=True)
+            with open(part, "wb" if start == 0 else "ab") as part_file:
+                part_file.write(chunk)
+            return start + len(chunk)
+
+    def complete(self, crawl: str, name: str, size: int, sha256: str, url: str = None) -> dict:
+        with self._lock:
+            files = self._get_files(crawl)
+            part = self._get_path(crawl, "parts", name)
+            if not os.path.exists(part) and name in files and files[name]["sha256"] == sha256:
+                return files[name]  # repeated completion
+            received = os.path.getsize(part) if os.path.exists(part) else 0
+            if received != size or _file_sha256(part) != sha256:
+                if os.path.exists(part):
+                    os.remove(part)
+                raise UploadError("Received {0} of {1} bytes, or their checksum does not match"
+                                  .format(received, size), 422, 0)
+            path = self._get_path(crawl, "files", name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(part, path)
+            files[name] = dict(name=name, size=size, sha256=sha256, url=url)
+            with open(os.path.join(self.path, crawl, "results.jsonl"), "a", encoding="utf-8") as results_file:
+                results_file.write(json.dumps(files[name]) + "\n")
+            return files[name]
+
+    def read(self, crawl: str, name: str, start: int = 0, end: int = None) -> (bytes, int):
+        """ Returns the bytes from start to end (inclusive, the last by default) of a file and the file size. """
+        with self._lock:
+            if name not in self._get_files(crawl):
+                raise KeyError(name)
+            path = self._get_path(crawl, "files", name)
+            size = os.path.getsize(path)
+            with open(path, "rb") as data_file:
+                data_file.seek(start)
+                return data_file.read((size if end is None else min(end + 1, size)) - start), size
+
+    def _get_files(self, crawl: str) -> dict:
+        if crawl not in self._files:
+            self._files[crawl] = dict()
+            try:
+                with open(os.path.join(self.path, crawl, "results.jsonl"), encoding="utf-8") as results_file:
+                    for line in results_file:
+                        description = json.loads(line)
+                        self._files[crawl][description["name"]] = description
+            except FileNotFoundError:
+                pass
+        return self._files[crawl]
+
+    def _get_path(self, crawl: str, kind: str, name: str) -> str:
+        segments = [crawl] + name.split("/")
+        if any(segment in ("", ".", "..") or "\\" in segment for segment in segments):
+            raise ValueError("Invalid name {0}".format(name))
+        return os.path.join(self.path, crawl, kind, *name.split("/"))
+
+
+def _file_sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as data_file:
+        for block in iter(lambda: data_file.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class QueueRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"  # keep connections alive
+
+    def do_GET(self):
+        if not self._check_request():
+            return
+        route = self._get_route()
+        if route[:1] == ["results"] and len(route) >= 2:
+            self._get_result(route[1], "/".join(route[2:]))
+        elif route:
+            self._send_json(404, dict(error="Unknown path {0}".format(self.path)))
+        else:
+            self._send_json(200, self.server.queue.stats())
+
+    def do_PUT(self):
+        body = self._read_body()
+        if body is None or not self._check_request():
+            return
+        route = self._get_route()
+        if route[:1] != ["results"] or len(route) < 3:
+            self._send_json(404, dict(error="Unknown path {0}".format(self.path)))
+            return
+        match = CONTENT_RANGE_PATTERN.match(self.headers.get("Content-Range", ""))
+        if match is None or int(match.group(2)) - int(match.group(1)) + 1 != len(body):
+            self._send_json(400, dict(error="Missing or invalid Content-Range"))
+            return
+        try:
+            offset = self.server.results.put_chunk(route[1], "/".join(route[2:]), int(match.group(1)), body,
+                                                   self.headers.get("X-Chunk-Sha256", ""))
+            self._send_json(200, dict(offset=offset))
+        except UploadError as exc:
+            self._send_json(exc.status, dict(error=str(exc), offset=exc.offset))
+        except ValueError as exc:
+            self._send_json(400, dict(error="Invalid request: {0}".format(exc)))
+
+    def do_POST(self):
+        body = self._read_body()
+        if body is None or not self._check_request():
+            return
+        route = self._get_route()
+        queue = self.server.queue
+        try:
+            data = json.loads(body.decode("utf-8")) if body else dict()
+            if route[:1] == ["results"] and len(route) >= 3:
+                self._send_json(200, self.server.results.complete(route[1], "/".join(route[2:]), int(data["size"]),
+                                                                  str(data["sha256"]), url=data.get("url")))
+            elif not route:
+                specifications = data["specifications"]
+                if not isinstance(specifications, list):
+                    raise ValueError("specifications is not a list")
+                self._send_json(201, dict(ids=queue.put(specifications, key=self.headers.get("Idempotency-Key"))))
+            elif route == ["lease"]:
+                leases = queue.lease(str(data["agent"]), int(data.get("count", 1)),
+                                     min(float(data.get("wait", 0)), self.server.max_wait))
+                self._send_json(200, dict(leases=leases))
+            elif len(route) == 2 and route[1] == "heartbeat":
+                lease_seconds = queue.heartbeat(route[0], data["lease"], progress=data.get("progress"))
+                self._send_json(200, dict(lease_seconds=lease_seconds))
+            elif len(route) == 2 and route[1] == "complete":
+                queue.complete(route[0], data["lease"], data["state"], returncode=data.get("returncode"))
+                self._send_json(200, dict())
+            elif len(route) == 2 and route[1] == "release":
+                queue.release(route[0], data["lease"])
+                self._send_json(200, dict())
+            else:
+                self._send_json(404, dict(error="Unknown path {0}".format(self.path)))
+        except LeaseError as exc:
+            self._send_json(409, dict(error=str(exc)))
+        except UploadError as exc:
+            self._send_json(exc.status, dict(error=str(exc), offset=exc.offset))
+        except KeyError as exc:
+            self._send_json(404 if route and route[0] not in ("lease", "results") else 400,
+                            dict(error="Unknown {0}".format(exc)))
+        except (ValueError, TypeError) as exc:
+            self._send_json(400, dict(error="Invalid request: {0}".format(exc)))
+
+    def _get_result(self, crawl: str, name: str):
+        results = self.server.results
+        try:
+            if not name:
+                self._send_json(200, dict(files=results.list(crawl)))
+            elif urlsplit(self.path).query == "upload":
+                self._send_json(200, results.upload_state(crawl, name))
+            else:
+                match = RANGE_PATTERN.match(self.headers.get("Range", ""))
+                start = int(match.group(1)) if match else 0
+                end = int(match.group(2)) if match and match.group(2) else None
+                content, size = results.read(crawl, name, start, end)
+                headers = {"X-Chunk-Sha256": hashlib.sha256(content).hexdigest()}
+                if match:
+                    headers["Content-Range"] = "bytes {0}-{1}/{2}".format(start, start + len(content) - 1, size)
+                self._send_content(206 if match else 200, content, "application/octet-stream", headers=headers)
+        except KeyError:
+            self._send_json(404, dict(error="Unknown result {0} of crawl {1}".format(name, crawl)))
+        except ValueError as exc:
+            self._send_json(400, dict(error="Invalid request: {0}".format(exc)))
+
+    def _check_request(self) -> bool:
+        """ Counts the request and sends an error response if it is to be failed or not for the queue path. """
+        self.server.queue.count_request()
+        if random.random() < self.server.error_rate:
+            self._send_json(503, dict(error="Injected error"), headers={"Retry-After": "0"})
+            return False
+        path = urlsplit(self.path).path.rstrip("/")
+        if path != self.server.path and not path.startswith(self.server.path + "/"):
+            self._send_json(404, dict(error="Unknown path {0}".format(self.path)))
+            return False
+        return True
+
+    def _get_route(self) -> [str]:
+        """ The segments of the request path following the queue path. """
+        return [unquote(segment) for segment in urlsplit(self.path).path[len(self.server.path):].split("/")
+                if segment]
+
+    def _read_body(self):
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            return body
+        except (ValueError, OSError) as exc:
+            self.close_connection = True
+            self._send_json(400, dict(error="Invalid request body: {0}".format(exc)))
+            return None
+
+    def _send_json(self, status: int, obj, headers: dict = None):
+        self._send_content(status, json.dumps(obj).encode("utf-8"), "application/json", headers=headers)
+
+    def _send_content(self, status: int, content: bytes, content_type: str, headers: dict = None):
+        if len(content) >= 1024 and "gzip" in self.headers.get("Accept-Encoding", ""):
+            content = gzip.compress(content)
+            headers = dict(headers or dict(), **{"Content-Encoding": "gzip"})
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or dict()).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            LOG.info("{0} - {1}".format(self.address_string(), format % args))
+
+
+class QueueServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+    # maximal number of seconds a lease request waits for queued messages
+    max_wait = 60.0
+
+    def __init__(self, address, path="/crawler_queue", lease_seconds=60.0, max_attempts=3, results_path=None,
+                 error_rate=0.0, verbose=False):
+        super().__init__(address, QueueRequestHandler)
+        self.results = ResultStore(results_path or tempfile.mkdtemp(prefix="ows-results-"))
+        self.path = path.rstrip("/")
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.queue = MessageQueue(lease_seconds=lease_seconds, max_attempts=max_attempts)
+
+    def get_url(self) -> str:
+        host, port = self.server_address[:2]
+        return "http://{0}:{1}{2}".format(host, port, self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs an in-memory stand-in for a remote crawl queue.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on, 127.0.0.1 by default")
+    parser.add_argument("--port", type=int, default=8642, help="port to listen on, 8642 by default")
+    parser.add_argument("--path", default="/crawler_queue", help="path of the queue, /crawler_queue by default")
+    parser.add_argument("--lease-seconds", type=float, default=60.0,
+                        help="seconds a lease is valid without a heartbeat, 60 by default")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="number of times a message is leased before it fails, 3 by default")
+    parser.add_argument("--results", help="directory to keep received results in, a temporary one by default")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failed with 503")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    server = QueueServer((args.host, args.port), path=args.path, lease_seconds=args.lease_seconds,
+                         max_attempts=args.max_attempts, results_path=args.results, error_rate=args.error_rate,
+                         verbose=args.verbose)
+    LOG.info("Serving a crawl queue at {0}, results in {1}".format(server.get_url(), server.results.path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
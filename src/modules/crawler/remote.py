@@ -0,0 +1,316 @@
+"""
+Client of a remote crawl queue, a http(s) service that receives crawl specifications and hands them out to remote
+crawlers (modules/crawler/queueserver.py is a stand-in for local tests). Specifications are sent as json
+{"specifications": [...]} in POST requests to the queue url, at most batch_size per request, answered with
+{"ids": [...]}. Every thread of the client keeps its own persistent (keep-alive) connection, batches are sent by a pool
+of such threads, and bodies of at least compress_min_bytes are gzip compressed. Failed requests (connection errors,
+timeouts, 429 and 5xx responses) are retried with exponential backoff with jitter, honouring Retry-After. Every batch
+carries an idempotency key, so that a queue does not add a batch twice if it is retried after the response was lost.
+Remote crawl agents (crawlAgent.py) lease specifications from the queue, renew their leases by heartbeats and report
+them as completed, see modules/crawler/queueserver.py for the protocol.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import copy
+import gzip
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from modules.crawler import SETTINGS, LOG
+from modules.crawler.model import CrawlSpecification
+
+# responses that are retried, all other error responses fail immediately
+RETRY_STATUS = [408, 429, 500, 502, 503, 504]
+
+
+class RemoteQueueError(Exception):
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def split_specification(spec: CrawlSpecification) -> [CrawlSpecification]:
+    """ Returns one copy of spec per start url. """
+    specs = list()
+    for url in spec.urls:
+        url_spec = copy.copy(spec)
+        url_spec.update(urls=[url])
+        specs.append(url_spec)
+    return specs
+
+
+class RemoteQueueClient:
+    """
+    Connection to the remote crawl queue at queue_url, the remaining parameters default to the [remote] settings.
+    Can be used by several threads at the same time, close releases the connections of all threads.
+    """
+
+    def __init__(self, queue_url: str, connections: int = None, timeout: float = None, retries: int = None):
+        parts = urlsplit(queue_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Not a http(s) url: {0}".format(queue_url))
+        self.queue_url = queue_url
+        self.path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        self._base_path = parts.path.rstrip("/")
+        self._connection_args = (parts.hostname, parts.port)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" \
+            else http.client.HTTPConnection
+
+        settings = SETTINGS["remote"]
+        self.connections = connections or settings["connections"]
+        self.timeout = timeout or settings["timeout"]
+        self.retries = settings["retries"] if retries is None else retries
+
+        self._local = threading.local()
+        self._open = list()
+        self._open_lock = threading.Lock()
+
+    def submit(self, specs: [CrawlSpecification], progress=None) -> [str]:
+        """
+        Sends specs to the queue, in batches of at most batch_size specifications over up to connections concurrent
+        connections.
+        :param progress: Called with the number of sent and the total number of specifications after every batch.
+        :raises RemoteQueueError: If a batch could not be sent, batches sent before remain in the queue.
+        :return: The ids the queue assigned to the specifications, in the order of specs.
+        """
+        batch_size = SETTINGS["remote"]["batch_size"]
+        batches = [specs[start:start + batch_size] for start in range(0, len(specs), batch_size)]
+        sent = [0]
+        sent_lock = threading.Lock()
+
+        def send(batch):
+            body = "{\"specifications\":[" + ",".join(spec.serialize(pretty=False) for spec in batch) + "]}"
+            response = self.request("POST", body=body.encode("utf-8"), idempotency_key=uuid.uuid4().hex)
+            if not isinstance(response, dict) or len(response.get("ids", [])) != len(batch):
+                raise RemoteQueueError("Unexpected response of {0}: {1}".format(self.queue_url, response))
+            with sent_lock:
+                sent[0] += len(batch)
+                if progress:
+                    progress(sent[0], len(specs))
+            return response["ids"]
+
+        ids = list()
+        if len(batches) > 1 and self.connections > 1:
+            with ThreadPoolExecutor(max_workers=min(self.connections, len(batches))) as pool:
+                for batch_ids in pool.map(send, batches):
+                    ids.extend(batch_ids)
+        else:
+            for batch in batches:
+                ids.extend(send(batch))
+        LOG.info("Sent {0} specifications in {1} requests to {2}".format(len(specs), len(batches), self.queue_url))
+        return ids
+
+    def lease(self, agent: str, count: int, wait: float) -> [dict]:
+        """
+        Leases up to count specifications for agent, waiting (long polling) up to wait seconds, but at most half the
+        timeout, for one to become available.
+        :return: List of leases, dicts with the keys id, spec (the specification as dict), lease and lease_seconds.
+        """
+        response = self.request("POST", self.get_path("lease"),
+                                body=json.dumps(dict(agent=agent, count=count,
+                                                     wait=min(wait, self.timeout / 2))).encode("utf-8"))
+        return response["leases"]
+
+    def heartbeat(self, message_id: str, lease: str, progress: dict = None):
+        """ Renews a lease, raises RemoteQueueError with status 409 if it is not held anymore. """
+        self._post_message(message_id, "heartbeat", dict(lease=lease, progress=progress))
+
+    def complete(self, message_id: str, lease: str, state: str, returncode: int = None):
+        """ Reports the leased specification as finished or failed (see modules.crawler.queueserver). """
+        self._post_message(message_id, "complete", dict(lease=lease, state=state, returncode=returncode))
+
+    def release(self, message_id: str, lease: str):
+        """ Returns a leased specification to the queue. """
+        self._post_message(message_id, "release", dict(lease=lease))
+
+    def _post_message(self, message_id: str, action: str, data: dict):
+        self.request("POST", self.get_path(message_id, action),
+                     body=json.dumps(data).encode("utf-8"))
+
+    def get_path(self, *segments: str) -> str:
+        """ Path below the queue url, the segments are url quoted and joined by slashes. """
+        return "/".join([self._base_path] + [quote(segment, safe="") for segment in segments])
+
+    def request(self, method: str, path: str = None, body: bytes = None, idempotency_key: str = None):
+        """
+        Sends a request with a json body to path (the path of the queue url by default) and returns its decoded json
+        response (None if it is empty), retrying failed requests.
+        :raises RemoteQueueError: If the request failed with a response that is not retried, or after all retries.
+        """
+        headers = {"Accept": "application/json"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        if idempotency_key is not None:
+            headers["Idempotency-Key"] = idempotency_key
+        _, content = self.request_raw(method, path, body=body, headers=headers)
+        return json.loads(content.decode("utf-8")) if content else None
+
+    def request_raw(self, method: str, path: str = None, body: bytes = None, headers: dict = None,
+                    compress=True) -> (http.client.HTTPResponse, bytes):
+        """
+        Sends a request to path (the path of the queue url by default), retrying failed requests, see request.
+        :param compress: If True then a body of at least compress_min_bytes is sent gzip compressed.
+        :return: The response and its content, decompressed if it was sent gzip compressed.
+        """
+        headers = dict(headers or dict())
+        headers["Accept-Encoding"] = "gzip"
+        if body is not None and compress and len(body) >= SETTINGS["remote"]["compress_min_bytes"]:
+            body = gzip.compress(body, compresslevel=SETTINGS["remote"]["compress_level"])
+            headers["Content-Encoding"] = "gzip"
+
+        error = None
+        retry_after = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(get_backoff(attempt, retry_after=retry_after))
+                retry_after = None
+            try:
+                connection = self._get_connection()
+                connection.request(method, path or self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                content = response.read()
+                if response.getheader("Content-Encoding") == "gzip":
+                    content = gzip.decompress(content)
+            except (OSError, EOFError, zlib.error, http.client.HTTPException) as exc:
+                self._close_connection()
+                error = RemoteQueueError("{0} {1} failed: {2}: {3}".format(method, self.queue_url,
+                                                                           type(exc).__name__, exc))
+                LOG.warning("{0} (attempt {1} of {2})".format(error, attempt + 1, self.retries + 1))
+                continue
+
+            if response.getheader("Connection", "").lower() == "close":
+                self._close_connection()
+            if response.status < 300:
+                return response, content
+
+            error = RemoteQueueError("{0} {1} failed with status {2}: {3}"
+                                     .format(method, self.queue_url, response.status,
+                                             content.decode("utf-8", "replace")[:200]),
+                                     status=response.status)
+            if response.status not in RETRY_STATUS:
+                raise error
+            retry_after = _parse_retry_after(response.getheader("Retry-After"))
+            LOG.warning("{0} (attempt {1} of {2})".format(error, attempt + 1, self.retries + 1))
+        raise error
+
+    def close(self):
+        with self._open_lock:
+            for connection in self._open:
+                connection.close()
+            self._open.clear()
+
+    def _get_connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connection_class(*self._connection_args, timeout=self.timeout)
+            self._local.connection = connection
+            with self._open_lock:
+                self._open.append(connection)
+        return connection
+
+    def _close_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+            with self._open_lock:
+                self._open.remove(connection)
+
+
+def get_backoff(attempt: int, retry_after: float = None) -> float:
+    """ Seconds to wait before the attempt-th retry, random up to backoff * 2^(attempt-1) but at most backoff_max. """
+    if retry_after is not None:
+        return min(retry_after, SETTINGS["remote"]["backoff_max"])
+    return random.uniform(0, min(SETTINGS["remote"]["backoff"] * 2 ** (attempt - 1), SETTINGS["remote"]["backoff_max"]))
+
+
+def _parse_retry_after(value):
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None  # absent or a http date, which is not supported
+
+
+class SubmissionSignals(QObject):
+
+    progressChanged = pyqtSignal(int, int)
+    # emits the list of ids of the sent specifications
+    finished = pyqtSignal(object)
+    # emits the exception that stopped the submission
+    failed = pyqtSignal(object)
+
+
+class SubmissionWorker(QRunnable):
+
+    def __init__(self, queue_url: str, specs: [CrawlSpecification]):
+        super().__init__()
+        self.queue_url = queue_url
+        self.specs = specs
+        self.signals = SubmissionSignals()
+
+    @pyqtSlot()
+    def run(self):
+        client = None
+        try:
+            client = RemoteQueueClient(self.queue_url)
+            ids = client.submit(self.specs, progress=self.signals.progressChanged.emit)
+        except Exception as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            self.signals.failed.emit(exc)
+            return
+        finally:
+            if client is not None:
+                client.close()
+        self.signals.finished.emit(ids)
+
+
+_THREADPOOL = None
+
+
+def submit_in_background(queue_url: str, specs: [CrawlSpecification], on_finished, on_failed,
+                         on_progress=None) -> SubmissionWorker:
+    """
+    Sends specs to the queue at queue_url in a background thread. on_finished is called with the list of their ids,
+    on_failed with the exception if sending failed and on_progress with the number of sent and the total number of
+    specifications, all in the thread of the calling QObject (the GUI thread).
+    """
+    global _THREADPOOL
+    if _THREADPOOL is None:
+        _THREADPOOL = QThreadPool()
+
+    worker = SubmissionWorker(queue_url, specs)
+    worker.signals.finished.connect(on_finished)
+    worker.signals.failed.connect(on_failed)
+    if on_progress is not None:
+        worker.signals.progressChanged.connect(on_progress)
+    _THREADPOOL.start(worker)
+    return worker
@@ -0,0 +1,345 @@
+"""
+Retrieval of the results of remote crawls. A specification sent by the remote http initializer carries the result
+finalizer (FINALIZER), which tells the remote crawl agent (crawlAgent.py) to upload the data files of the crawl to the
+result store of the queue with a ResultUploader, each as soon as it is complete, i.e. while the crawl is still running.
+ResultDownloader retrieves the uploaded data files into the raw directory of the crawl in the local workspace, in the
+configured layout. Both transfer files in chunks of chunk_size bytes, gzip compressed, each with the sha256 hash of its
+content, and resume interrupted transfers at the last complete chunk. Whole files are verified by their sha256 hash.
+The result store is part of the queue service, see modules/crawler/queueserver.py for the protocol. To retrieve
+results without the GUI, run from the src directory:
+
+    python -m modules.crawler.results [--workspace PATH] [--follow] QUEUE_URL CRAWL
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from core.Workspace import WorkspaceManager
+from modules.crawler import filemanager, urlmap, SETTINGS, LOG
+from modules.crawler.remote import RemoteQueueClient, RemoteQueueError
+
+# key of the finalizer in a crawl specification, its value is a dict with the url of the queue to upload results to
+FINALIZER = "modules.crawler.results.ResultUploader"
+# responses telling that the transfer is out of sync with the result store, which is answered by resuming from its state
+RESYNC_STATUS = [409, 422]
+
+
+def get_result_finalizer(queue_url: str) -> dict:
+    return {FINALIZER: {"url": queue_url}}
+
+
+def file_sha256(path: str, size: int = None) -> "hashlib._Hash":
+    """ Returns the sha256 hash object of the first size bytes (all by default) of the file at path. """
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as data_file:
+        remaining = size
+        while remaining is None or remaining > 0:
+            block = data_file.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not block:
+                break
+            sha256.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return sha256
+
+
+def is_safe_name(name: str) -> bool:
+    """ Tells whether the relative data file name stays within the directory it is relative to. """
+    segments = name.split("/")
+    return bool(name) and not name.startswith("/") and all(segment not in ("", ".", "..") and "\\" not in segment
+                                                          for segment in segments)
+
+
+class ResultUploader:
+    """ Uploads the complete data files of crawls from the current workspace to the result store of queue_url. """
+
+    def __init__(self, queue_url: str):
+        self.client = RemoteQueueClient(queue_url, connections=1)
+        self._uploaded = dict()  # (crawl, name) -> (size, modification time) of the uploaded version
+
+    def upload_completed(self, crawl: str, urls: [str] = None, stopping: threading.Event = None) -> bool:
+        """
+        Uploads the complete data files of crawl that have not been uploaded in their current version yet.
+        :param urls: Start urls of crawl, identify the data files the scrapy wrapper names by url2filename.
+        :param stopping: If given and set, the upload stops after the current chunk.
+        :return: True if all complete data files of crawl are uploaded.
+        """
+        raw_path = filemanager._get_crawl_raw_path(crawl)
+        flat_names = {filemanager.url2filename(url): url for url in urls or list()}
+        uploaded = True
+        for info in filemanager.get_datafile_infos(crawl):
+            if stopping is not None and stopping.is_set():
+                return False
+            if info["incomplete"]:
+                continue
+            try:
+                stat = os.stat(info["path"])
+            except OSError:
+                continue  # moved in the meantime
+            name = os.path.relpath(info["path"], raw_path).replace(os.sep, "/")
+            if self._uploaded.get((crawl, name)) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            try:
+                if self.upload_file(crawl, info["path"], name, url=self._get_url(crawl, info["name"], flat_names),
+                                    stopping=stopping):
+                    self._uploaded[(crawl, name)] = (stat.st_size, stat.st_mtime_ns)
+                else:
+                    uploaded = False
+            except (RemoteQueueError, OSError) as exc:
+                LOG.error("Could not upload {0} of crawl {1}: {2}".format(name, crawl, exc))
+                uploaded = False
+        return uploaded
+
+    def upload_file(self, crawl: str, path: str, name: str, url: str = None, stopping: threading.Event = None) -> bool:
+        """
+        Uploads the file at path as name (relative to the raw directory) of crawl, resuming a previous upload.
+        :return: True if the file has been uploaded completely, False if stopping was set before.
+        """
+        file_path = self.client.get_path("results", crawl, *name.split("/"))
+        size = os.path.getsize(path)
+        sha256 = file_sha256(path).hexdigest()
+        chunk_size = SETTINGS["results"]["chunk_size"]
+        resyncs = 0
+
+        offset = self._get_upload_state(file_path, sha256)
+        with open(path, "rb") as data_file:
+            while offset is not None and offset < size:
+                if stopping is not None and stopping.is_set():
+                    return False
+                data_file.seek(offset)
+                chunk = data_file.read(chunk_size)
+                headers = {"Content-Type": "application/octet-stream",
+                           "Content-Range": "bytes {0}-{1}/{2}".format(offset, offset + len(chunk) - 1, size),
+                           "X-Chunk-Sha256": hashlib.sha256(chunk).hexdigest()}
+                try:
+                    self.client.request_raw("PUT", file_path, body=chunk, headers=headers)
+                    offset += len(chunk)
+                except RemoteQueueError as exc:
+                    # a lost response of an applied chunk or a corrupted chunk, continue where the store is
+                    if exc.status not in RESYNC_STATUS or resyncs >= self.client.retries:
+                        raise
+                    resyncs += 1
+                    offset = self._get_upload_state(file_path, sha256)
+
+        if offset is not None:
+            self.client.request("POST", file_path,
+                                body=json.dumps(dict(size=size, sha256=sha256, url=url)).encode("utf-8"))
+            LOG.info("Uploaded {0} of crawl {1} ({2} bytes)".format(name, crawl, size))
+        return True
+
+    def close(self):
+        self.client.close()
+
+    def _get_upload_state(self, file_path: str, sha256: str):
+        """ Returns the offset to continue the upload at, None if the store already has the file with hash sha256. """
+        state = self.client.request("GET", file_path + "?upload")
+        if state.get("sha256") == sha256:
+            return None
+        return state["offset"]
+
+    @staticmethod
+    def _get_url(crawl: str, fname: str, flat_names: dict):
+        if urlmap.is_key(fname):
+            return filemanager.get_url_index(crawl).url_for(fname)
+        return flat_names.get(fname) or filemanager.get_manifest(crawl).url_of(fname)
+
+
+class ResultDownloader:
+    """ Retrieves the data files of crawl from the result store of queue_url into the current workspace. """
+
+    def __init__(self, queue_url: str, crawl: str):
+        self.client = RemoteQueueClient(queue_url, connections=1)
+        self.crawl = crawl
+        crawl_path = filemanager.get_crawl_path(crawl)
+        self.records_path = os.path.join(crawl_path, SETTINGS["results"]["downloads_filename"])
+        self.partial_path = os.path.join(crawl_path, SETTINGS["results"]["partial_dir"])
+        self._downloaded = self._load_records()  # name -> sha256 of the retrieved version
+
+    def download_new(self, progress=None) -> [str]:
+        """
+        Retrieves the data files of the crawl that have been uploaded since the last call, resuming partial ones.
+        :param progress: Called with the number of retrieved and the total number of new files after every file.
+        :return: The paths of the retrieved data files.
+        """
+        listing = self.client.request("GET", self.client.get_path("results", self.crawl))
+        new = [entry for entry in listing["files"]
+               if self._downloaded.get(entry["name"]) != entry["sha256"] and is_safe_name(entry["name"])]
+        paths = list()
+        for entry in new:
+            paths.append(self.download_file(entry))
+            if progress:
+                progress(len(paths), len(new))
+        return paths
+
+    def download_file(self, entry: dict) -> str:
+        """ Retrieves the file of a listing entry (dict with name, size, sha256 and url), resuming a partial one. """
+        file_path = self.client.get_path("results", self.crawl, *entry["name"].split("/"))
+        # partial files are named by the hash of their content, a changed file is not continued
+        part = os.path.join(WorkspaceManager().ensure_path(self.partial_path), entry["sha256"] + ".part")
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if offset > entry["size"]:
+            os.remove(part)
+            offset = 0
+        sha256 = file_sha256(part, offset) if offset else hashlib.sha256()
+        chunk_size = SETTINGS["results"]["chunk_size"]
+        mismatches = 0
+
+        with open(part, "ab") as part_file:
+            while offset < entry["size"]:
+                end = min(offset + chunk_size, entry["size"]) - 1
+                response, chunk = self.client.request_raw("GET", file_path,
+                                                          headers={"Range": "bytes={0}-{1}".format(offset, end)})
+                if len(chunk) != end - offset + 1 or \
+                        hashlib.sha256(chunk).hexdigest() != response.getheader("X-Chunk-Sha256"):
+                    mismatches += 1
+                    if mismatches > self.client.retries:
+                        raise RemoteQueueError("Chunks of {0} of crawl {1} keep arriving corrupted"
+                                               .format(entry["name"], self.crawl))
+                    continue
+                part_file.write(chunk)
+                part_file.flush()
+                sha256.update(chunk)
+                offset += len(chunk)
+
+        if sha256.hexdigest() != entry["sha256"]:
+            os.remove(part)
+            raise RemoteQueueError("Checksum mismatch of {0} of crawl {1}, it will be retrieved again"
+                                   .format(entry["name"], self.crawl))
+
+        path = filemanager.store_datafile(self.crawl, part, entry["name"], url=entry.get("url"))
+        self._downloaded[entry["name"]] = entry["sha256"]
+        with open(self.records_path, "a", encoding="utf-8") as records_file:
+            records_file.write(json.dumps(dict(name=entry["name"], sha256=entry["sha256"], path=path)) + "\n")
+        LOG.info("Retrieved {0} of crawl {1} ({2} bytes)".format(entry["name"], self.crawl, entry["size"]))
+        return path
+
+    def close(self):
+        self.client.close()
+
+    def _load_records(self) -> dict:
+        downloaded = dict()
+        try:
+            with open(self.records_path, encoding="utf-8") as records_file:
+                for line in records_file:
+                    try:
+                        record = json.loads(line)
+                        downloaded[record["name"]] = record["sha256"]
+                    except (ValueError, KeyError, TypeError):
+                        continue  # torn last line
+        except FileNotFoundError:
+            pass
+        return downloaded
+
+
+class RetrievalSignals(QObject):
+
+    progressChanged = pyqtSignal(int, int)
+    # emits the list of paths of the retrieved data files
+    finished = pyqtSignal(object)
+    # emits the exception that stopped the retrieval
+    failed = pyqtSignal(object)
+
+
+class RetrievalWorker(QRunnable):
+
+    def __init__(self, queue_url: str, crawl: str):
+        super().__init__()
+        self.queue_url = queue_url
+        self.crawl = crawl
+        self.signals = RetrievalSignals()
+
+    @pyqtSlot()
+    def run(self):
+        downloader = None
+        try:
+            downloader = ResultDownloader(self.queue_url, self.crawl)
+            paths = downloader.download_new(progress=self.signals.progressChanged.emit)
+        except Exception as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            self.signals.failed.emit(exc)
+            return
+        finally:
+            if downloader is not None:
+                downloader.close()
+        self.signals.finished.emit(paths)
+
+
+_THREADPOOL = None
+
+
+def retrieve_in_background(queue_url: str, crawl: str, on_finished, on_failed, on_progress=None) -> RetrievalWorker:
+    """
+    Retrieves the new data files of crawl from the queue at queue_url in a background thread. on_finished is called
+    with the list of their paths, on_failed with the exception if the retrieval failed and on_progress with the
+    number of retrieved and the total number of new files, all in the thread of the calling QObject (the GUI thread).
+    """
+    global _THREADPOOL
+    if _THREADPOOL is None:
+        _THREADPOOL = QThreadPool()
+
+    worker = RetrievalWorker(queue_url, crawl)
+    worker.signals.finished.connect(on_finished)
+    worker.signals.failed.connect(on_failed)
+    if on_progress is not None:
+        worker.signals.progressChanged.connect(on_progress)
+    _THREADPOOL.start(worker)
+    return worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieves the results of a remote crawl into the workspace.")
+    parser.add_argument("queue_url", help="url of the crawl queue the crawl has been sent to")
+    parser.add_argument("crawl", help="name of the crawl")
+    parser.add_argument("--workspace", help="workspace directory, the default workspace by default")
+    parser.add_argument("--follow", action="store_true",
+                        help="keep retrieving new results every poll_interval seconds until interrupted")
+    args = parser.parse_args()
+
+    if args.workspace:
+        WorkspaceManager().set_workspace(os.path.abspath(args.workspace))
+
+    downloader = ResultDownloader(args.queue_url, args.crawl)
+    try:
+        while True:
+            try:
+                paths = downloader.download_new()
+                LOG.info("Retrieved {0} data files of crawl {1}".format(len(paths), args.crawl))
+            except RemoteQueueError as exc:
+                LOG.error("Could not retrieve the results of crawl {0}: {1}".format(args.crawl, exc))
+            if not args.follow:
+                break
+            time.sleep(SETTINGS["results"]["poll_interval"])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        downloader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""
+Storage backends for paragraph crawl data.
+A storage backend knows how to create, extend, load and complete a single data file of a crawl, i.e. the data
+belonging to one start url. The filemanager selects the backend configured in the [filemanager] block of the crawler
+settings.toml for writing, but reads every format that any of the registered backends recognizes, so that
+crawls written with different backends remain accessible.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import csv
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import pandas
+
+import core
+from modules.crawler import SETTINGS, journal
+from crawlUI import APP_SETTINGS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+LOG = core.simple_logger(modname="crawler", file_path=APP_SETTINGS["general"]["master_log"])
+
+DATA_COLUMNS = ["url", "content", "depth"]
+# compact dtypes used when reading data files chunk-wise
+DATA_DTYPES = {"url": "category", "content": "object", "depth": "Int32"}
+
+
+class DataStorage:
+    """
+    Base class of all storage backends. Paths given to the methods are full paths including the file extension.
+    """
+
+    extension = ""
+
+    def create(self, path: str, overwrite=False):
+        """ Creates an empty data file at path, only containing the head of a crawl dataframe. """
+        raise NotImplementedError
+
+    def append(self, path: str, data: dict):
+        """ Appends data, a dict mapping column names to lists of values, to the existing data file at path. """
+        raise NotImplementedError
+
+    def load(self, path: str) -> pandas.DataFrame:
+        """ Loads the full data file at path. """
+        raise NotImplementedError
+
+    def iter_chunks(self, path: str, chunksize: int, columns: [str] = None):
+        """
+        Yields the data file at path as consecutive dataframes of at most chunksize rows.
+        :param columns: If given, only these columns are read.
+        """
+        df = self.load(path)
+        if columns is not None:
+            df = df[columns]
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+    def complete(self, path_inc: str, path_com: str):
+        """ Switches the data file at path_inc to its complete state at path_com. """
+        shutil.move(path_inc, path_com)
+
+    def recover(self, path: str):
+        """ Repairs the data file at path after an unclean shutdown, if the format allows to. """
+        pass
+
+    def move(self, src: str, dst: str):
+        """ Moves the data file at src to dst, without changing its state. """
+        shutil.move(src, dst)
+
+    def close(self):
+        """ Releases all resources held by the backend, e.g. open file handles. """
+        pass
+
+
+class CsvStorage(DataStorage):
+    """
+    Stores paragraph data as semicolon separated csv files, one row per paragraph. Data files with another separator
+    (e.g. written by other tools) are still read, the separator is detected from their head line.
+    """
+
+    extension = ".csv"
+
+    def create(self, path, overwrite=False):
+        if overwrite or not os.path.exists(path):
+            df = pandas.DataFrame(columns=DATA_COLUMNS)
+            df.to_csv(path, sep=";", index=False, encoding="utf-8")
+
+    def append(self, path, data):
+        if os.path.exists(path):
+            df = pandas.DataFrame.from_dict(data)
+            df.to_csv(path, mode="a", sep=";", index=False, encoding="utf-8", header=False)
+
+    def load(self, path):
+        return pandas.read_csv(path, sep=self.detect_separator(path), engine="c", encoding="utf-8")
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        dtypes = {column: dtype for column, dtype in DATA_DTYPES.items() if columns is None or column in columns}
+        yield from pandas.read_csv(path, sep=self.detect_separator(path), engine="c", encoding="utf-8",
+                                   usecols=columns, dtype=dtypes, chunksize=chunksize)
+
+    @staticmethod
+    def detect_separator(path: str) -> str:
+        """ Separator of the csv file at path, sniffed from its head line like read_csv(sep=None) does. """
+        with open(path, encoding="utf-8", newline="") as csv_file:
+            head = csv_file.readline()
+        try:
+            return csv.Sniffer().sniff(head, delimiters=";,\t|").delimiter
+        except csv.Error:
+            return ";"  # e.g. a single column or an empty file
+
+
+class ParquetStorage(DataStorage):
+    """
+    Stores paragraph data in the columnar parquet format with a dictionary encoded url column and an integer
+    depth column. Parquet files can not be appended to, hence a data file that is still being written is a
+    directory of parquet parts (which is itself a valid parquet dataset). Completing the data file compacts these
+    parts into a single parquet file.
+    """
+
+    extension = ".parquet"
+
+    def __init__(self):
+        if pyarrow is None:
+            raise ImportError("The parquet storage backend requires the pyarrow package to be installed.")
+
+        self.schema = pyarrow.schema([("url", pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+                                      ("content", pyarrow.string()),
+                                      ("depth", pyarrow.int32())])
+
+    def create(self, path, overwrite=False):
+        if overwrite and os.path.exists(path):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, path, data):
+        if os.path.isdir(path):
+            part_path = os.path.join(path, "part-{0:06d}.parquet".format(len(os.listdir(path))))
+            pyarrow.parquet.write_table(self.to_table(data), part_path)
+
+    def load(self, path):
+        if os.path.isdir(path) and not os.listdir(path):
+            return pandas.DataFrame(columns=DATA_COLUMNS)
+        return pyarrow.parquet.read_table(path).to_pandas()
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        if os.path.isdir(path):
+            parts = [os.path.join(path, part) for part in sorted(os.listdir(path))]
+        else:
+            parts = [path]
+
+        for part in parts:
+            parquet_file = pyarrow.parquet.ParquetFile(part)
+            for i in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(i, columns=columns)
+                for start in range(0, table.num_rows, chunksize):
+                    yield table.slice(start, chunksize).to_pandas()
+
+    def complete(self, path_inc, path_com):
+        if not os.path.isdir(path_inc):
+            return super().complete(path_inc, path_com)
+
+        if os.listdir(path_inc):
+            table = pyarrow.parquet.read_table(path_inc)
+        else:
+            table = self.schema.empty_table()
+        pyarrow.parquet.write_table(table, path_com)
+        shutil.rmtree(path_inc)
+
+    def to_table(self, data: dict):
+        df = pandas.DataFrame.from_dict(data)
+        return pyarrow.table([pyarrow.array(df["url"].astype(str), type=pyarrow.string()).dictionary_encode(),
+                              pyarrow.array(df["content"].astype(str), type=pyarrow.string()),
+                              pyarrow.array(df["depth"], type=pyarrow.int32())],
+                             schema=self.schema)
+
+
+class JournalStorage(DataStorage):
+    """
+    Stores paragraph data in crash-safe journal files (see modules.crawler.journal), one json encoded row per
+    record. Journals are fsynced in groups while they are being written, a journal that was interrupted by a crash is
+    repaired by recover, which truncates its torn tail. At most journal_max_open journals keep their file open, the
+    least recently appended ones are closed (and reopened by their next append).
+    """
+
+    extension = ".journal"
+
+    def __init__(self):
+        self._journals = dict()
+        self._open = OrderedDict()  # paths of the journals with an open file, least recently used first
+        self._lock = threading.Lock()
+
+    def create(self, path, overwrite=False):
+        if overwrite or not os.path.exists(path):
+            self._close(path)
+            journal.create(path)
+
+    def append(self, path, data):
+        if os.path.exists(path):
+            n = len(next(iter(data.values()), []))
+            columns = [data[column] if column in data else [None] * n for column in DATA_COLUMNS]
+            self._get_journal(path).append([json.dumps(row, default=_json_default).encode("utf-8")
+                                            for row in zip(*columns)])
+
+    def load(self, path):
+        with self._lock:
+            if path in self._journals:
+                self._journals[path].sync()
+        rows = [json.loads(payload.decode("utf-8")) for payload in journal.read(path)]
+        return pandas.DataFrame(rows, columns=DATA_COLUMNS)
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        with self._lock:
+            if path in self._journals:
+                self._journals[path].sync()
+
+        rows = list()
+        for payload in journal.read(path):
+            rows.append(json.loads(payload.decode("utf-8")))
+            if len(rows) >= chunksize:
+                yield self._to_frame(rows, columns)
+                rows = list()
+        if rows:
+            yield self._to_frame(rows, columns)
+
+    @staticmethod
+    def _to_frame(rows, columns):
+        df = pandas.DataFrame(rows, columns=DATA_COLUMNS)
+        if columns is not None:
+            df = df[columns]
+        return df.astype({column: DATA_DTYPES[column] for column in df.columns if column in DATA_DTYPES})
+
+    def complete(self, path_inc, path_com):
+        self._close(path_inc)
+        journal.recover(path_inc)
+        journal.remove_checkpoint(path_inc)
+        super().complete(path_inc, path_com)
+
+    def move(self, src, dst):
+        self._close(src)
+        super().move(src, dst)
+        if os.path.exists(src + journal.CHECKPOINT_EXTENSION):
+            shutil.move(src + journal.CHECKPOINT_EXTENSION, dst + journal.CHECKPOINT_EXTENSION)
+
+    def recover(self, path):
+        self._close(path)
+        end, records = journal.recover(path)
+        LOG.info("Recovered {0} records ({1} bytes) from {2}".format(records, end, path))
+
+    def close(self):
+        with self._lock:
+            journals = list(self._journals.values())
+            self._journals.clear()
+            self._open.clear()
+        for jrnl in journals:
+            jrnl.close()
+
+    def _get_journal(self, path) -> journal.Journal:
+        idle = list()
+        with self._lock:
+            if path not in self._journals:
+                self._journals[path] = journal.Journal(path,
+                                                       sync_bytes=SETTINGS["filemanager"]["journal_sync_bytes"],
+                                                       sync_interval=SETTINGS["filemanager"]["journal_sync_interval"])
+            self._open[path] = True
+            self._open.move_to_end(path)
+            while len(self._open) > max(SETTINGS["filemanager"]["journal_max_open"], 1):
+                idle.append(self._journals[self._open.popitem(last=False)[0]])
+            jrnl = self._journals[path]
+        # closing syncs, which is not done while holding the lock of all journals
+        for idle_journal in idle:
+            idle_journal.close()
+        return jrnl
+
+    def _close(self, path):
+        with self._lock:
+            self._open.pop(path, None)
+            jrnl = self._journals.pop(path, None)
+        if jrnl is not None:
+            jrnl.close()
+
+
+def _json_default(obj):
+    # numpy scalars, e.g. from values taken out of a pandas.DataFrame
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+class BufferedDataWriter:
+    """
+    Write-behind buffer in front of a single data file. Rows passed to write are accumulated in memory and handed to
+    the storage backend in a single append once the buffer holds max_rows rows, roughly max_bytes bytes of values or
+    max_interval seconds have passed since the last flush (checked on every write). A limit of 0 disables it.
+    If given, on_flush is called with the path and the number of rows after every append.
+    """
+
+    def __init__(self, backend: DataStorage, path: str, max_rows=5000, max_bytes=4194304, max_interval=5.0,
+                 on_flush=None):
+        self.backend = backend
+        self.path = path
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_interval = max_interval
+        self.on_flush = on_flush
+
+        self._columns = dict()
+        self._rows = 0
+        self._bytes = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, data: dict):
+        """ Buffers data, a dict mapping column names to equally long lists of values. """
+        with self._lock:
+            n = len(next(iter(data.values()), []))
+            for column in data:
+                if column not in self._columns:
+                    self._columns[column] = [None] * self._rows
+            for column, values in self._columns.items():
+                if column in data:
+                    values.extend(data[column])
+                    self._bytes += sum(len(v) if isinstance(v, str) else 8 for v in data[column])
+                else:
+                    values.extend([None] * n)
+            self._rows += n
+
+            if self._is_full():
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def pending(self) -> int:
+        """ Number of buffered rows that have not been written yet. """
+        return self._rows
+
+    def _is_full(self):
+        return (self.max_rows and self._rows >= self.max_rows) or \
+               (self.max_bytes and self._bytes >= self.max_bytes) or \
+               (self.max_interval and time.monotonic() - self._last_flush >= self.max_interval)
+
+    def _flush(self):
+        if self._rows:
+            self.backend.append(self.path, self._columns)
+            if self.on_flush is not None:
+                self.on_flush(self.path, self._rows)
+        self._columns = {column: list() for column in self._columns}
+        self._rows = 0
+        self._bytes = 0
+        self._last_flush = time.monotonic()
+
+
+_STORAGES = dict()
+# name -> exception that prevented the backend from being instantiated, e.g. a missing optional dependency
+_UNAVAILABLE = dict()
+
+
+def get_storage(name: str = None) -> DataStorage:
+    """
+    Returns the storage backend registered under name in [filemanager.backends], by default the one configured by
+    the storage setting. Falls back to the csv backend if the requested backend can not be instantiated.
+    """
+    if name is None:
+        name = SETTINGS["filemanager"].get("storage", "csv")
+
+    backend = _load_storage(name)
+    if backend is None:
+        exc = _UNAVAILABLE[name]
+        LOG.error("Storage backend '{0}' unavailable, falling back to csv. {1}: {2}"
+                  .format(name, type(exc).__name__, exc))
+        backend = _STORAGES[name] = CsvStorage()
+    return backend
+
+
+def _load_storage(name: str):
+    """ Returns the backend registered under name, None if it can not be instantiated. """
+    if name not in _STORAGES and name not in _UNAVAILABLE:
+        try:
+            _STORAGES[name] = core.get_class(SETTINGS["filemanager"]["backends"][name])()
+        except Exception as exc:
+            _UNAVAILABLE[name] = exc
+    return _STORAGES.get(name)
+
+
+def close_storages():
+    """ Closes all backends that have been instantiated. """
+    for backend in _STORAGES.values():
+        backend.close()
+
+
+def get_storages() -> [DataStorage]:
+    """
+    Returns all registered storage backends that are available, the configured one first. Unavailable backends
+    other than the configured one are skipped silently, e.g. parquet without pyarrow.
+    """
+    storages = [get_storage()]
+    for name in SETTINGS["filemanager"]["backends"]:
+        storage = _load_storage(name)
+        if storage is not None and type(storage) not in map(type, storages):
+            storages.append(storage)
+    return storages
+
+
+def get_storage_of(path: str) -> DataStorage:
+    """ Returns the storage backend responsible for the data file at path (by file extension), None if unknown. """
+    ext = os.path.splitext(path)[1]
+    for backend in get_storages():
+        if backend.extension == ext:
+            return backend
+    return None
+
+
+def iter_file(path: str, chunksize: int = None, columns: [str] = None):
+    """
+    Yields the data file at path chunk-wise, see DataStorage.iter_chunks.
+    :param chunksize: Maximal number of rows per chunk, defaults to the read_chunksize setting.
+    """
+    backend = get_storage_of(path)
+    if backend is None:
+        raise ValueError("{0} is not a known data file format.".format(path))
+    return backend.iter_chunks(path, chunksize or SETTINGS["filemanager"]["read_chunksize"], columns)
+
+
+def find_storage(path_base: str) -> (DataStorage, str):
+    """
+    Determines the storage backend of an existing data file.
+    :param path_base: Full path of the data file without file extension.
+    :return: Tuple of the storage backend and the full path to the data file, (None, None) if no file exists.
+    """
+    for storage in get_storages():
+        if os.path.exists(path_base + storage.extension):
+            return storage, path_base + storage.extension
+    return None, None
@@ -0,0 +1,467 @@
+"""
+Supervision of the OWS-scrapy-wrapper processes launched for local crawls.
+Every launched wrapper is recorded in a registry in the workspace root (crawl, specification, PID, creation and start
+time), so that its state is known across restarts of the application. poll determines which processes are still
+running together with their CPU, memory and I/O usage, summed over all processes of their session (the wrapper is
+started through a shell in a new session). The statistics are taken from psutil if it is installed, otherwise from
+/proc on Linux, without either only processes started by this application can be checked. Processes that exited with
+an error, or without a known exit code while urls of their specification are incomplete, are restarted with their
+incomplete urls up to max_restarts times, otherwise they are marked as failed.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from core.Workspace import WorkspaceManager
+from modules.crawler import filelock, filemanager, WindowsCreationFlags, SETTINGS, LOG
+from modules.crawler.model import CrawlSpecification
+
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+STOPPED = "stopped"
+# the process can not be checked, neither psutil nor /proc are available and it has not been started by this application
+UNKNOWN = "unknown"
+PROCESS_STATES = [RUNNING, FINISHED, FAILED, STOPPED, UNKNOWN]
+
+# processes whose creation time differs by more than this many seconds from the recorded one are different processes
+CREATE_TIME_TOLERANCE = 1.0
+
+PROC = "/proc"
+
+
+def get_scrapy_command(settings_path: str) -> str:
+    return SETTINGS["general"]["scrapy_wrapper_exec"] + " \"" + settings_path + "\""
+
+
+def launch_wrapper(settings_path: str) -> subprocess.Popen:
+    """ Starts an OWS-scrapy-wrapper process for the specification at settings_path, detached from this process. """
+    command = get_scrapy_command(settings_path)
+    LOG.info("Running {0}".format(command))
+    if os.name == "nt":  # include the creation flag DETACHED_PROCESS for calls in windows
+        return subprocess.Popen(command,
+                                stdout=sys.stdout,
+                                shell=True,
+                                start_new_session=True,
+                                cwd=".",
+                                creationflags=WindowsCreationFlags.DETACHED_PROCESS)
+    else:
+        return subprocess.Popen(command,
+                                stdout=sys.stdout,
+                                shell=True,
+                                start_new_session=True,
+                                cwd=".",
+                                close_fds=True)
+
+
+class CrawlSupervisor:
+    """
+    Registry of the wrapper processes of one workspace, stored as json in the file at path. Each entry is a dict with
+    the keys id, crawl, spec, pid, create_time, started, state, returncode, restarts and owner (pid and creation time of
+    the launching application, which alone handles the exit of the process as long as it is running).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries = OrderedDict()
+        self._processes = dict()  # id -> Popen of the processes started by this application
+        self._stats = dict()  # id -> dict of the latest statistics of running processes
+        self._cpu_times = dict()  # id -> (wall clock time, cpu time) of the previous poll
+        self._lock = threading.RLock()
+        self._load()
+
+    def launch(self, crawl: str, spec_path: str) -> str:
+        """
+        Starts a wrapper process for the specification of crawl at spec_path and records it.
+        :return: The id of the registry entry.
+        """
+        with self._lock:
+            entry_id = uuid.uuid4().hex
+            self._entries[entry_id] = dict(id=entry_id, crawl=crawl, spec=spec_path, restarts=0)
+            self._start(self._entries[entry_id])
+            self._save()
+            return entry_id
+
+    def poll(self) -> [dict]:
+        """
+        Checks the running processes, restarting or marking those that have exited.
+        :return: Copies of all entries, the entries of running processes include the keys cpu_percent (of one core),
+                 rss, read_bytes and write_bytes (None if not available).
+        """
+        with self._lock:
+            self._load()  # entries launched, exited or restarted by other applications
+            running = [entry for entry in self._entries.values() if entry["state"] in (RUNNING, UNKNOWN)]
+            samples = self._sample(running)
+            changed = False
+            for entry in running:
+                process = self._processes.get(entry["id"])
+                returncode = process.poll() if process is not None else None
+                sample = samples.get(entry["id"])
+                if process is not None:
+                    exited = returncode is not None
+                elif sample is UNKNOWN:
+                    if entry["state"] != UNKNOWN:
+                        entry["state"] = UNKNOWN
+                        changed = True
+                    continue
+                else:
+                    exited = sample is None
+                    if exited and self._is_owned_elsewhere(entry):
+                        continue  # the launching application knows the exit code and restarts the process if needed
+
+                if exited:
+                    self._exited(entry, returncode)
+                    changed = True
+                elif isinstance(sample, dict):
+                    self._stats[entry["id"]] = self._with_cpu_percent(entry["id"], sample)
+            if changed:
+                self._save()
+            return self.get_entries()
+
+    def get_entries(self) -> [dict]:
+        """ Returns copies of all entries as of the last poll, see poll. """
+        with self._lock:
+            return [dict(entry, **self._stats.get(entry["id"], dict())) if entry["state"] == RUNNING
+                    else dict(entry) for entry in self._entries.values()]
+
+    def get_running(self, crawl: str = None) -> [dict]:
+        """ Returns the entries of the processes (of crawl) that were running at the last poll. """
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()
+                    if entry["state"] == RUNNING and (crawl is None or entry["crawl"] == crawl)]
+
+    def get_state(self, entry_id: str) -> str:
+        with self._lock:
+            return self._entries[entry_id]["state"]
+
+    def stop(self, entry_id: str):
+        """ Terminates all processes of the session of the entry, which is not restarted afterwards. """
+        with self._lock:
+            entry = self._entries[entry_id]
+            if entry["state"] != RUNNING:
+                return
+            LOG.info("Stopping wrapper process {0} of crawl {1}".format(entry["pid"], entry["crawl"]))
+            process = self._processes.get(entry_id)
+            try:
+                if process is None and not _is_same_process(entry["pid"], entry.get("create_time")):
+                    pass  # exited (and the pid possibly reused) in the meantime
+                elif psutil is not None:
+                    parent = psutil.Process(entry["pid"])
+                    for child in parent.children(recursive=True) + [parent]:
+                        child.terminate()
+                elif os.name != "nt":
+                    os.killpg(entry["pid"], signal.SIGTERM)
+                elif process is not None:
+                    process.terminate()
+            except OSError as exc:
+                LOG.warning("Could not stop process {0}: {1}".format(entry["pid"], exc))
+            except Exception as exc:
+                LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            entry["state"] = STOPPED
+            self._save()
+
+    def clear(self):
+        """ Removes the entries of all processes that are not running. """
+        with self._lock, filelock.locked(self.path):
+            self._load()
+            for entry_id in [entry_id for entry_id, entry in self._entries.items() if entry["state"] != RUNNING]:
+                del self._entries[entry_id]
+                self._processes.pop(entry_id, None)
+            self._write()
+
+    def _start(self, entry: dict, urls: [str] = None):
+        """ Launches the wrapper process of entry and marks its start urls (read from its spec if None) as running. """
+        if urls is None:
+            spec = CrawlSpecification()
+            spec.read(entry["spec"])
+            urls = spec.urls
+        process = launch_wrapper(entry["spec"])
+        self._processes[entry["id"]] = process
+        self._cpu_times.pop(entry["id"], None)
+        self._stats.pop(entry["id"], None)
+        entry.update(pid=process.pid, create_time=get_create_time(process.pid), started=time.time(),
+                     state=RUNNING, returncode=None, owner=_get_owner())
+        filemanager.register_urls(entry["crawl"], urls, running=True)
+
+    def _exited(self, entry: dict, returncode):
+        self._stats.pop(entry["id"], None)
+        self._processes.pop(entry["id"], None)
+        entry["returncode"] = returncode
+        # a wrapper process may exit cleanly without having crawled all of its start urls, e.g. after a timeout
+        failed = (returncode is not None and returncode != 0) or bool(self._get_incomplete_urls(entry))
+        LOG.info("Wrapper process {0} of crawl {1} exited with code {2}".format(entry["pid"], entry["crawl"],
+                                                                              returncode))
+
+        if failed and entry["restarts"] < SETTINGS["supervisor"]["max_restarts"]:
+            self._restart(entry)
+        else:
+            entry["state"] = FAILED if failed else FINISHED
+
+    def _restart(self, entry: dict):
+        try:
+            spec = CrawlSpecification()
+            spec.read(entry["spec"])
+            incomplete = filemanager.get_incomplete_urls(entry["crawl"], spec.urls)
+            if not incomplete:
+                entry["state"] = FINISHED
+                return
+            spec.update(urls=incomplete)
+            filemanager.save_settings_file(entry["spec"], spec)
+            entry["restarts"] += 1
+            LOG.warning("Restarting crawl {0} with {1} incomplete urls ({2}. restart)"
+                        .format(entry["crawl"], len(incomplete), entry["restarts"]))
+            self._start(entry, incomplete)
+        except Exception as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            entry["state"] = FAILED
+
+    @staticmethod
+    def _get_incomplete_urls(entry: dict) -> [str]:
+        try:
+            spec = CrawlSpecification()
+            spec.read(entry["spec"])
+            return filemanager.get_incomplete_urls(entry["crawl"], spec.urls)
+        except Exception as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            return list()
+
+    def _with_cpu_percent(self, entry_id: str, sample: dict) -> dict:
+        now = time.time()
+        previous = self._cpu_times.get(entry_id)
+        self._cpu_times[entry_id] = (now, sample["cpu_time"])
+        cpu_percent = None
+        if previous is not None and now > previous[0]:
+            cpu_percent = max(sample["cpu_time"] - previous[1], 0.0) / (now - previous[0]) * 100
+        return dict(cpu_percent=cpu_percent, rss=sample["rss"], read_bytes=sample["read_bytes"],
+                    write_bytes=sample["write_bytes"])
+
+    def _sample(self, entries: [dict]) -> dict:
+        """
+        Maps the id of each entry to the summed statistics of its session (dict with cpu_time in seconds, rss,
+        read_bytes and write_bytes), to None if its process does not exist anymore or to UNKNOWN if that can not be
+        determined.
+        """
+        if not entries:
+            return dict()
+        if psutil is not None:
+            return {entry["id"]: _sample_psutil(entry) for entry in entries}
+        if os.path.isdir(PROC):
+            return _sample_proc(entries)
+        return {entry["id"]: UNKNOWN for entry in entries}
+
+    @staticmethod
+    def _is_owned_elsewhere(entry: dict) -> bool:
+        owner, owner_create_time = entry.get("owner") or (None, None)
+        return owner is not None and owner != os.getpid() and _is_same_process(owner, owner_create_time)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as registry_file:
+                entries = json.load(registry_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            LOG.warning("Could not read the process registry {0}: {1}".format(self.path, exc))
+            return
+        for entry in entries:
+            known = self._entries.get(entry["id"])
+            # keep the own version of an entry, unless another application has seen it exit or restarted it since
+            if known is None or (known["state"] == RUNNING and entry["state"] != RUNNING) \
+                    or entry["restarts"] > known["restarts"]:
+                self._entries[entry["id"]] = entry
+                if known is not None and entry.get("pid") != known.get("pid"):
+                    self._processes.pop(entry["id"], None)
+
+    def _save(self):
+        """
+        Writes the registry, merging the entries changed by other applications since it was loaded. Both happen under
+        the lock file of the registry, so that concurrent saves of other applications are not lost.
+        """
+        with filelock.locked(self.path):
+            self._load()
+            self._write()
+
+    def _write(self):
+        finished = [entry_id for entry_id, entry in self._entries.items() if entry["state"] != RUNNING]
+        for entry_id in finished[:max(len(finished) - SETTINGS["supervisor"]["history"], 0)]:
+            del self._entries[entry_id]
+
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as registry_file:
+                json.dump(list(self._entries.values()), registry_file, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+
+
+def get_create_time(pid: int):
+    """ Creation time of the process pid in seconds since the epoch, None if it does not exist or is unknown. """
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+    stat = _read_proc_stat(pid)
+    if stat is None:
+        return None
+    return _get_boot_time() + stat["starttime"] / _CLOCK_TICKS
+
+
+def _is_same_process(pid: int, create_time) -> bool:
+    """ Tells whether the process pid exists and has been created at create_time (i.e. the pid has not been reused). """
+    current_create_time = get_create_time(pid)
+    return current_create_time is not None and create_time is not None \
+        and abs(current_create_time - create_time) <= CREATE_TIME_TOLERANCE
+
+
+_OWNER = None
+
+
+def _get_owner() -> (int, float):
+    global _OWNER
+    if _OWNER is None or _OWNER[0] != os.getpid():
+        _OWNER = (os.getpid(), get_create_time(os.getpid()))
+    return _OWNER
+
+
+def _sample_psutil(entry: dict):
+    try:
+        parent = psutil.Process(entry["pid"])
+        if abs(parent.create_time() - (entry.get("create_time") or 0)) > CREATE_TIME_TOLERANCE \
+                or parent.status() == psutil.STATUS_ZOMBIE:
+            return None
+        processes = [parent] + parent.children(recursive=True)
+    except psutil.Error:
+        return None
+
+    sample = dict(cpu_time=0.0, rss=0, read_bytes=None, write_bytes=None)
+    for process in processes:
+        try:
+            with process.oneshot():
+                cpu_times = process.cpu_times()
+                sample["cpu_time"] += cpu_times.user + cpu_times.system
+                sample["rss"] += process.memory_info().rss
+                io_counters = process.io_counters()  # not available on every platform
+                sample["read_bytes"] = (sample["read_bytes"] or 0) + io_counters.read_bytes
+                sample["write_bytes"] = (sample["write_bytes"] or 0) + io_counters.write_bytes
+        except (psutil.Error, AttributeError):
+            continue
+    return sample
+
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_BOOT_TIME = None
+
+
+def _get_boot_time() -> float:
+    global _BOOT_TIME
+    if _BOOT_TIME is None:
+        with open(os.path.join(PROC, "stat")) as stat_file:
+            for line in stat_file:
+                if line.startswith("btime"):
+                    _BOOT_TIME = float(line.split()[1])
+                    break
+    return _BOOT_TIME
+
+
+def _read_proc_stat(pid) -> dict:
+    try:
+        with open(os.path.join(PROC, str(pid), "stat"), "rb") as stat_file:
+            content = stat_file.read().decode("ascii", "replace")
+    except OSError:
+        return None
+    # the fields following the parenthesized command name, which may contain spaces and parentheses itself
+    fields = content[content.rfind(")") + 2:].split()
+    return dict(state=fields[0], session=int(fields[3]), cpu_ticks=int(fields[11]) + int(fields[12]),
+                starttime=int(fields[19]), rss_pages=int(fields[21]))
+
+
+def _read_proc_io(pid) -> dict:
+    io = dict()
+    try:
+        with open(os.path.join(PROC, str(pid), "io")) as io_file:
+            for line in io_file:
+                key, _, value = line.partition(":")
+                io[key] = int(value)
+    except (OSError, ValueError):
+        pass
+    return io
+
+
+def _sample_proc(entries: [dict]) -> dict:
+    """ Samples all sessions of the entries with a single scan of /proc. """
+    sessions = dict()
+    leaders = dict()
+    for entry in entries:
+        stat = _read_proc_stat(entry["pid"])
+        if stat is None or stat["state"] == "Z" or entry.get("create_time") is None \
+                or abs(_get_boot_time() + stat["starttime"] / _CLOCK_TICKS - entry["create_time"]) \
+                > CREATE_TIME_TOLERANCE:
+            leaders[entry["id"]] = None
+        else:
+            leaders[entry["id"]] = entry["pid"]
+            sessions[entry["pid"]] = dict(cpu_time=0.0, rss=0, read_bytes=None, write_bytes=None)
+
+    if sessions:
+        for name in os.listdir(PROC):
+            if not name.isdigit():
+                continue
+            stat = _read_proc_stat(name)
+            if stat is None or stat["session"] not in sessions:
+                continue
+            sample = sessions[stat["session"]]
+            sample["cpu_time"] += stat["cpu_ticks"] / _CLOCK_TICKS
+            sample["rss"] += stat["rss_pages"] * _PAGE_SIZE
+            io = _read_proc_io(name)
+            if "read_bytes" in io:
+                sample["read_bytes"] = (sample["read_bytes"] or 0) + io["read_bytes"]
+                sample["write_bytes"] = (sample["write_bytes"] or 0) + io["write_bytes"]
+
+    return {entry_id: sessions[pid] if pid is not None else None for entry_id, pid in leaders.items()}
+
+
+_SUPERVISORS = dict()
+_SUPERVISORS_LOCK = threading.Lock()
+
+
+def get_supervisor() -> CrawlSupervisor:
+    """ Returns the supervisor of the current workspace, one instance per workspace. """
+    path = os.path.join(WorkspaceManager().get_workspace(), SETTINGS["supervisor"]["registry_filename"])
+    with _SUPERVISORS_LOCK:
+        if path not in _SUPERVISORS:
+            _SUPERVISORS[path] = CrawlSupervisor(path)
+        return _SUPERVISORS[path]
@@ -21,13 +21,15 @@ You should have received a copy of the GNU General Public License
 along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import os
+import copy
 
-from PyQt5.QtWidgets import QHBoxLayout, QLabel, QLineEdit, QPushButton, QVBoxLayout, QGroupBox
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QHBoxLayout, QLabel, QLineEdit, QPushButton, QVBoxLayout, QGroupBox, QCheckBox
 import core
-from core.QtExtensions import HorizontalContainer, SimpleErrorInfo
-from modules.crawler import filemanager
+from core.QtExtensions import SimpleErrorInfo, SimpleYesNoMessage, SimpleMessageBox
+from modules.crawler import filemanager, remote, results, SETTINGS, LOG, compile_invalid_html
 from modules.crawler.controller import CrawlerController
+from modules.crawler.validation import validate_in_background
 
 
 class HttpRemoteCrawlView(QHBoxLayout):
@@ -52,18 +54,37 @@ class HttpRemoteCrawlView(QHBoxLayout):
         self.crawl_name_input = QLineEdit()
         self.crawl_name_input.setPlaceholderText("Crawl name")
 
+        self.split_input = QCheckBox("One specification per start url")
+        self.split_input.setToolTip("Send a separate crawl specification for every start url, so that the start urls "
+                                    "can be crawled by different remote crawlers")
+
         self.crawl_button = QPushButton("Send to specified URI")
 
         new_crawl_layout = QVBoxLayout()
         new_crawl_layout.addWidget(self.crawl_name_input)
+        new_crawl_layout.addWidget(self.split_input)
         new_crawl_layout.addWidget(self.crawl_button)
 
         new_crawl_input_group = QGroupBox("New Crawl")
         new_crawl_input_group.setLayout(new_crawl_layout)
 
+        # results of the crawl
+        self.retrieve_button = QPushButton("Retrieve results")
+        self.follow_input = QCheckBox("Keep retrieving new results")
+        self.follow_input.setToolTip("Retrieve the data files completed by the remote crawlers every {0} seconds"
+                                     .format(SETTINGS["results"]["poll_interval"]))
+
+        results_layout = QVBoxLayout()
+        results_layout.addWidget(self.retrieve_button)
+        results_layout.addWidget(self.follow_input)
+
+        results_group = QGroupBox("Crawl Results")
+        results_group.setLayout(results_layout)
+
         # put together crawl starting options
         self.addWidget(queue_input_group)
         self.addWidget(new_crawl_input_group)
+        self.addWidget(results_group)
 
         self.cnt = HttpRemoteQueueController(self)
 
@@ -74,6 +95,11 @@ class HttpRemoteQueueController(core.ViewController):
         super().__init__(view)
 
         self.master_cnt = None
+        self.validation = None  # keeps the running url validation (and its signals) alive
+        self.submission = None  # keeps the running submission (and its signals) alive
+        self.retrieval = None  # keeps the running retrieval of results (and its signals) alive
+        self.retrieval_timer = QTimer()
+        self.retrieval_timer.setInterval(int(SETTINGS["results"]["poll_interval"] * 1000))
         self.resettables.extend([self._view.crawl_name_input])
 
         self.init_elements()
@@ -89,9 +115,7 @@ class HttpRemoteQueueController(core.ViewController):
         This could determine the enabled state of a button, default values for text areas, etc.
         Should not further adjust layouts or labels!
         """
-        # TODO: perhaps initialize self._view.queue_input to some default message queue location
-        #  e.g. self._view.queue_input.setText("DEFAULT_URI")
-        pass
+        self._view.queue_input.setText(SETTINGS["remote"]["queue_url"])
 
     def setup_behaviour(self):
         """ Setup the behaviour of elements
@@ -101,6 +125,9 @@ class HttpRemoteQueueController(core.ViewController):
         """
 
         self._view.crawl_button.clicked.connect(self.send_to_queue)
+        self._view.retrieve_button.clicked.connect(self.retrieve_results)
+        self._view.follow_input.toggled.connect(self.follow_results)
+        self.retrieval_timer.timeout.connect(self.retrieve_results)
 
         # trigger model updates
         if self.master_cnt:
@@ -121,30 +148,123 @@ class HttpRemoteQueueController(core.ViewController):
 
     def send_to_queue(self):
         """
-        Creates and sends an appropriate json crawl specification to the specified message queue.
-        Perhaps it should send one specification per start url.
-        :return:
+        Validates the start urls and sends the crawl specification to the specified message queue, split into one
+        specification per start url if selected.
         """
-        # do some specific crawl specification setup
-        self.master_cnt.crawl_specification.update(
+        queue_location = self._view.queue_input.displayText().strip()
+        if not queue_location.startswith(("http://", "https://")):
+            SimpleErrorInfo("Error", "The message queue location must be a http(s) url.").exec()
+            return
+        if not self.master_cnt.crawl_specification.name:
+            SimpleErrorInfo("Error", "Your crawl must have a name.").exec()
+            return
+
+        self._view.crawl_button.setDisabled(True)
+        self.master_cnt.set_initializer_info("Validating urls ...")
+        self.validation = validate_in_background(self.master_cnt.crawl_specification.urls,
+                                                 self.send_validated_specification,
+                                                 on_progress=self.show_validation_progress)
+
+    def show_validation_progress(self, done, total):
+        self.master_cnt.set_initializer_info("Validating urls ... {0} of {1}".format(done, total))
+
+    def send_validated_specification(self, validation_result):
+        """ Continues send_to_queue with the (lines, invalid, urls) result of the url validation. """
+        self.validation = None
+        lines, invalid, urls = validation_result
+        self.master_cnt.set_initializer_info("Validated {0} non-empty lines.".format(lines))
+        if invalid:
+            invalid_html = compile_invalid_html(invalid)
+            if lines == len(invalid) or len(urls) == 0:
+                self._view.crawl_button.setDisabled(False)
+                SimpleErrorInfo("Error", "<b>No valid urls given.</b>", details=invalid_html).exec()
+                return
+
+            msg = SimpleYesNoMessage("Warning", "<b>{0} out of {1} non-empty lines contain invalid urls.</b>"
+                                                .format(len(invalid), lines),
+                                                "{0}"
+                                                "<b>Do you wish to send the crawl with the remaining "
+                                                "{1} valid urls?</b>"
+                                                .format(invalid_html, lines - len(invalid)))
+            if not msg.is_confirmed():
+                self._view.crawl_button.setDisabled(False)
+                return
+
+        # do some specific crawl specification setup on a copy, the specification of the view remains unchanged
+        spec = copy.copy(self.master_cnt.crawl_specification)
+        spec.update(
+            urls=urls,
             # these directories are rather arbitrary, because scrapy_wrapper is not being executed on THIS system
-            # introduce a finalizer to supply resulting data from these output directories back to the user
             output="data",
             logs="logs",
             pipelines={"pipelines.Paragraph2CsvPipeline": 300},
-            # extend finalizers by one that retrieves the crawl results and sends them away
-            finalizers={}
-
+            # the crawl agent uploads the resulting data files to the queue, from where they are retrieved
+            finalizers=results.get_result_finalizer(self._view.queue_input.displayText().strip())
         )
-
-        queue_location = self._view.queue_input.displayText()
-
-        json_text = self.master_cnt.crawl_specification.serialize()
-
-        SimpleErrorInfo("Feature not yet implemented",
-                        "Sending crawl specifications via http "
-                        "has not yet been implemented, please be patient.").exec()
-
-        # TODO: create http request with specification json (json_text)
-        #  and send it to the specified message queue location (queue_location)
-        #  either split specification into one per start url here or where the request is received
+        specs = remote.split_specification(spec) if self._view.split_input.isChecked() else [spec]
+
+        queue_location = self._view.queue_input.displayText().strip()
+        LOG.info("Sending {0} specifications of crawl {1} to {2}".format(len(specs), spec.name, queue_location))
+        self.master_cnt.set_initializer_info("Sending to {0} ...".format(queue_location))
+        self.submission = remote.submit_in_background(queue_location, specs,
+                                                      self.submission_finished, self.submission_failed,
+                                                      on_progress=self.show_submission_progress)
+
+    def show_submission_progress(self, done, total):
+        self.master_cnt.set_initializer_info("Sending ... {0} of {1} specifications".format(done, total))
+
+    def submission_finished(self, ids):
+        self.submission = None
+        self._view.crawl_button.setDisabled(False)
+        self.master_cnt.set_initializer_info("Sent {0} specifications.".format(len(ids)))
+        SimpleMessageBox("Crawl sent",
+                         "{0} crawl specifications have been added to the message queue.".format(len(ids))).exec()
+
+    def submission_failed(self, exc):
+        self.submission = None
+        self._view.crawl_button.setDisabled(False)
+        self.master_cnt.set_initializer_info("Sending failed.", color="red")
+        SimpleErrorInfo("Error", "The crawl could not be sent to the message queue.",
+                        details="{0}: {1}".format(type(exc).__name__, exc)).exec()
+
+    def retrieve_results(self):
+        """ Retrieves the new data files of the crawl named in the crawl name input into the workspace. """
+        if self.retrieval is not None:
+            return  # the previous retrieval is still running
+        queue_location = self._view.queue_input.displayText().strip()
+        crawl = self._view.crawl_name_input.displayText().strip()
+        if not queue_location or not crawl:
+            self._view.follow_input.setChecked(False)
+            SimpleErrorInfo("Error", "Enter the message queue location and the name of the crawl to retrieve the "
+                                     "results of.").exec()
+            return
+
+        self._view.retrieve_button.setDisabled(True)
+        self.master_cnt.set_initializer_info("Retrieving results of {0} ...".format(crawl))
+        self.retrieval = results.retrieve_in_background(queue_location, crawl,
+                                                        self.retrieval_finished, self.retrieval_failed,
+                                                        on_progress=self.show_retrieval_progress)
+
+    def follow_results(self, checked):
+        if checked:
+            self.retrieve_results()
+            self.retrieval_timer.start()
+        else:
+            self.retrieval_timer.stop()
+
+    def show_retrieval_progress(self, done, total):
+        self.master_cnt.set_initializer_info("Retrieving ... {0} of {1} data files".format(done, total))
+
+    def retrieval_finished(self, paths):
+        crawl = self.retrieval.crawl
+        self.retrieval = None
+        self._view.retrieve_button.setDisabled(False)
+        self.master_cnt.set_initializer_info("Retrieved {0} new data files of {1}.".format(len(paths), crawl))
+
+    def retrieval_failed(self, exc):
+        self.retrieval = None
+        self._view.retrieve_button.setDisabled(False)
+        self.master_cnt.set_initializer_info("Retrieving results failed.", color="red")
+        if not self.retrieval_timer.isActive():  # keep retrying silently while following
+            SimpleErrorInfo("Error", "The results could not be retrieved from the message queue.",
+                            details="{0}: {1}".format(type(exc).__name__, exc)).exec()
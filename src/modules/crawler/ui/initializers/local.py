@@ -23,22 +23,31 @@ along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
 import json
 import os
 import subprocess
-import sys
 import threading
+import time
+from collections import Counter
 
-from PyQt5.QtWidgets import QComboBox, QPushButton, QVBoxLayout, QGroupBox, QLineEdit, QHBoxLayout, QMessageBox
+from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtWidgets import QComboBox, QPushButton, QVBoxLayout, QGroupBox, QLineEdit, QHBoxLayout, QSpinBox, \
+    QLabel, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
 
 import core
-from core.QtExtensions import saturate_combobox, SimpleErrorInfo, SimpleYesNoMessage, SimpleMessageBox
-from modules.crawler import filemanager, WindowsCreationFlags, detect_valid_urls, SETTINGS, compile_invalid_html
+from core.QtExtensions import saturate_combobox, SimpleErrorInfo, SimpleYesNoMessage
+from modules.crawler import filemanager, jobqueue, launcher, manifest, supervisor, SETTINGS, compile_invalid_html
 from modules.crawler.controller import CrawlerController
 from modules.crawler.model import CrawlSpecification
+from modules.crawler.validation import validate_in_background
 
 from crawlUI import APP_SETTINGS
 
 LOG = core.simple_logger(modname="crawler", file_path=APP_SETTINGS["general"]["master_log"])
 
 
+JOB_COLUMNS = ["Crawl", "Specification", "URLs", "State", "Queued", "Started"]
+PROCESS_COLUMNS = ["Crawl", "Specification", "PID", "Started", "State", "Restarts", "CPU %", "RSS MiB",
+                   "Read MiB", "Written MiB"]
+
+
 class LocalCrawlView(QHBoxLayout):
 
     def __init__(self):
@@ -60,18 +69,65 @@ class LocalCrawlView(QHBoxLayout):
         self.crawl_name_input = QLineEdit()
         self.crawl_name_input.setPlaceholderText("Crawl name")
 
+        self.shards_input = QSpinBox()
+        self.shards_input.setPrefix("Shards: ")
+        self.shards_input.setToolTip("Number of OWS-scrapy-wrapper processes the start urls are distributed to")
+
         self.crawl_button = QPushButton("Start New Crawl")
 
+        self.crawl_status = QLabel()
+
         new_crawl_layout = QVBoxLayout()
         new_crawl_layout.addWidget(self.crawl_name_input)
+        new_crawl_layout.addWidget(self.shards_input)
         new_crawl_layout.addWidget(self.crawl_button)
+        new_crawl_layout.addWidget(self.crawl_status)
 
         new_crawl_input_group = QGroupBox("New Crawl")
         new_crawl_input_group.setLayout(new_crawl_layout)
 
+        # crawl jobs of the workspace
+        self.job_table = QTableWidget(0, len(JOB_COLUMNS))
+        self.job_table.setHorizontalHeaderLabels(JOB_COLUMNS)
+        self.job_cancel = QPushButton("Cancel Selected")
+        self.job_clear = QPushButton("Clear Exited")
+
+        job_button_layout = QHBoxLayout()
+        job_button_layout.addWidget(self.job_cancel)
+        job_button_layout.addWidget(self.job_clear)
+
+        job_layout = QVBoxLayout()
+        job_layout.addWidget(self.job_table)
+        job_layout.addLayout(job_button_layout)
+
+        job_group = QGroupBox("Crawl Jobs")
+        job_group.setLayout(job_layout)
+
+        # wrapper processes of the workspace
+        self.process_table = QTableWidget(0, len(PROCESS_COLUMNS))
+        self.process_table.setHorizontalHeaderLabels(PROCESS_COLUMNS)
+        self.process_stop = QPushButton("Stop Selected")
+        self.process_clear = QPushButton("Clear Exited")
+
+        process_button_layout = QHBoxLayout()
+        process_button_layout.addWidget(self.process_stop)
+        process_button_layout.addWidget(self.process_clear)
+
+        process_layout = QVBoxLayout()
+        process_layout.addWidget(self.process_table)
+        process_layout.addLayout(process_button_layout)
+
+        process_group = QGroupBox("Crawl Processes")
+        process_group.setLayout(process_layout)
+
+        queue_layout = QVBoxLayout()
+        queue_layout.addWidget(job_group)
+        queue_layout.addWidget(process_group)
+
         # put together crawl starting options
         self.addWidget(self.prev_crawl_groupbox)
         self.addWidget(new_crawl_input_group)
+        self.addLayout(queue_layout, stretch=1)
 
         self.cnt = LocalCrawlController(self)
 
@@ -81,6 +137,11 @@ class LocalCrawlController(core.ViewController):
     def __init__(self, view: LocalCrawlView):
         super().__init__(view)
         self.master_cnt = None
+        self.validation = None  # keeps the running url validation (and its signals) alive
+        self.launched_crawl = None
+        self.scheduling = None  # keeps the running scheduling round (and its signals) alive
+        self.status_timer = QTimer()
+        self.status_timer.setInterval(int(SETTINGS["launcher"]["status_interval"] * 1000))
         self.resettables.extend([view.prev_crawl_combobox,
                                 view.crawl_name_input])
 
@@ -102,6 +163,16 @@ class LocalCrawlController(core.ViewController):
 
         self._view.prev_crawl_groupbox.setDisabled(True)
 
+        self._view.shards_input.setRange(1, 1024)
+        self._view.shards_input.setValue(SETTINGS["launcher"]["shards"])
+        self._view.crawl_status.hide()
+
+        for table in [self._view.job_table, self._view.process_table]:
+            table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            table.setSelectionBehavior(QAbstractItemView.SelectRows)
+            table.verticalHeader().hide()
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
     def setup_behaviour(self):
         """ Setup the behaviour of elements
 
@@ -109,6 +180,13 @@ class LocalCrawlController(core.ViewController):
         Should not initialise default state, use init_elements() for that.
         """
         self._view.crawl_button.clicked.connect(self.start_crawl)
+        self._view.job_cancel.clicked.connect(self.cancel_selected_jobs)
+        self._view.job_clear.clicked.connect(self.clear_jobs)
+        self._view.process_stop.clicked.connect(self.stop_selected_processes)
+        self._view.process_clear.clicked.connect(self.clear_processes)
+        self.status_timer.timeout.connect(self.schedule_jobs)
+        self.schedule_jobs()
+        self.status_timer.start()
 
         # trigger model updates
         if self.master_cnt:
@@ -145,33 +223,26 @@ class LocalCrawlController(core.ViewController):
             msg.exec()
             LOG.error("No crawl selected for continuation.")
             return
-        msg = SimpleMessageBox("Attention",
-                               "Are you sure that the crawl '{0}' is not running anymore?"
-                               .format(spec.name),
-                               details="Check your task manager (or Alt+Tab) for any console-type windows, perhaps "
-                                       "your crawl is still being executed. If you are sure that the process has "
-                                       "stopped, you can continue it now.",
-                               icon=QMessageBox.Warning)
-        cont = msg.addButton("Continue Crawl", QMessageBox.ActionRole)
-        msg.addButton("Cancel", QMessageBox.RejectRole)
-        msg.exec()
-        pressed = msg.clickedButton()
-        if pressed == cont:
-            LOG.info("Setting up to continue an unfinished crawl ...")
-
-            LOG.info("Determining incomplete urls in crawl {0}".format(spec.name))
-            incomplete = filemanager.get_incomplete_urls(spec.name, spec.urls)
-            LOG.info("Found {0} out of {1} incomplete urls: {2}".format(len(incomplete), len(spec.urls), incomplete))
-            spec.update(urls=incomplete)
-
-            filemanager.save_crawl_settings(spec.name, spec)
-
-            settings_path = filemanager.get_running_specification_path(spec.name)
+        if not self.check_no_active_jobs(spec.name):
+            return
 
-            LOG.info("Starting new crawl with settings in file {0}".format(settings_path))
-            start_scrapy(settings_path)
-            self._view.continue_crawl_combobox.removeItem(self._view.continue_crawl_combobox.currentIndex())
-            self.update_view()
+        LOG.info("Setting up to continue an unfinished crawl ...")
+
+        LOG.info("Recovering incomplete data files of crawl {0}".format(spec.name))
+        filemanager.recover_csv(spec.name)
+
+        LOG.info("Determining incomplete urls in crawl {0}".format(spec.name))
+        incomplete = filemanager.get_incomplete_urls(spec.name, spec.urls)
+        LOG.info("Found {0} out of {1} incomplete urls: {2}".format(len(incomplete), len(spec.urls), incomplete))
+        spec.update(urls=incomplete)
+
+        settings_path = filemanager.save_crawl_settings(spec.name, spec)
+
+        LOG.info("Starting new crawl with settings in file {0}".format(settings_path))
+        filemanager.register_urls(spec.name, incomplete)
+        self.launch(settings_path)
+        self._view.continue_crawl_combobox.removeItem(self._view.continue_crawl_combobox.currentIndex())
+        self.update_view()
 
     def start_crawl(self):
         LOG.info("Pre-flight checks for starting a new crawl ...")
@@ -180,6 +251,8 @@ class LocalCrawlController(core.ViewController):
             msg = SimpleErrorInfo("Error", "Your crawl must have a name.")
             msg.exec()
             return
+        if not self.check_no_active_jobs(self.master_cnt.crawl_specification.name):
+            return
 
         # TODO Determine if a crawl has incomplete datafiles
         """
@@ -201,7 +274,21 @@ class LocalCrawlController(core.ViewController):
                 return
         else:
         """
-        lines, invalid, urls = detect_valid_urls(self.master_cnt.crawl_specification.urls)
+        self._view.crawl_button.setDisabled(True)
+        self.master_cnt.set_initializer_info("Validating urls ...")
+        self.validation = validate_in_background(self.master_cnt.crawl_specification.urls,
+                                                 self.start_validated_crawl,
+                                                 on_progress=self.show_validation_progress)
+
+    def show_validation_progress(self, done, total):
+        self.master_cnt.set_initializer_info("Validating urls ... {0} of {1}".format(done, total))
+
+    def start_validated_crawl(self, validation_result):
+        """ Continues start_crawl with the (lines, invalid, urls) result of the url validation. """
+        self.validation = None
+        self._view.crawl_button.setDisabled(False)
+        lines, invalid, urls = validation_result
+        self.master_cnt.set_initializer_info("Validated {0} non-empty lines.".format(lines))
         if invalid:
             invalid_html = compile_invalid_html(invalid)
             if lines == len(invalid) or len(urls) == 0:
@@ -231,12 +318,141 @@ class LocalCrawlController(core.ViewController):
                 return
 
             LOG.info("Starting new crawl with settings in file {0}".format(settings_path))
-            start_scrapy(settings_path)
+            filemanager.register_urls(self.master_cnt.crawl_specification.name, urls)
+            self.launch(settings_path)
         else:
             LOG.error("Crawl aborted. Not starting scrapy!")
 
         self.master_cnt.crawl_specification.update(urls=view_urls)
 
+    def check_no_active_jobs(self, crawl) -> bool:
+        """ Tells the user if crawl still has queued or running jobs, returns True if it has none. """
+        active = jobqueue.get_queue().get_jobs(crawl, active=True)
+        if active:
+            msg = SimpleErrorInfo("Error", "The crawl '{0}' is still queued or running.".format(crawl),
+                                  details="{0} jobs of the crawl are queued or running. Wait for them to finish or "
+                                          "cancel them in the list of crawl jobs first.".format(len(active)))
+            msg.exec()
+            return False
+        return True
+
+    def launch(self, settings_path):
+        """ Queues the crawl of the current specification (saved at settings_path) with the selected shards. """
+        spec = self.master_cnt.crawl_specification
+        try:
+            jobs = launcher.launch_crawl(spec, settings_path, shards=self._view.shards_input.value())
+        except ValueError as exc:
+            msg = SimpleErrorInfo("Error", str(exc))
+            msg.exec()
+            return
+        self.master_cnt.set_initializer_info("Queued crawl {0} as {1} job(s).".format(spec.name, len(jobs)))
+        self.launched_crawl = spec.name
+        self.schedule_jobs()
+        self._view.crawl_status.show()
+
+    def schedule_jobs(self):
+        """ Runs a scheduling round of the job queue in the background, see scheduling_finished. """
+        if self.scheduling is not None:
+            return  # the previous round is still running
+        self.scheduling = jobqueue.schedule_in_background(self.launched_crawl, self.scheduling_finished,
+                                                          self.scheduling_failed)
+
+    def scheduling_finished(self, status: dict):
+        """ Updates the jobs, processes and crawl status shown from the result of a scheduling round. """
+        crawl = self.scheduling.crawl
+        self.scheduling = None
+        self.update_job_table(status["jobs"])
+        self.update_process_table(status["entries"])
+        if crawl is not None and crawl == self.launched_crawl:
+            self.update_crawl_status(status["jobs"], status["progress"])
+
+    def scheduling_failed(self, exc):
+        self.scheduling = None
+
+    def update_crawl_status(self, jobs: [dict], progress: dict):
+        """ Shows the states of the jobs of the launched crawl together with the progress of its start urls. """
+        crawl = self.launched_crawl
+        job_states = Counter(job["state"] for job in jobs if job["crawl"] == crawl)
+        self._view.crawl_status.setText(
+            "{0}<br/>Jobs: {1}<br/>Start urls: {2}".format(
+                crawl,
+                ", ".join("{0} {1}".format(job_states[state], state)
+                          for state in jobqueue.JOB_STATES if job_states.get(state)) or "-",
+                ", ".join("{0} {1}".format(progress[state], state)
+                          for state in manifest.STATES if progress.get(state)) or "-"))
+        if not any(job_states.get(state) for state in jobqueue.ACTIVE_STATES):
+            self.launched_crawl = None
+
+    def update_job_table(self, jobs: [dict]):
+        """ Shows the jobs of the workspace in the order they were queued. """
+        table = self._view.job_table
+        selected = {table.item(index.row(), 0).data(Qt.UserRole) for index in table.selectionModel().selectedRows()}
+
+        table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            cells = [job["crawl"],
+                     os.path.basename(job["spec"]),
+                     job["weight"],
+                     job["state"],
+                     format_time(job["enqueued"]),
+                     format_time(job["started"])]
+            for column, cell in enumerate(cells):
+                item = QTableWidgetItem("" if cell is None else str(cell))
+                if column == 0:
+                    item.setData(Qt.UserRole, job["id"])
+                table.setItem(row, column, item)
+            if job["id"] in selected:
+                table.selectRow(row)
+
+    def cancel_selected_jobs(self):
+        table = self._view.job_table
+        for index in table.selectionModel().selectedRows():
+            jobqueue.get_queue().cancel(table.item(index.row(), 0).data(Qt.UserRole))
+        self.schedule_jobs()
+
+    def clear_jobs(self):
+        jobqueue.get_queue().clear()
+        self.schedule_jobs()
+
+    def update_process_table(self, entries: [dict] = None):
+        """ Shows the wrapper processes of the workspace as of the last poll, most recently started first. """
+        table = self._view.process_table
+        if entries is None:
+            entries = supervisor.get_supervisor().get_entries()
+        entries = sorted(entries, key=lambda e: e.get("started") or 0, reverse=True)
+        selected = {table.item(index.row(), 0).data(Qt.UserRole) for index in table.selectionModel().selectedRows()}
+
+        table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            cells = [entry["crawl"],
+                     os.path.basename(entry["spec"]),
+                     entry.get("pid"),
+                     format_time(entry.get("started")),
+                     entry["state"] if entry.get("returncode") is None
+                     else "{0} ({1})".format(entry["state"], entry["returncode"]),
+                     entry["restarts"],
+                     None if entry.get("cpu_percent") is None else "{0:.1f}".format(entry["cpu_percent"]),
+                     None if entry.get("rss") is None else "{0:.1f}".format(entry["rss"] / 2**20),
+                     None if entry.get("read_bytes") is None else "{0:.1f}".format(entry["read_bytes"] / 2**20),
+                     None if entry.get("write_bytes") is None else "{0:.1f}".format(entry["write_bytes"] / 2**20)]
+            for column, cell in enumerate(cells):
+                item = QTableWidgetItem("" if cell is None else str(cell))
+                if column == 0:
+                    item.setData(Qt.UserRole, entry["id"])
+                table.setItem(row, column, item)
+            if entry["id"] in selected:
+                table.selectRow(row)
+
+    def stop_selected_processes(self):
+        table = self._view.process_table
+        for index in table.selectionModel().selectedRows():
+            supervisor.get_supervisor().stop(table.item(index.row(), 0).data(Qt.UserRole))
+        self.schedule_jobs()
+
+    def clear_processes(self):
+        supervisor.get_supervisor().clear()
+        self.update_process_table()
+
     def setup_crawl(self, continue_crawl=False):
         spec = self.master_cnt.crawl_specification
 
@@ -256,27 +472,8 @@ class LocalCrawlController(core.ViewController):
             return filemanager.save_crawl_settings(spec.name, spec)
 
 
-def start_scrapy(settings_path):
-    scrapy_script = SETTINGS["general"]["scrapy_wrapper_exec"]
-    command = scrapy_script + " \"" + settings_path + "\""
-    LOG.info("Running {0}".format(command))
-    try:
-        if os.name == "nt":  # include the creation flag DETACHED_PROCESS for calls in windows
-            subprocess.Popen(command,
-                             stdout=sys.stdout,
-                             shell=True,
-                             start_new_session=True,
-                             cwd=".",
-                             creationflags=WindowsCreationFlags.DETACHED_PROCESS)
-        else:
-            subprocess.Popen(command,
-                             stdout=sys.stdout,
-                             shell=True,
-                             start_new_session=True,
-                             cwd=".",
-                             close_fds=True)
-    except Exception as exc:
-        LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+def format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else None
 
 
 def check_scrapy_connection(callback):
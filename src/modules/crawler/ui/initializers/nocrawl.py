@@ -27,7 +27,8 @@ from PyQt5.QtWidgets import QVBoxLayout, QLineEdit, QFileDialog, QPushButton
 import core
 from core.QtExtensions import SimpleYesNoMessage
 from crawlUI import APP_SETTINGS
-from modules.crawler import detect_valid_urls, compile_invalid_html
+from modules.crawler import compile_invalid_html, SETTINGS
+from modules.crawler.validation import validate_in_background
 
 LOG = core.simple_logger(modname="crawler", file_path=APP_SETTINGS["general"]["master_log"])
 
@@ -55,6 +56,7 @@ class NoCrawlController(core.ViewController):
         self.dialog = QFileDialog(view.save_button)
 
         self.master_cnt = None
+        self.validation = None  # keeps the running url validation (and its signals) alive
 
         self.init_elements()
         self.setup_behaviour()
@@ -74,7 +76,21 @@ class NoCrawlController(core.ViewController):
     def save_specification(self):
         self.master_cnt.update_model()
 
-        lines, invalid, urls = detect_valid_urls(self.master_cnt.crawl_specification.urls)
+        self._view.save_button.setDisabled(True)
+        self.master_cnt.set_initializer_info("Validating urls ...")
+        self.validation = validate_in_background(self.master_cnt.crawl_specification.urls,
+                                                 self.save_validated_specification,
+                                                 on_progress=self.show_validation_progress)
+
+    def show_validation_progress(self, done, total):
+        self.master_cnt.set_initializer_info("Validating urls ... {0} of {1}".format(done, total))
+
+    def save_validated_specification(self, validation_result):
+        """ Continues save_specification with the (lines, invalid, urls) result of the url validation. """
+        self.validation = None
+        self._view.save_button.setDisabled(False)
+        lines, invalid, urls = validation_result
+        self.master_cnt.set_initializer_info("Validated {0} non-empty lines.".format(lines))
         if invalid:
             invalid_html = compile_invalid_html(invalid)
             msg = SimpleYesNoMessage("Warning", "<b>{0} out of {1} non-empty lines contain invalid urls.</b>"
@@ -94,8 +110,8 @@ class NoCrawlController(core.ViewController):
             view_urls = self.master_cnt.crawl_specification.urls
             self.master_cnt.crawl_specification.update(urls=urls, name=crawlname)
 
-            with open(file_name, "w") as file:
-                file.write(self.master_cnt.crawl_specification.serialize())
-                LOG.info("Saved specification to {0}".format(file_name))
+            self.master_cnt.crawl_specification.write(
+                file_name, pretty=True, external_threshold=SETTINGS["filemanager"]["spec_list_threshold"])
+            LOG.info("Saved specification to {0}".format(file_name))
 
             self.master_cnt.crawl_specification.update(urls=view_urls)
@@ -0,0 +1,140 @@
+"""
+Collision-free mapping of start urls to data file names.
+A url is mapped to a fixed length hexadecimal key derived from its hash. The key is stored together with the url in
+an append-only index file, which makes the mapping reversible and resolves the (unlikely) case of two urls with the
+same hash by numbering the later one. Data files are placed in subdirectories named by the first characters of their
+key, so that no single directory grows beyond a few thousand entries.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+
+from modules.crawler import filelock
+
+# number of hash bytes in a key, i.e. keys have twice as many hexadecimal characters
+KEY_BYTES = 10
+KEY_PATTERN = re.compile(r"^[0-9a-f]{{{0}}}(-\d+)?$".format(2 * KEY_BYTES))
+
+
+def hash_key(url: str) -> str:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=KEY_BYTES).hexdigest()
+
+
+def is_key(name: str) -> bool:
+    """ Tells whether name has the form of a key, as opposed to a file name of the legacy flat layout. """
+    return KEY_PATTERN.match(name) is not None
+
+
+class UrlIndex:
+    """
+    Index of the keys of one data directory, stored as json lines {"key": ..., "url": ...} in the file at path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._keys = dict()
+        self._urls = dict()
+        self._offset = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """ Reads the entries that have been appended to the index file (e.g. by another process) since the last read. """
+        with self._lock:
+            self._refresh()
+
+    def key_for(self, url: str, create=True) -> str:
+        """
+        Returns the key of url. If url has no key yet, a new one is assigned and persisted, unless create is False
+        in which case None is returned.
+        """
+        key = self._keys.get(url)
+        if key is not None or not create:
+            return key
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # under the lock file, so that the keys appended by other processes are read before the key is chosen
+        with self._lock, filelock.locked(self.path):
+            self._refresh()
+            if url in self._keys:
+                return self._keys[url]
+
+            key = candidate = hash_key(url)
+            number = 0
+            while key in self._urls:
+                number += 1
+                key = "{0}-{1}".format(candidate, number)
+
+            line = (json.dumps({"key": key, "url": url}) + "\n").encode("utf-8")
+            with open(self.path, "ab") as index_file:
+                if index_file.tell() > self._offset:
+                    line = b"\n" + line  # do not continue a torn line
+                index_file.write(line)
+                self._offset = index_file.tell()
+            self._add(key, url)
+            return key
+
+    def url_for(self, key: str) -> str:
+        """ Returns the url of key, None if the key is unknown. """
+        url = self._urls.get(key)
+        if url is None:
+            self.refresh()
+            url = self._urls.get(key)
+        return url
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size < self._offset:
+            self._keys, self._urls, self._offset = dict(), dict(), 0
+        if size == self._offset:
+            return
+
+        with open(self.path, "rb") as index_file:
+            index_file.seek(self._offset)
+            for line in index_file:
+                if not line.endswith(b"\n"):
+                    break
+                self._offset += len(line)
+                try:
+                    entry = json.loads(line.decode("utf-8"))
+                    self._add(entry["key"], entry["url"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def _add(self, key: str, url: str):
+        self._keys[url] = key
+        self._urls[key] = url
+
+
+def shard_of(key: str, shard_chars: int) -> str:
+    """ Name of the subdirectory the data file of key is placed in. """
+    return key[:shard_chars]
@@ -0,0 +1,154 @@
+"""
+Bulk validation of url lists, used by the pre-flight checks before a crawl is started or a specification is saved.
+Every distinct line is validated only once. Where the installed validators package exposes the compiled regular
+expression behind validators.url, it is matched directly instead of going through the validator decorator per line.
+Very large lists are validated in chunks by a pool of worker processes, and validate_in_background runs the whole
+validation in a QThreadPool, reporting progress and the result through Qt signals.
+
+Created on 18.10.2026
+
+@author: Maximilian Pensel
+
+Copyright 2019 Maximilian Pensel <maximilian.pensel@gmx.de>
+
+This file is part of OpenWebScraper.
+
+OpenWebScraper is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+OpenWebScraper is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with OpenWebScraper.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import validators
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from modules.crawler import SETTINGS, LOG
+
+
+def _get_matcher():
+    """ Returns a function telling whether a single line is a valid url. """
+    # validators < 0.21 matches urls with the module level 'regex' of validators.url (without the public flag)
+    regex = getattr(sys.modules.get(validators.url.__module__), "regex", None)
+    if regex is not None and hasattr(regex, "match"):
+        return lambda line: regex.match(line) is not None
+    return lambda line: bool(validators.url(line))
+
+
+_is_valid_url = _get_matcher()
+
+
+def _validate_chunk(lines: [str]) -> [bool]:
+    return [_is_valid_url(line) for line in lines]
+
+
+def get_worker_count() -> int:
+    """ Number of validation worker processes, the workers setting or the number of cpus if it is 0. """
+    return SETTINGS["validation"]["workers"] or os.cpu_count() or 1
+
+
+def validate_lines(lines: [str], workers: int = None, progress=None) -> dict:
+    """
+    Validates the distinct lines.
+    :param workers: Number of worker processes for lists of more than parallel_threshold distinct lines, defaults
+                    to get_worker_count().
+    :param progress: Called with the number of validated and the total number of distinct lines after every chunk.
+    :return: dict mapping every distinct line to whether it is a valid url.
+    """
+    unique = list(dict.fromkeys(lines))
+    chunk_size = SETTINGS["validation"]["chunk_size"]
+    chunks = [unique[start:start + chunk_size] for start in range(0, len(unique), chunk_size)]
+    if workers is None:
+        workers = get_worker_count()
+
+    results = list()
+
+    def collect(chunk_result):
+        results.extend(chunk_result)
+        if progress:
+            progress(len(results), len(unique))
+
+    if workers > 1 and len(unique) > SETTINGS["validation"]["parallel_threshold"]:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            for chunk_result in pool.map(_validate_chunk, chunks):
+                collect(chunk_result)
+    else:
+        for chunk in chunks:
+            collect(_validate_chunk(chunk))
+
+    return dict(zip(unique, results))
+
+
+def detect_valid_urls(urls_in: [str], workers: int = None, progress=None) -> (int, [str], [str]):
+    """
+    Separates the valid from the invalid urls, ignoring empty lines and comments (lines starting with #).
+    :return: Tuple of the number of non-empty lines, the list of invalid lines and the list of valid urls, both in the
+             order (and with the repetitions) of urls_in.
+    """
+    candidates = [line for line in urls_in if line and not line.startswith("#")]
+    valid = validate_lines(candidates, workers=workers, progress=progress)
+
+    invalid = list()
+    urls = list()
+    for line in candidates:
+        if valid[line]:
+            urls.append(line)
+        else:
+            invalid.append(line)
+    return len(candidates), invalid, urls
+
+
+class ValidationSignals(QObject):
+
+    progressChanged = pyqtSignal(int, int)
+    # emits the (lines, invalid, urls) tuple of detect_valid_urls
+    finished = pyqtSignal(object)
+
+
+class ValidationWorker(QRunnable):
+
+    def __init__(self, urls_in: [str]):
+        super().__init__()
+        self.urls_in = list(urls_in)
+        self.signals = ValidationSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = detect_valid_urls(self.urls_in, progress=self.signals.progressChanged.emit)
+        except Exception as exc:
+            LOG.exception("{0}: {1}".format(type(exc).__name__, exc))
+            # fall back to validating in this thread, line by line
+            result = detect_valid_urls(self.urls_in, workers=1)
+        self.signals.finished.emit(result)
+
+
+_THREADPOOL = None
+
+
+def validate_in_background(urls_in: [str], on_finished, on_progress=None) -> ValidationWorker:
+    """
+    Runs detect_valid_urls in a background thread. on_finished is called with its (lines, invalid, urls) result and
+    on_progress with the number of validated and the total number of distinct lines, both in the thread of the
+    calling QObject (the GUI thread).
+    """
+    global _THREADPOOL
+    if _THREADPOOL is None:
+        _THREADPOOL = QThreadPool()
+
+    worker = ValidationWorker(urls_in)
+    worker.signals.finished.connect(on_finished)
+    if on_progress is not None:
+        worker.signals.progressChanged.connect(on_progress)
+    _THREADPOOL.start(worker)
+    return worker
@@ -27,7 +27,7 @@ import core
 from core.QtExtensions import VerticalContainer, HorizontalSeparator, LineHighlighter
 from modules.crawler.controller import CrawlerController
 from PyQt5.QtWidgets import QLineEdit, QPlainTextEdit, QPushButton, QSplitter, \
-    QComboBox, QGroupBox, QVBoxLayout, QLabel, QWidget, QSizePolicy, QFrame, QSpacerItem, QTextEdit
+    QComboBox, QGroupBox, QVBoxLayout, QLabel, QWidget, QSizePolicy, QFrame, QSpacerItem
 from PyQt5.QtWidgets import QHBoxLayout
 import qtawesome
 
@@ -111,8 +111,8 @@ class CrawlSpecificationView(QSplitter):
         self.url_delete.setProperty("class", "iconbutton")
         self.url_delete.setCursor(QCursor(Qt.PointingHandCursor))
 
-        self.url_area = QTextEdit()
-        self.url_highlighter = LineHighlighter(self.url_area.document())
+        self.url_area = QPlainTextEdit()
+        self.url_highlighter = LineHighlighter(self.url_area.document(), editor=self.url_area)
 
         url_selection_layout = QHBoxLayout()
         url_selection_layout.addWidget(self.url_select)